@@ -1,23 +1,44 @@
 #!/usr/bin/env python3
-import glob as glob_module
 import json
 import logging
 import plistlib
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
 from pathlib import Path
 
 import autopkg_wrapper.utils.git_functions as git
-from autopkg_wrapper.models.recipe import Recipe
+from autopkg_wrapper.models.recipe import Recipe, verify_trust_info_batch
 from autopkg_wrapper.notifier import slack
 from autopkg_wrapper.utils.args import setup_args
+from autopkg_wrapper.utils.concurrency_controller import ConcurrencyController
+from autopkg_wrapper.utils.error_classifier import build_error_classifier
+from autopkg_wrapper.utils.git_backend import close_git_backends, get_git_backend
 from autopkg_wrapper.utils.logging import setup_logger
 from autopkg_wrapper.utils.recipe_batching import (
     build_recipe_batches,
+    build_recipe_dependencies,
     describe_recipe_batches,
+    resource_class_for,
+)
+from autopkg_wrapper.utils.recipe_durations import (
+    DurationHistory,
+    longest_first_priorities,
+)
+from autopkg_wrapper.utils.recipe_index import (
+    get_recipe_index,
+    resolve_recipe_override_dir,
+    set_persistent_cache_repo,
 )
 from autopkg_wrapper.utils.recipe_ordering import order_recipe_list
-from autopkg_wrapper.utils.report_processor import process_reports
+from autopkg_wrapper.utils.recipe_retry import RetryPolicy
+from autopkg_wrapper.utils.recipe_scheduler import (
+    RecipeScheduler,
+    Stage,
+    run_stages_serially,
+)
+from autopkg_wrapper.utils.recipe_timing import log_slowest_recipes
+from autopkg_wrapper.utils.report_processor import parse_plist_file, process_reports
+from autopkg_wrapper.utils.run_results import recipe_result, write_run_results
 
 
 def normalize_recipe_identifier(recipe_input: str) -> str:
@@ -81,23 +102,26 @@ def discover_recipes_from_glob(
     if base_path:
         pattern = str(Path(base_path) / pattern)
 
-    # Use glob to find matching files
-    matched_files = glob_module.glob(pattern, recursive=True)
-
-    if not matched_files:
+    # Split the pattern into its literal leading directory and the glob part so
+    # matching can be done against the shared recipe index for that directory.
+    parts = Path(pattern).parts
+    literal_parts = []
+    for part in parts:
+        if has_glob_pattern(part):
+            break
+        literal_parts.append(part)
+    search_root = Path(*literal_parts) if literal_parts else Path(".")
+    relative_pattern = "/".join(parts[len(literal_parts) :])
+
+    matched_entries = []
+    if relative_pattern and search_root.is_dir():
+        matched_entries = get_recipe_index(search_root).match(relative_pattern)
+
+    if not matched_entries:
         logging.warning(f"No recipe files found matching pattern: {pattern}")
         return []
 
-    recipe_identifiers = []
-    for file_path in matched_files:
-        file_name = Path(file_path).name
-
-        # Strip common recipe extensions to get the identifier
-        for ext in [".recipe.yaml", ".recipe.plist", ".recipe"]:
-            if file_name.endswith(ext):
-                identifier = file_name[: -len(ext)]
-                recipe_identifiers.append(identifier)
-                break
+    recipe_identifiers = [entry.name for entry in matched_entries]
 
     logging.info(
         f"Discovered {len(recipe_identifiers)} recipes from pattern: {pattern}"
@@ -159,6 +183,7 @@ def get_override_repo_info(args):
         "override_trust_branch": args.branch_name,
         "github_token": args.github_token,
         "create_pr": args.create_pr,
+        "git_backend": getattr(args, "git_backend", "subprocess"),
     }
 
     logging.debug(git_info)
@@ -184,28 +209,90 @@ def update_recipe_repo(recipe, git_info, disable_recipe_trust_check, args):
             return
         case False:
             logging.debug("Updating repo as recipe verification failed")
-            current_branch = git.get_current_branch(git_info)
-
-            if args.disable_git_commands:
-                logging.info(
-                    "Not runing git commands as --disable-git-commands has been set"
+            with recipe.timed("git"):
+                backend = get_git_backend(git_info)
+                current_branch = backend.get_current_branch()
+
+                if args.disable_git_commands:
+                    logging.info(
+                        "Not runing git commands as --disable-git-commands has been set"
+                    )
+                    return
+
+                if current_branch != git_info["override_trust_branch"]:
+                    logging.debug(
+                        f"override_trust_branch: {git_info['override_trust_branch']}"
+                    )
+                    backend.create_branch()
+
+                backend.stage_recipe()
+                backend.commit_recipe(
+                    message=f"Updating Trust Info for {recipe.identifier}"
                 )
-                return
+                backend.pull_branch()
+                backend.push_branch()
 
-            if current_branch != git_info["override_trust_branch"]:
-                logging.debug(
-                    f"override_trust_branch: {git_info['override_trust_branch']}"
-                )
-                git.create_branch(git_info)
+            return
 
-            git.stage_recipe(git_info)
-            git.commit_recipe(
-                git_info, message=f"Updating Trust Info for {recipe.identifier}"
+
+def update_recipe_repo_batched(recipe_list, git_info, disable_recipe_trust_check, args):
+    """Commit trust updates for every recipe, then pull and push once.
+
+    With --git-commit-mode=batched each recipe gets its own commit containing
+    only its override file. With --git-commit-mode=single every updated
+    override goes into one commit. Only the recipes' override files are
+    staged (falling back to `git add -u` if a file can't be found). Either way
+    the branch is checked once and the network round trip (pull --rebase and
+    push) happens once per run. The git time is shared evenly between the
+    committed recipes.
+    """
+    if disable_recipe_trust_check:
+        logging.debug("Not updating repo as recipe verification has been disabled")
+        return []
+
+    to_commit = [r for r in recipe_list if r.verified is False]
+    if not to_commit:
+        logging.debug("No trust updates to commit")
+        return []
+
+    started = time.monotonic()
+    backend = get_git_backend(git_info)
+    if backend.get_current_branch() != git_info["override_trust_branch"]:
+        logging.debug(f"override_trust_branch: {git_info['override_trust_branch']}")
+        backend.create_branch()
+
+    if getattr(args, "git_commit_mode", "per-recipe") == "single":
+        recipe_paths = [r.find_recipe_file_path(args) for r in to_commit]
+        if all(recipe_paths):
+            backend.stage_paths(recipe_paths)
+        else:
+            backend.stage_recipe()
+        identifiers = [r.identifier for r in to_commit]
+        if len(identifiers) == 1:
+            message = f"Updating Trust Info for {identifiers[0]}"
+        else:
+            message = f"Updating Trust Info for {len(identifiers)} recipes\n\n"
+            message += "\n".join(f"- {identifier}" for identifier in identifiers)
+        backend.commit_recipe(message=message)
+    else:
+        for recipe in to_commit:
+            recipe_path = recipe.find_recipe_file_path(args)
+            if recipe_path:
+                backend.stage_paths([recipe_path])
+            else:
+                # Fall back to staging every tracked change
+                backend.stage_recipe()
+            backend.commit_recipe(
+                message=f"Updating Trust Info for {recipe.identifier}"
             )
-            git.pull_branch(git_info)
-            git.push_branch(git_info)
 
-            return
+    logging.info(f"Committed trust updates for {len(to_commit)} recipes; pushing once")
+    backend.pull_branch()
+    backend.push_branch()
+    elapsed = time.monotonic() - started
+    for recipe in to_commit:
+        recipe.record_timing("git", elapsed / len(to_commit))
+    return to_commit
 
 
 def _needs_git_updates(recipe_list) -> bool:
@@ -341,6 +428,66 @@ def parse_post_processors(post_processors):
     return post_processors_list
 
 
+def start_run_deadline(recipe_list, args) -> float | None:
+    """Start the --run-timeout clock and give each recipe the deadline.
+
+    Returns:
+        float | None: time.monotonic() value by which the run must finish,
+        or None if there is no run timeout
+    """
+    run_timeout = getattr(args, "run_timeout", 0) or 0
+    if run_timeout <= 0:
+        return None
+    deadline = time.monotonic() + run_timeout
+    for recipe in recipe_list:
+        recipe.deadline = deadline
+    logging.info(f"Recipes will stop being started after {run_timeout}s")
+    return deadline
+
+
+def build_concurrency_controller(args) -> ConcurrencyController | None:
+    """Return a controller for --adaptive-concurrency, or None if it's off."""
+    if not getattr(args, "adaptive_concurrency", False):
+        return None
+    controller = ConcurrencyController(
+        min_workers=getattr(args, "min_concurrency", 1),
+        max_workers=args.concurrency,
+    )
+    logging.info(
+        f"Adaptive concurrency: starting at {controller.limit}, "
+        f"between {controller.min_workers} and {controller.max_workers}"
+    )
+    return controller
+
+
+def build_retry_policy(args) -> RetryPolicy | None:
+    """Return the retry policy for --retries, or None if retries are off."""
+    retries = getattr(args, "retries", 0) or 0
+    if retries <= 0:
+        return None
+    return RetryPolicy(
+        max_attempts=retries + 1,
+        backoff=float(getattr(args, "retry_backoff", 30)),
+        classifier=build_error_classifier(getattr(args, "error_categories", None)),
+    )
+
+
+def _log_trust_failure_skip(recipe):
+    # When trust verification fails we update trust info and stop
+    # without running the recipe. Operators reading the log would
+    # otherwise have no signal that the recipe didn't actually
+    # execute — they'd just see 'Processed 0 recipes' at the end
+    # and have to infer the two-phase behaviour.
+    logging.info(
+        "Trust verification failed for %s; updating trust info. "
+        "The recipe will NOT run on this invocation — re-run the "
+        "wrapper with the updated recipe file in place to execute "
+        "it (commit and push in CI; re-run in the same working "
+        "directory locally).",
+        recipe.identifier,
+    )
+
+
 def process_recipe(recipe, disable_recipe_trust_check, args):
     if getattr(args, "dry_run", False):
         logging.info("Dry run: processing recipe %s", recipe.identifier)
@@ -357,12 +504,53 @@ def process_recipe(recipe, disable_recipe_trust_check, args):
             recipe.identifier,
         )
         return recipe
+    verify_recipe(recipe, disable_recipe_trust_check, args)
+    return run_verified_recipe(recipe, disable_recipe_trust_check, args)
+
+
+def _combine_trust_and_run(disable_recipe_trust_check, args) -> bool:
+    return (
+        getattr(args, "combine_trust_and_run", False) and not disable_recipe_trust_check
+    )
+
+
+def verify_recipe(recipe, disable_recipe_trust_check, args):
+    """Verify stage of process_recipe: set recipe.verified ahead of running."""
+    if _combine_trust_and_run(disable_recipe_trust_check, args):
+        # Trust is checked by the run itself
+        return recipe
     if disable_recipe_trust_check:
         logging.debug("Setting Recipe verification to None")
         recipe.verified = None
     else:
         logging.debug("Checking Recipe verification")
         recipe.verify_trust_info(args)
+    return recipe
+
+
+def run_verified_recipe(recipe, disable_recipe_trust_check, args, tidy=True):
+    """Run stage of process_recipe: run the recipe or update its trust info.
+
+    Args:
+        recipe: Recipe that has been through verify_recipe
+        disable_recipe_trust_check: Whether trust verification is disabled
+        args: Parsed command-line arguments
+        tidy: Whether to tidy the recipe file after a trust update here;
+            pipelined runs pass False and tidy in a later stage
+    """
+    if recipe.results.get("timed_out"):
+        # Trust verification was stopped; there's nothing to run or update
+        return recipe
+    if _combine_trust_and_run(disable_recipe_trust_check, args):
+        # A single `autopkg run` with FAIL_RECIPES_WITHOUT_TRUST_INFO both
+        # verifies trust and runs the recipe, saving a second autopkg process.
+        # Trust is only updated when that run reports a trust failure.
+        logging.debug("Running Recipe with trust enforcement in a single process")
+        recipe.run(args, enforce_trust=True)
+        if recipe.verified is False:
+            _log_trust_failure_skip(recipe)
+            recipe.update_trust_info(args, tidy=tidy)
+        return recipe
 
     match recipe.verified:
         case False | None if disable_recipe_trust_check:
@@ -372,20 +560,8 @@ def process_recipe(recipe, disable_recipe_trust_check, args):
             logging.debug("Running Recipe after successful verification")
             recipe.run(args)
         case False:
-            # When trust verification fails we update trust info and stop
-            # without running the recipe. Operators reading the log would
-            # otherwise have no signal that the recipe didn't actually
-            # execute — they'd just see 'Processed 0 recipes' at the end
-            # and have to infer the two-phase behaviour.
-            logging.info(
-                "Trust verification failed for %s; updating trust info. "
-                "The recipe will NOT run on this invocation — re-run the "
-                "wrapper with the updated recipe file in place to execute "
-                "it (commit and push in CI; re-run in the same working "
-                "directory locally).",
-                recipe.identifier,
-            )
-            recipe.update_trust_info(args)
+            _log_trust_failure_skip(recipe)
+            recipe.update_trust_info(args, tidy=tidy)
         case _:
             # Catch-all for any combination not matched above (in practice:
             # verified is None with trust-check enabled). This branch
@@ -432,8 +608,8 @@ def update_trust_only_workflow(recipe_list, args):
         f"Update-trust-only mode: checking {len(recipe_list)} recipes with concurrency={max_workers}"
     )
 
-    def update_trust_for_recipe(recipe: Recipe):
-        """Process a single recipe for trust update."""
+    def verify_stage(recipe: Recipe):
+        """Verify trust info, unless a batched verification already decided it."""
         logging.info(f"Checking trust info for: {recipe.identifier}")
 
         if getattr(args, "dry_run", False):
@@ -443,23 +619,23 @@ def update_trust_only_workflow(recipe_list, args):
                 "Dry run: would update trust info if verification fails for %s",
                 recipe.identifier,
             )
-            return recipe
+            return
 
-        # Verify trust info
         try:
-            recipe.verify_trust_info(args)
+            if recipe.verified is None:
+                recipe.verify_trust_info(args)
         except Exception as e:
             logging.error(f"Failed to verify trust info for {recipe.identifier}: {e}")
             recipe.error = True
-            return recipe
 
-        # Update trust if verification failed
+    def update_stage(recipe: Recipe):
+        """Update trust if verification failed."""
         if recipe.verified is False:
             logging.info(
                 f"Trust verification failed for {recipe.identifier}, updating..."
             )
             try:
-                recipe.update_trust_info(args)
+                recipe.update_trust_info(args, tidy=False)
                 recipe.updated = True
                 logging.info(f"Successfully updated trust info for {recipe.identifier}")
             except Exception as e:
@@ -476,21 +652,38 @@ def update_trust_only_workflow(recipe_list, args):
                 f"Trust verification returned None for {recipe.identifier}, skipping"
             )
 
-        return recipe
+    stages = [
+        Stage("verify", verify_stage),
+        Stage(
+            "update",
+            update_stage,
+            when=lambda r: not r.error and not getattr(args, "dry_run", False),
+        ),
+        Stage(
+            "tidy",
+            lambda r: r.tidy_after_trust_update(args),
+            when=lambda r: r.updated is True and not r.error,
+        ),
+    ]
+
+    deadline = start_run_deadline(recipe_list, args)
+    batch_size = getattr(args, "trust_verify_batch_size", 1) or 1
+    if batch_size > 1 and recipe_list and not getattr(args, "dry_run", False):
+        remaining = verify_trust_info_batch(
+            recipe_list, args, batch_size=batch_size, max_workers=max_workers
+        )
+        if remaining:
+            logging.info(f"{len(remaining)} recipes need individual trust verification")
 
-    # Process recipes concurrently
+    # Process recipes concurrently; each recipe moves on to updating and
+    # tidying as soon as its own verification finishes
     if getattr(args, "dry_run", False):
         # Sequential processing for dry run to keep logs clean
-        for r in recipe_list:
-            update_trust_for_recipe(r)
+        run_stages_serially(recipe_list, stages)
     else:
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(update_trust_for_recipe, r) for r in recipe_list]
-            for fut in as_completed(futures):
-                try:
-                    fut.result()
-                except Exception as e:
-                    logging.error(f"Unexpected error processing recipe: {e}")
+        RecipeScheduler(
+            max_workers=max_workers, controller=build_concurrency_controller(args)
+        ).run(recipe_list, stages, deadline=deadline)
 
     # Categorize results
     for recipe in recipe_list:
@@ -519,9 +712,30 @@ def update_trust_only_workflow(recipe_list, args):
         for r in failed_recipes:
             logging.warning(f"  - {r.identifier}")
 
+    log_slowest_recipes(recipe_list, getattr(args, "slowest_recipes", 10))
+
     return updated_recipes, skipped_recipes, failed_recipes
 
 
+def write_recipe_results(recipe_list, args) -> None:
+    """Write a result row per recipe to --results-file.
+
+    Uploaded packages, versions and policies come from each recipe's
+    report plist, so nothing needs to re-parse the reports later.
+    """
+    classifier = build_error_classifier(getattr(args, "error_categories", None))
+    results = []
+    for r in recipe_list:
+        report = None
+        if r.report_path is not None and Path(r.report_path).exists():
+            report = parse_plist_file(str(r.report_path), error_classifier=classifier)
+        results.append(recipe_result(r, report, classifier))
+    count = write_run_results(
+        results, args.results_file, getattr(args, "results_format", None)
+    )
+    logging.info(f"Wrote {count} recipe results to {args.results_file}")
+
+
 def main():
     args = setup_args()
     setup_logger(args.debug if args.debug else False)
@@ -529,6 +743,12 @@ def main():
 
     override_repo_info = None
 
+    set_persistent_cache_repo(
+        None
+        if args.disable_recipe_index_cache
+        else resolve_recipe_override_dir(args.overrides_repo_path, args.autopkg_prefs)
+    )
+
     post_processors_list = parse_post_processors(post_processors=args.post_processors)
     recipe_list = parse_recipe_list(
         recipes=args.recipes,
@@ -578,7 +798,6 @@ def main():
             disable_recipe_trust_check=args.disable_recipe_trust_check,
             args=args,
         )
-        # Git updates and notifications are applied serially after all recipes finish
         return r
 
     if args.recipe_processing_order:
@@ -588,44 +807,110 @@ def main():
         )
         if args.debug:
             logging.info("Recipe processing batches:")
-            batch_descriptions = describe_recipe_batches(batches)
-            for batch_desc in batch_descriptions:
+            for batch_desc in describe_recipe_batches(batches):
                 batch_type = batch_desc.get("type") or "unknown"
                 logging.info(
                     f"Batch type={batch_type} count={batch_desc.get('count', 0)}"
                 )
-        else:
-            batch_descriptions = describe_recipe_batches(batches)
-        for batch, batch_desc in zip(batches, batch_descriptions, strict=False):
-            batch_type = batch_desc.get("type") or "unknown"
-            if args.debug:
-                logging.info(f"Beginning {batch_type} batch")
                 logging.info(f"Batch recipes: {batch_desc.get('recipes', [])}")
-            if args.dry_run:
-                for r in batch:
-                    run_one(r)
-                continue
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = [executor.submit(run_one, r) for r in batch]
-                for fut in as_completed(futures):
-                    r = fut.result()
-                    if r.error or r.results.get("failed"):
-                        failed_recipes.append(r)
-    elif recipe_list:
-        if args.debug:
+        # Batch order only matters within a software title, so a recipe waits
+        # for its own title's earlier recipes rather than for whole batches.
+        ordered_recipes = [r for batch in batches for r in batch]
+        dependencies = build_recipe_dependencies(batches)
+    else:
+        if args.debug and recipe_list:
             logging.info("Recipe processing batches:")
             logging.info("Batch type=all count=%d", len(recipe_list))
             logging.info("Batch recipes: %s", [r.identifier for r in recipe_list])
-        if args.dry_run:
-            for r in recipe_list:
-                run_one(r)
+        ordered_recipes = list(recipe_list)
+        dependencies = None
+
+    duration_history = None
+    if getattr(args, "duration_history", None):
+        duration_history = DurationHistory(args.duration_history)
+    priorities = None
+    if getattr(args, "schedule", "order") == "longest-first":
+        if duration_history is None:
+            logging.warning(
+                "--schedule longest-first needs --duration-history; keeping list order"
+            )
         else:
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = [executor.submit(run_one, r) for r in recipe_list]
-                for fut in as_completed(futures):
-                    r = fut.result()
-                    if r.error or r.results.get("failed"):
-                        failed_recipes.append(r)
+            priorities = longest_first_priorities(
+                ordered_recipes, dependencies, duration_history
+            )
+
+    if args.dry_run:
+        for r in ordered_recipes:
+            run_one(r)
+    elif ordered_recipes:
+        deadline = start_run_deadline(ordered_recipes, args)
+        retry_policy = build_retry_policy(args)
+        class_limits = getattr(args, "class_concurrency", None) or None
+        if class_limits:
+            logging.info(
+                "Per-class concurrency limits: "
+                + ", ".join(f"{cls}={n}" for cls, n in class_limits.items())
+            )
+        disable_trust_check = args.disable_recipe_trust_check
+
+        def verify_one(r: Recipe):
+            logging.info(f"Processing Recipe: {r.identifier}")
+            verify_recipe(r, disable_trust_check, args)
+
+        notifier = None
+        if args.slack_token:
+            notifier = slack.SlackDispatcher(
+                args.slack_token,
+                max_workers=getattr(args, "slack_concurrency", 4),
+                digest=getattr(args, "slack_digest", False),
+            )
+
+        # Each recipe moves through these stages independently; the notify
+        # stage only queues the message, which the dispatcher delivers.
+        stages = [
+            Stage("verify", verify_one),
+            Stage(
+                "run",
+                lambda r: run_verified_recipe(r, disable_trust_check, args, tidy=False),
+                retry=retry_policy.retry_delay if retry_policy else None,
+                class_limits=class_limits,
+                resource_class=resource_class_for,
+            ),
+            Stage(
+                "tidy",
+                lambda r: r.tidy_after_trust_update(args),
+                when=lambda r: r.verified is False and not r.error,
+            ),
+            Stage(
+                "notify",
+                lambda r: notifier.submit(r),
+                when=lambda r: notifier is not None,
+                after_failure=True,
+            ),
+        ]
+        scheduler = RecipeScheduler(
+            max_workers=max_workers, controller=build_concurrency_controller(args)
+        )
+        for r in scheduler.run(
+            ordered_recipes,
+            stages,
+            dependencies,
+            release_after="run",
+            priority=priorities,
+            deadline=deadline,
+        ):
+            if r.error or r.results.get("failed"):
+                failed_recipes.append(r)
+        if notifier is not None:
+            notifier.close()
+
+        if duration_history is not None:
+            recorded = duration_history.record(ordered_recipes)
+            duration_history.save()
+            logging.debug(f"Recorded durations for {recorded} recipes")
+
+    if getattr(args, "results_file", None):
+        write_recipe_results(recipe_list, args)
 
     # Apply git updates serially to avoid branch/commit conflicts when
     # concurrency > 1.
@@ -649,21 +934,28 @@ def main():
     else:
         if override_repo_info is None:
             override_repo_info = get_override_repo_info(args)
-        for r in recipe_list:
-            update_recipe_repo(
+        if getattr(args, "git_commit_mode", "per-recipe") == "per-recipe":
+            for r in recipe_list:
+                update_recipe_repo(
+                    git_info=override_repo_info,
+                    recipe=r,
+                    disable_recipe_trust_check=args.disable_recipe_trust_check,
+                    args=args,
+                )
+        else:
+            update_recipe_repo_batched(
+                recipe_list=recipe_list,
                 git_info=override_repo_info,
-                recipe=r,
                 disable_recipe_trust_check=args.disable_recipe_trust_check,
                 args=args,
             )
+        close_git_backends()
 
-    # Send notifications serially to simplify rate limiting and ordering
-    if args.slack_token:
-        if args.dry_run:
-            logging.info("Dry run: skipping Slack notifications")
-        else:
-            for r in recipe_list:
-                slack.send_notification(recipe=r, token=args.slack_token)
+    log_slowest_recipes(recipe_list, getattr(args, "slowest_recipes", 10))
+
+    # Slack notifications are sent from the pipeline as each recipe finishes
+    if args.slack_token and args.dry_run:
+        logging.info("Dry run: skipping Slack notifications")
 
     # Optionally open a PR for updated trust information
     if args.create_pr and recipe_list:
@@ -712,10 +1004,11 @@ def main():
             repo_url = override_repo_info.get("override_repo_url")
             repo_path = str(override_repo_info.get("override_repo_path"))
             if not args.disable_git_commands:
-                repo_branch = git.get_current_branch(override_repo_info)
+                repo_branch = get_git_backend(override_repo_info).get_current_branch()
         rc = process_reports(
             zip_file=args.reports_zip,
             extract_dir=args.reports_extract_dir,
+            extract=getattr(args, "reports_extract", False),
             reports_dir=(args.reports_dir or "/private/tmp/autopkg"),
             environment="",
             run_date=args.reports_run_date,
@@ -725,6 +1018,13 @@ def main():
             repo_url=repo_url,
             repo_branch=repo_branch,
             repo_path=repo_path,
+            spill_rows=getattr(args, "reports_spill_rows", 0),
+            workers=getattr(args, "reports_workers", 1),
+            ledger_path=getattr(args, "reports_ledger", None),
+            jamf_cache_path=getattr(args, "jamf_cache", None),
+            jamf_cache_ttl=getattr(args, "jamf_cache_ttl", 3600),
+            error_categories_path=getattr(args, "error_categories", None),
+            results_format=getattr(args, "results_format", None),
         )
         if rc:
             sys.exit(rc)
@@ -1,12 +1,99 @@
 from __future__ import annotations
 
+import atexit
+import json
 import logging
 import plistlib
+import re
+import shutil
 import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from itertools import chain
 from pathlib import Path
 
+from autopkg_wrapper.utils.command_runner import run_command
+from autopkg_wrapper.utils.recipe_index import (
+    get_recipe_index,
+    resolve_recipe_override_dir,
+)
+
+# autopkg preference set when trust is enforced in the same process rather
+# than via a separate `autopkg verify-trust-info` call. autopkg reads it with
+# get_pref, so it has to be in the prefs file it loads; `--key` would only
+# set a recipe input of that name.
+TRUST_ENFORCEMENT_PREF = "FAIL_RECIPES_WITHOUT_TRUST_INFO"
+
+# Recorded for a recipe whose next autopkg command would start after the
+# run deadline
+NOT_STARTED_MESSAGE = "Not started: the run deadline was reached"
+
+DEFAULT_AUTOPKG_PREFS = Path.home() / "Library/Preferences/com.github.autopkg.plist"
+
+_trust_prefs_lock = threading.Lock()
+_trust_prefs: dict[str, Path] = {}
+
+# Messages autopkg emits when a recipe is refused because its trust info is
+# missing or no longer matches its parent recipes.
+_TRUST_FAILURE_RE = re.compile(
+    r"trust\s+(?:info|verification)|TrustVerification|"
+    r"FAIL_RECIPES_WITHOUT_TRUST_INFO|parent recipe.*(?:changed|trust)",
+    re.IGNORECASE,
+)
+
+# Per-recipe verdict lines printed by `autopkg verify-trust-info`, e.g.
+# "Firefox.upload.jamf: OK" or "Firefox.upload.jamf: FAILED".
+_TRUST_VERDICT_RE = re.compile(r"^(?P<recipe>\S.*?):\s+(?P<verdict>OK|FAILED)\s*$")
+
+
+def trust_enforcing_prefs(autopkg_prefs: Path | str | None) -> Path:
+    """Get a prefs file that enforces trust, for `autopkg run --prefs`.
+
+    It is a copy of `autopkg_prefs` (or of the user's default autopkg prefs)
+    with TRUST_ENFORCEMENT_PREF set, written once per run to a private
+    temporary directory that is removed on exit.
+
+    Args:
+        autopkg_prefs: Prefs file passed with --autopkg-prefs, if any
+
+    Returns:
+        Path: The prefs file to pass to autopkg
+    """
+    source = Path(autopkg_prefs) if autopkg_prefs else DEFAULT_AUTOPKG_PREFS
+    with _trust_prefs_lock:
+        cached = _trust_prefs.get(str(source))
+        if cached is not None:
+            return cached
+
+        prefs = {}
+        try:
+            if source.suffix == ".json":
+                with open(source) as f:
+                    prefs = json.load(f)
+            else:
+                prefs = plistlib.loads(source.read_bytes())
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            if autopkg_prefs:
+                raise
+            logging.debug(f"Failed to read default autopkg prefs: {e}")
+        prefs[TRUST_ENFORCEMENT_PREF] = True
+
+        # The prefs may hold credentials, so keep the copy private
+        temp_dir = Path(tempfile.mkdtemp(prefix="autopkg_wrapper-prefs-"))
+        atexit.register(shutil.rmtree, temp_dir, ignore_errors=True)
+        if source.suffix == ".json":
+            path = temp_dir / "trust_enforcing_prefs.json"
+            path.write_text(json.dumps(prefs, indent=2))
+        else:
+            path = temp_dir / "trust_enforcing_prefs.plist"
+            path.write_bytes(plistlib.dumps(prefs))
+        _trust_prefs[str(source)] = path
+        return path
+
 
 class Recipe:
     def __init__(self, name: str, post_processors: list = None):
@@ -26,6 +113,10 @@ class Recipe:
         self.verified = None
         self.pr_url = None
         self.post_processors = post_processors
+        self.timings = {}  # Seconds spent per phase (e.g., "verify", "run", "queue")
+        self.report_path = None  # Report plist written by the last `run`
+        self.deadline = None  # time.monotonic() by which the whole run must end
+        self.attempts = 0  # Times `run` has been called
 
         self._keys = None
         self._has_run = False
@@ -39,6 +130,74 @@ class Recipe:
         """
         return self.name.split(".")[0]
 
+    @property
+    def duration(self):
+        """Get the seconds spent working on the recipe.
+
+        Returns:
+            float | None: Total of every timed phase except waiting in the
+            queue, or None if nothing has been timed
+        """
+        worked = [t for phase, t in self.timings.items() if phase != "queue"]
+        return sum(worked) if worked else None
+
+    def record_timing(self, phase: str, seconds: float) -> None:
+        """Add `seconds` to the time recorded for `phase`."""
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def log_path(self, args) -> Path | None:
+        """Get the file autopkg output for this recipe is written to.
+
+        Returns:
+            Path | None: `<identifier>.log` in --recipe-log-dir, or None if
+            per-recipe logs are off
+        """
+        log_dir = getattr(args, "recipe_log_dir", None)
+        return Path(log_dir) / f"{self.identifier}.log" if log_dir else None
+
+    def command_timeout(self, args) -> float | None:
+        """Get how long the next autopkg command for this recipe may run.
+
+        Returns:
+            float | None: The lesser of --recipe-timeout and the time left
+            before `deadline`, or None if neither applies
+        """
+        limits = []
+        recipe_timeout = getattr(args, "recipe_timeout", 0) or 0
+        if recipe_timeout > 0:
+            limits.append(float(recipe_timeout))
+        if self.deadline is not None:
+            limits.append(max(0.0, self.deadline - time.monotonic()))
+        return min(limits) if limits else None
+
+    def past_deadline(self) -> bool:
+        """Whether the run deadline has been reached, so no command may start."""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def mark_timed_out(self, message: str) -> None:
+        """Record that an autopkg command for this recipe was stopped."""
+        logging.error(f"{self.identifier}: {message}")
+        self.error = True
+        self.results = {
+            "failed": [{"message": message}],
+            "imported": "",
+            "timed_out": True,
+        }
+
+    def prepare_retry(self) -> None:
+        """Clear the outcome of a failed run so the recipe can run again."""
+        self.error = False
+        self.results = {}
+
+    @contextmanager
+    def timed(self, phase: str):
+        """Record how long the enclosed block takes as part of `phase`."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record_timing(phase, time.monotonic() - started)
+
     @property
     def identifier(self):
         """Get the recipe identifier.
@@ -55,6 +214,10 @@ class Recipe:
         return self.name
 
     def verify_trust_info(self, args):
+        with self.timed("verify"):
+            return self._verify_trust_info(args)
+
+    def _verify_trust_info(self, args):
         verbose_output = ["-vvvv"] if args.debug else []
         prefs_file = (
             ["--prefs", args.autopkg_prefs.as_posix()] if args.autopkg_prefs else []
@@ -70,15 +233,37 @@ class Recipe:
             logging.info("Dry run: would verify trust info for %s", self.identifier)
             return self.verified
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
+        if self.past_deadline():
+            self.mark_timed_out(NOT_STARTED_MESSAGE)
+            return self.verified
+
+        result = run_command(
+            cmd,
+            label=self.identifier,
+            log_path=self.log_path(args),
+            timeout=self.command_timeout(args),
+        )
+        if result.timed_out:
+            # Neither trusted nor untrusted: the recipe is failed as is,
+            # rather than having its trust info rewritten
+            self.mark_timed_out("Trust verification timed out")
+        elif result.returncode == 0:
             self.verified = True
         else:
             self.results["message"] = (result.stderr or "").strip()
             self.verified = False
         return self.verified
 
-    def update_trust_info(self, args):
+    def update_trust_info(self, args, tidy: bool = True):
+        with self.timed("update_trust"):
+            updated = self._update_trust_info(args)
+
+        # Tidy the recipe file if it's a YAML recipe, unless the caller runs
+        # tidying as a separate step
+        if updated and tidy:
+            self.tidy_after_trust_update(args)
+
+    def _update_trust_info(self, args) -> bool:
         prefs_file = (
             ["--prefs", args.autopkg_prefs.as_posix()] if args.autopkg_prefs else []
         )
@@ -87,22 +272,24 @@ class Recipe:
 
         if getattr(args, "dry_run", False):
             logging.info("Dry run: would update trust info for %s", self.identifier)
-            return
+            return False
 
         # Fail loudly if this exits 0
         try:
-            subprocess.check_call(cmd)
-        except subprocess.CalledProcessError as e:
+            subprocess.check_call(cmd, timeout=self.command_timeout(args))
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
             logging.error(str(e))
             raise e
+        return True
 
-        # Tidy the recipe file if it's a YAML recipe
-        self._tidy_recipe_after_trust_update(args)
-
-    def _tidy_recipe_after_trust_update(self, args):
+    def tidy_after_trust_update(self, args):
         """Tidy YAML recipe files after trust info update."""
+        with self.timed("tidy"):
+            self._tidy_after_trust_update(args)
+
+    def _tidy_after_trust_update(self, args):
         # Find the recipe file path first
-        recipe_path = self._find_recipe_file_path(args)
+        recipe_path = self.find_recipe_file_path(args)
         if not recipe_path or not recipe_path.exists():
             logging.debug(f"Could not find recipe file to tidy: {self.name}")
             return
@@ -131,85 +318,24 @@ class Recipe:
         except Exception as e:
             logging.warning(f"Failed to tidy recipe {self.name}: {e}")
 
-    def _find_recipe_file_path(self, args) -> Path | None:
-        """Find the full path to the recipe file."""
-        import json
-
-        # Try to get recipe override directory from args or prefs
-        recipe_override_dir = None
-
-        if getattr(args, "overrides_repo_path", None):
-            recipe_override_dir = Path(args.overrides_repo_path)
-            logging.debug(f"Using overrides_repo_path: {recipe_override_dir}")
-        elif getattr(args, "autopkg_prefs", None):
-            autopkg_prefs_path = Path(args.autopkg_prefs).resolve()
-            try:
-                if autopkg_prefs_path.suffix == ".json":
-                    with open(autopkg_prefs_path) as f:
-                        autopkg_prefs = json.load(f)
-                elif autopkg_prefs_path.suffix == ".plist":
-                    autopkg_prefs = plistlib.loads(autopkg_prefs_path.read_bytes())
-                else:
-                    return None
-
-                recipe_override_dir = Path(
-                    autopkg_prefs.get("RECIPE_OVERRIDE_DIRS", "")
-                ).resolve()
-                logging.debug(
-                    f"Using RECIPE_OVERRIDE_DIRS from prefs: {recipe_override_dir}"
-                )
-            except Exception as e:
-                logging.debug(f"Failed to read autopkg prefs: {e}")
-                return None
-        else:
-            # Try default location
-            user_home = Path.home()
-            autopkg_prefs_path = (
-                user_home / "Library/Preferences/com.github.autopkg.plist"
-            )
-            if autopkg_prefs_path.is_file():
-                try:
-                    autopkg_prefs = plistlib.loads(
-                        autopkg_prefs_path.resolve().read_bytes()
-                    )
-                    recipe_override_dir = Path(
-                        autopkg_prefs.get("RECIPE_OVERRIDE_DIRS", "")
-                    ).resolve()
-                    logging.debug(
-                        f"Using RECIPE_OVERRIDE_DIRS from default prefs: {recipe_override_dir}"
-                    )
-                except Exception as e:
-                    logging.debug(f"Failed to read default autopkg prefs: {e}")
-                    return None
+    def find_recipe_file_path(self, args) -> Path | None:
+        """Find the full path to the recipe file using the shared override index."""
+        recipe_override_dir = resolve_recipe_override_dir(
+            getattr(args, "overrides_repo_path", None),
+            getattr(args, "autopkg_prefs", None),
+        )
 
         if not recipe_override_dir or not recipe_override_dir.exists():
             logging.debug(f"Recipe override directory not found: {recipe_override_dir}")
             return None
 
-        # Search for the recipe file with common extensions
-        # Recipe files can be: Name.recipe.yaml, Name.recipe, Name.recipe.plist
-        possible_extensions = [".recipe.yaml", ".recipe", ".recipe.plist"]
-
-        for ext in possible_extensions:
-            recipe_file = recipe_override_dir / f"{self.name}{ext}"
-            if recipe_file.exists():
-                logging.debug(f"Found recipe file: {recipe_file}")
-                return recipe_file
+        entry = get_recipe_index(recipe_override_dir).lookup(self.name)
+        if entry is None:
+            logging.debug(f"Recipe file not found for {self.name}")
+            return None
 
-        # Search in subdirectories
-        logging.debug(
-            f"Searching subdirectories of {recipe_override_dir} for {self.name}"
-        )
-        for root, _dirs, files in recipe_override_dir.walk():
-            for ext in possible_extensions:
-                full_name = f"{self.name}{ext}"
-                if full_name in files:
-                    found_path = root / full_name
-                    logging.debug(f"Found recipe file in subdirectory: {found_path}")
-                    return found_path
-
-        logging.debug(f"Recipe file not found for {self.name}")
-        return None
+        logging.debug(f"Found recipe file: {entry.path}")
+        return entry.path
 
     def _parse_report(self, report):
         with open(report, "rb") as f:
@@ -226,7 +352,47 @@ class Recipe:
 
         return {"imported": imported_items, "failed": failed_items}
 
-    def run(self, args):
+    def _trust_failure_message(self, report, result) -> str | None:
+        """Return the trust failure message from a trust-enforced run, if any.
+
+        The report plist failures are checked first, falling back to stderr when
+        the report is empty or unreadable.
+        """
+        try:
+            with open(report, "rb") as f:
+                failures = plistlib.load(f).get("failures", []) or []
+        except Exception:  # pylint: disable=broad-exception-caught
+            failures = []
+
+        for failure in failures:
+            message = (
+                failure.get("message", "")
+                if isinstance(failure, dict)
+                else str(failure)
+            )
+            if _TRUST_FAILURE_RE.search(message or ""):
+                return message.strip()
+
+        stderr = (result.stderr or "").strip()
+        if result.returncode != 0 and _TRUST_FAILURE_RE.search(stderr):
+            return stderr
+        return None
+
+    def run(self, args, enforce_trust: bool = False):
+        """Run the recipe with `autopkg run`.
+
+        Args:
+            args: Parsed command-line arguments
+            enforce_trust: Run with FAIL_RECIPES_WITHOUT_TRUST_INFO so autopkg
+                verifies trust itself. `verified` is then set from the outcome,
+                and a trust failure leaves the recipe in the same state as a
+                failed `verify_trust_info` call.
+        """
+        self.attempts += 1
+        with self.timed("run"):
+            return self._run(args, enforce_trust)
+
+    def _run(self, args, enforce_trust: bool):
         if getattr(args, "dry_run", False):
             prefs_file = (
                 ["--prefs", args.autopkg_prefs.as_posix()] if args.autopkg_prefs else []
@@ -251,6 +417,12 @@ class Recipe:
                 + prefs_file
                 + post_processor_cmd
             )
+            if enforce_trust:
+                logging.info(
+                    "Dry run: would run %s with %s set in its prefs",
+                    self.identifier,
+                    TRUST_ENFORCEMENT_PREF,
+                )
             logging.info("Dry run: would run recipe %s", self.identifier)
             logging.debug(f"cmd: {cmd}")
             return self
@@ -260,6 +432,8 @@ class Recipe:
                 {"message": self.results.get("message", "Trust verification failed")}
             ]
             self.results["imported"] = ""
+        elif self.past_deadline():
+            self.mark_timed_out(NOT_STARTED_MESSAGE)
         else:
             report_dir = Path("/private/tmp/autopkg")
             report_time = datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
@@ -268,13 +442,18 @@ class Recipe:
             report_dir.mkdir(parents=True, exist_ok=True)
             report = report_dir / report_name
             report.touch(exist_ok=True)
+            self.report_path = report
 
             try:
-                prefs_file = (
-                    ["--prefs", args.autopkg_prefs.as_posix()]
-                    if args.autopkg_prefs
-                    else []
-                )
+                if enforce_trust:
+                    prefs_file = [
+                        "--prefs",
+                        trust_enforcing_prefs(args.autopkg_prefs).as_posix(),
+                    ]
+                elif args.autopkg_prefs:
+                    prefs_file = ["--prefs", args.autopkg_prefs.as_posix()]
+                else:
+                    prefs_file = []
                 verbose_output = ["-vvvv"] if args.debug else []
                 post_processor_cmd = (
                     list(
@@ -296,7 +475,24 @@ class Recipe:
                 )
                 logging.debug(f"cmd: {cmd}")
 
-                result = subprocess.run(cmd, capture_output=True, text=True)
+                timeout = self.command_timeout(args)
+                result = run_command(
+                    cmd,
+                    label=self.identifier,
+                    log_path=self.log_path(args),
+                    timeout=timeout,
+                )
+                if result.timed_out:
+                    self.mark_timed_out(f"autopkg run timed out after {timeout:.0f}s")
+                    return self
+                if enforce_trust:
+                    trust_message = self._trust_failure_message(report, result)
+                    if trust_message is not None:
+                        self.verified = False
+                        self.results = {"message": trust_message}
+                        return self
+                    self.verified = True
+
                 if result.returncode == 0:
                     report_info = self._parse_report(report)
                     self.results = report_info
@@ -315,3 +511,141 @@ class Recipe:
                 self.results["imported"] = ""
 
         return self
+
+
+def _parse_trust_verdicts(output: str) -> list[tuple[str, bool, list[str]]]:
+    """Split verify-trust-info output into (recipe, passed, detail lines) tuples."""
+    verdicts: list[tuple[str, bool, list[str]]] = []
+    for line in output.splitlines():
+        m = _TRUST_VERDICT_RE.match(line)
+        if m:
+            verdicts.append((m.group("recipe"), m.group("verdict") == "OK", []))
+        elif verdicts and line.strip():
+            verdicts[-1][2].append(line.strip())
+    return verdicts
+
+
+def _verify_trust_info_chunk(chunk: list[Recipe], args, index: int = 1) -> None:
+    verbose_output = ["-vvvv"] if args.debug else ["-v"]
+    prefs_file = (
+        ["--prefs", args.autopkg_prefs.as_posix()] if args.autopkg_prefs else []
+    )
+    cmd = (
+        [args.autopkg_bin, "verify-trust-info"]
+        + [r.name for r in chunk]
+        + verbose_output
+        + prefs_file
+    )
+    logging.debug(f"cmd: {cmd}")
+    log_dir = getattr(args, "recipe_log_dir", None)
+    # One process checks the whole chunk, so its output can't be split into
+    # per-recipe logs. Chunks run concurrently, so each gets its own file.
+    log_path = Path(log_dir) / f"verify-trust-info-{index}.log" if log_dir else None
+    # Allow each recipe in the chunk its own --recipe-timeout, within the
+    # time left for the run
+    limits = []
+    recipe_timeout = getattr(args, "recipe_timeout", 0) or 0
+    if recipe_timeout > 0:
+        limits.append(float(recipe_timeout * len(chunk)))
+    deadlines = [r.deadline for r in chunk if r.deadline is not None]
+    if deadlines:
+        limits.append(max(0.0, min(deadlines) - time.monotonic()))
+    timeout = min(limits) if limits else None
+    if timeout == 0.0:
+        # Past the deadline: leave the chunk unverified so each recipe is
+        # marked as not started rather than spawning autopkg to kill it
+        return
+
+    started = time.monotonic()
+    try:
+        # Every verdict line is needed, so keep the whole output
+        result = run_command(
+            cmd,
+            label="verify-trust-info",
+            log_path=log_path,
+            tail_lines=None,
+            timeout=timeout,
+        )
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logging.warning(f"Batched trust verification failed to run: {e}")
+        return
+    finally:
+        # The chunk's recipes share one process, so they share its time
+        elapsed = time.monotonic() - started
+        for recipe in chunk:
+            recipe.record_timing("verify", elapsed / len(chunk))
+
+    if result.timed_out:
+        logging.warning(
+            "Batched trust verification timed out; falling back to per-recipe checks"
+        )
+        return
+
+    verdicts: dict[str, list[tuple[bool, list[str]]]] = {}
+    for output in (result.stdout or "", result.stderr or ""):
+        for name, passed, details in _parse_trust_verdicts(output):
+            verdicts.setdefault(name, []).append((passed, details))
+
+    names = [r.name for r in chunk]
+    failed_count = sum(
+        1 for found in verdicts.values() for passed, _details in found if not passed
+    )
+    if (result.returncode == 0) != (failed_count == 0):
+        # The exit status disagrees with the verdicts we parsed, so none of
+        # them can be trusted; leave the whole chunk for per-recipe checks.
+        logging.debug(
+            f"verify-trust-info exit code {result.returncode} does not match "
+            f"{failed_count} parsed failures; falling back to per-recipe checks"
+        )
+        return
+
+    for recipe in chunk:
+        found = verdicts.get(recipe.name, [])
+        if len(found) != 1 or names.count(recipe.name) != 1:
+            logging.debug(
+                f"Ambiguous trust verification output for {recipe.name}; "
+                "it will be verified on its own"
+            )
+            continue
+        passed, details = found[0]
+        if passed:
+            recipe.verified = True
+        else:
+            recipe.results["message"] = (
+                "\n".join(details) if details else "Trust verification failed"
+            )
+            recipe.verified = False
+
+
+def verify_trust_info_batch(
+    recipes: list[Recipe], args, batch_size: int, max_workers: int = 1
+) -> list[Recipe]:
+    """Verify trust info for many recipes with one autopkg process per chunk.
+
+    `autopkg verify-trust-info` accepts several recipes at once and prints an
+    OK/FAILED verdict for each. Verdicts are parsed back onto each `Recipe`.
+    Recipes whose verdict is missing, duplicated or contradicted by the exit
+    code keep `verified = None` so the caller can verify them individually.
+
+    Args:
+        recipes: Recipes to verify
+        args: Parsed command-line arguments
+        batch_size: Maximum number of recipes per autopkg invocation
+        max_workers: Number of chunks to verify in parallel
+
+    Returns:
+        Recipes that still need a per-recipe `verify_trust_info` call
+    """
+    chunks = [recipes[i : i + batch_size] for i in range(0, len(recipes), batch_size)]
+    logging.info(
+        f"Verifying trust info for {len(recipes)} recipes in {len(chunks)} batches"
+    )
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [
+            executor.submit(_verify_trust_info_chunk, chunk, args, index)
+            for index, chunk in enumerate(chunks, start=1)
+        ]
+        for future in futures:
+            future.result()
+
+    return [r for r in recipes if r.verified is None]
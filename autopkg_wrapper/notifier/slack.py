@@ -1,16 +1,23 @@
 import json
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
+from requests.adapters import HTTPAdapter
 
+# Slack rejects messages with more than 100 attachments
+DIGEST_ATTACHMENT_LIMIT = 100
+_RETRY_5XX = (500, 502, 503, 504)
 
-def send_notification(recipe, token):
-    logging.debug("Preparing Slack notification")
 
-    if token is None:
-        logging.error("Skipping Slack Notification as no SLACK_WEBHOOK_TOKEN defined!")
-        return
+def build_attachment(recipe):
+    """Build the Slack attachment describing a recipe's outcome.
 
+    Returns:
+        dict: Slack attachment, or None if the recipe needs no notification
+    """
     recipe_identifier = getattr(recipe, "identifier", None) or recipe.name
 
     if recipe.verified is False:
@@ -39,33 +46,41 @@ def send_notification(recipe, token):
                 task_description = f"Error: {error_message}"
 
             if "No releases found for repo" in task_description:
-                return
+                return None
     elif recipe.updated:
         task_title = f"{recipe_identifier} has been uploaded to Jamf"
         task_description = f"It's time to test {recipe_identifier}!"
     else:
+        return None
+
+    return {
+        "username": "Autopkg",
+        "as_user": True,
+        "title": task_title,
+        "color": "warning"
+        if not recipe.verified
+        else "good"
+        if not recipe.error
+        else "danger",
+        "text": task_description,
+        "mrkdwn_in": ["text"],
+    }
+
+
+def send_notification(recipe, token):
+    logging.debug("Preparing Slack notification")
+
+    if token is None:
+        logging.error("Skipping Slack Notification as no SLACK_WEBHOOK_TOKEN defined!")
+        return
+
+    attachment = build_attachment(recipe)
+    if attachment is None:
         return
 
     response = requests.post(
         token,
-        data=json.dumps(
-            {
-                "attachments": [
-                    {
-                        "username": "Autopkg",
-                        "as_user": True,
-                        "title": task_title,
-                        "color": "warning"
-                        if not recipe.verified
-                        else "good"
-                        if not recipe.error
-                        else "danger",
-                        "text": task_description,
-                        "mrkdwn_in": ["text"],
-                    }
-                ]
-            }
-        ),
+        data=json.dumps({"attachments": [attachment]}),
         headers={"Content-Type": "application/json"},
     )
     if response.status_code != 200:
@@ -73,3 +88,136 @@ def send_notification(recipe, token):
             "Request to slack returned an error "
             f"{response.status_code}, the response is:\n{response.text}"
         )
+
+
+class SlackDispatcher:
+    """Deliver Slack notifications for a run over one pooled HTTP session.
+
+    Messages are posted from a small thread pool so a slow webhook doesn't
+    hold up the run. A 429 response pauses every sender for the Retry-After
+    period before retrying, and 5xx responses are retried with backoff. A
+    message that still fails is logged rather than raised so the remaining
+    notifications are delivered.
+
+    With `digest=True` nothing is sent until `close()`, which posts every
+    recipe outcome as a single message (split only if it exceeds Slack's
+    attachment limit).
+    """
+
+    def __init__(
+        self,
+        token,
+        max_workers: int = 4,
+        digest: bool = False,
+        max_retries: int = 3,
+        timeout: float = 30,
+        session: requests.Session | None = None,
+    ):
+        self.token = token
+        self.digest = digest
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.max_workers = max(1, max_workers)
+        self.sent = 0
+        self.failed = 0
+
+        self._session = session or requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=self.max_workers)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._futures = []
+        self._digest_attachments = []
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+        if token is None:
+            logging.error(
+                "Skipping Slack Notification as no SLACK_WEBHOOK_TOKEN defined!"
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, recipe) -> None:
+        """Queue the notification for a recipe, if it needs one."""
+        if self.token is None:
+            return
+        attachment = build_attachment(recipe)
+        if attachment is None:
+            return
+        if self.digest:
+            with self._lock:
+                self._digest_attachments.append(attachment)
+            return
+        self._futures.append(self._executor.submit(self._post, [attachment]))
+
+    def close(self) -> None:
+        """Send any digest and wait for every queued message."""
+        if self.digest and self._digest_attachments:
+            attachments = self._digest_attachments
+            self._digest_attachments = []
+            for start in range(0, len(attachments), DIGEST_ATTACHMENT_LIMIT):
+                chunk = attachments[start : start + DIGEST_ATTACHMENT_LIMIT]
+                self._futures.append(self._executor.submit(self._post, chunk))
+        for future in self._futures:
+            future.result()
+        self._futures = []
+        self._executor.shutdown(wait=True)
+        self._session.close()
+        if self.sent or self.failed:
+            logging.info(f"Slack notifications: {self.sent} sent, {self.failed} failed")
+
+    def _wait_for_rate_limit(self) -> None:
+        while True:
+            with self._lock:
+                delay = self._paused_until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def _post(self, attachments) -> bool:
+        data = json.dumps({"attachments": attachments})
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_rate_limit()
+            try:
+                response = self._session.post(
+                    self.token,
+                    data=data,
+                    headers={"Content-Type": "application/json"},
+                    timeout=self.timeout,
+                )
+            except requests.RequestException as e:
+                status, text, retry_after = None, str(e), None
+            else:
+                status, text = response.status_code, response.text
+                retry_after = response.headers.get("Retry-After")
+                if status == 200:
+                    with self._lock:
+                        self.sent += 1
+                    return True
+
+            if attempt == self.max_retries or status not in (None, 429, *_RETRY_5XX):
+                break
+            if status == 429:
+                try:
+                    delay = float(retry_after)
+                except (TypeError, ValueError):
+                    delay = 1.0
+                logging.warning(f"Slack rate limited the run; pausing {delay}s")
+                with self._lock:
+                    self._paused_until = max(
+                        self._paused_until, time.monotonic() + delay
+                    )
+            else:
+                time.sleep(min(2**attempt, 10) * 0.5)
+
+        with self._lock:
+            self.failed += 1
+        logging.error(
+            f"Request to slack returned an error {status}, the response is:\n{text}"
+        )
+        return False
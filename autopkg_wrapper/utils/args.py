@@ -3,6 +3,8 @@ import os
 from datetime import datetime
 from pathlib import Path
 
+from autopkg_wrapper.utils.recipe_batching import RESOURCE_CLASSES
+
 
 def getenv_with_default(key: str, default):
     """Get environment variable, treating blank strings as unset.
@@ -60,6 +62,23 @@ def validate_directory(arg):
         raise argparse.ArgumentTypeError(message)
 
 
+def validate_class_limits(arg):
+    """Parse "jamf=3,download=15" into {"jamf": 3, "download": 15}."""
+    if isinstance(arg, dict):
+        return arg
+    limits = {}
+    for item in arg.replace(",", " ").split():
+        name, sep, value = item.partition("=")
+        if not sep or name not in RESOURCE_CLASSES or not value.isdigit():
+            message = (
+                f"Error! Expected <class>=<limit> with a class from "
+                f"{', '.join(RESOURCE_CLASSES)}: {item}"
+            )
+            raise argparse.ArgumentTypeError(message)
+        limits[name] = max(1, int(value))
+    return limits
+
+
 def validate_bool(arg):
     if isinstance(arg, bool):
         return arg
@@ -149,6 +168,19 @@ def setup_args():
             of this application.
             """,
     )
+    parser.add_argument(
+        "--combine-trust-and-run",
+        default=validate_bool(os.getenv("AW_COMBINE_TRUST_AND_RUN", False)),
+        action="store_true",
+        help="""
+            Verify trust and run each recipe in a single `autopkg run` invocation with
+            FAIL_RECIPES_WITHOUT_TRUST_INFO set, instead of calling `autopkg verify-trust-info` first.
+            The preference is set in a temporary copy of --autopkg-prefs (or of the default autopkg prefs).
+            Trust info is only updated for recipes that autopkg refuses to run because of a trust failure.
+            Has no effect when --disable-recipe-trust-check is used.
+            Can also be set via AW_COMBINE_TRUST_AND_RUN.
+            """,
+    )
     parser.add_argument(
         "--update-trust-only",
         action="store_true",
@@ -159,6 +191,16 @@ def setup_args():
             Supports glob patterns in --recipes (e.g., "overrides/**/*.recipe.yaml").
             """,
     )
+    parser.add_argument(
+        "--trust-verify-batch-size",
+        type=int,
+        default=int(getenv_with_default("AW_TRUST_VERIFY_BATCH_SIZE", "1")),
+        help="""
+            Number of recipes to pass to a single `autopkg verify-trust-info` call in --update-trust-only mode (default: 1).
+            Recipes whose result can't be read from the batched output are verified individually.
+            Can also be set via AW_TRUST_VERIFY_BATCH_SIZE.
+            """,
+    )
     parser.add_argument(
         "--disable-git-commands",
         action="store_true",
@@ -166,17 +208,158 @@ def setup_args():
             If this option is used, git commands won't be run
             """,
     )
+    parser.add_argument(
+        "--disable-recipe-index-cache",
+        action="store_true",
+        help="""
+            Don't read or write the recipe index cache stored under the override repo's .git directory.
+            Recipe discovery will walk the override directories from scratch on every run.
+            """,
+    )
     parser.add_argument(
         "--concurrency",
         type=int,
         default=int(getenv_with_default("AW_CONCURRENCY", "10")),
-        help="Number of recipes to run in parallel (default: 10)",
+        help="""
+            Number of recipes to run in parallel (default: 10). With
+            --adaptive-concurrency, the most that may run at once.
+            """,
+    )
+    parser.add_argument(
+        "--class-concurrency",
+        type=validate_class_limits,
+        default=os.getenv("AW_CLASS_CONCURRENCY", None),
+        help="""
+            Limits on how many recipes of each resource class run at once,
+            within --concurrency, as a comma-separated list such as
+            "jamf=3,download=15". Classes come from the recipe type:
+            download, pkg, jamf (.jamf and .jss recipes) and other.
+            Classes not listed are only limited by --concurrency.
+            Can also be set via AW_CLASS_CONCURRENCY.
+            """,
+    )
+    parser.add_argument(
+        "--adaptive-concurrency",
+        default=validate_bool(os.getenv("AW_ADAPTIVE_CONCURRENCY", False)),
+        action="store_true",
+        help="""
+            Adjust how many recipes run at once as the run goes, between
+            --min-concurrency and --concurrency. It starts at the CPU count,
+            steps down when the load average or memory use is high or
+            throughput drops, and steps up while recipes are waiting.
+            Changes are logged.
+            Can also be set via AW_ADAPTIVE_CONCURRENCY.
+            """,
+    )
+    parser.add_argument(
+        "--min-concurrency",
+        type=int,
+        default=int(getenv_with_default("AW_MIN_CONCURRENCY", "1")),
+        help="""
+            The fewest recipes --adaptive-concurrency runs at once
+            (default: 1).
+            Can also be set via AW_MIN_CONCURRENCY.
+            """,
+    )
+    parser.add_argument(
+        "--duration-history",
+        default=os.getenv("AW_DURATION_HISTORY", None),
+        help="""
+            Path to a file of per-recipe run durations. Each run updates it,
+            and --schedule longest-first uses it to start slow recipes early.
+            Can also be set via AW_DURATION_HISTORY.
+            """,
+    )
+    parser.add_argument(
+        "--schedule",
+        choices=["order", "longest-first"],
+        default=getenv_with_default("AW_SCHEDULE", "order"),
+        help="""
+            Which ready recipes start first when a worker is free.
+            order (default) follows the recipe list order.
+            longest-first starts the recipes expected to take longest, using
+            --duration-history, counting the recipes that must follow them
+            under --recipe-processing-order.
+            Can also be set via AW_SCHEDULE.
+            """,
+    )
+    parser.add_argument(
+        "--recipe-timeout",
+        type=int,
+        default=int(getenv_with_default("AW_RECIPE_TIMEOUT", "0")),
+        help="""
+            Seconds each autopkg command for a recipe may run before its
+            process group is killed and the recipe is marked as timed out.
+            0 (default) means no limit.
+            Can also be set via AW_RECIPE_TIMEOUT.
+            """,
+    )
+    parser.add_argument(
+        "--run-timeout",
+        type=int,
+        default=int(getenv_with_default("AW_RUN_TIMEOUT", "0")),
+        help="""
+            Seconds the recipes in this run may take in total. Once they are
+            up no more recipes are started, and autopkg commands still
+            running are killed. Set it below the CI job's own limit to leave
+            time for reports, git and notifications.
+            0 (default) means no limit.
+            Can also be set via AW_RUN_TIMEOUT.
+            """,
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=int(getenv_with_default("AW_RETRIES", "0")),
+        help="""
+            How many more times to run a recipe that fails with a network or
+            download error (see --error-categories). Retries wait behind
+            recipes that haven't run yet. 0 (default) turns retries off.
+            Can also be set via AW_RETRIES.
+            """,
+    )
+    parser.add_argument(
+        "--retry-backoff",
+        type=int,
+        default=int(getenv_with_default("AW_RETRY_BACKOFF", "30")),
+        help="""
+            Seconds to wait before the first retry (default: 30). Each
+            further retry of the same recipe waits twice as long.
+            Can also be set via AW_RETRY_BACKOFF.
+            """,
+    )
+    parser.add_argument(
+        "--recipe-log-dir",
+        default=os.getenv("AW_RECIPE_LOG_DIR", None),
+        help="""
+            Directory to write each recipe's autopkg output to, as
+            <recipe identifier>.log, while it runs.
+            Can also be set via AW_RECIPE_LOG_DIR.
+            """,
     )
     parser.add_argument(
         "--slack-token",
         default=os.getenv("SLACK_WEBHOOK_TOKEN", None),
         help=argparse.SUPPRESS,
     )
+    parser.add_argument(
+        "--slack-digest",
+        default=validate_bool(os.getenv("AW_SLACK_DIGEST", False)),
+        action="store_true",
+        help="""
+            Send one Slack message summarising every recipe at the end of the run instead of one message per recipe.
+            Can also be set via AW_SLACK_DIGEST.
+            """,
+    )
+    parser.add_argument(
+        "--slack-concurrency",
+        type=int,
+        default=int(getenv_with_default("AW_SLACK_CONCURRENCY", "4")),
+        help="""
+            Number of Slack messages to send in parallel (default: 4).
+            Can also be set via AW_SLACK_CONCURRENCY.
+            """,
+    )
     parser.add_argument("--github-token", default=find_github_token())
     parser.add_argument(
         "--branch-name",
@@ -189,6 +372,29 @@ def setup_args():
             By default, this will be in the format of \"fix/update_trust_information/YYYY-MM-DDTHH-MM-SS\"
             """,
     )
+    parser.add_argument(
+        "--git-commit-mode",
+        choices=["per-recipe", "batched", "single"],
+        default=getenv_with_default("AW_GIT_COMMIT_MODE", "per-recipe"),
+        help="""
+            How trust updates are committed to the override repo.
+            per-recipe (default) commits, pulls and pushes after each recipe.
+            batched makes one commit per recipe, then pulls and pushes once.
+            single commits every updated override together, then pulls and pushes once.
+            Can also be set via AW_GIT_COMMIT_MODE.
+            """,
+    )
+    parser.add_argument(
+        "--git-backend",
+        choices=["subprocess", "cached"],
+        default=getenv_with_default("AW_GIT_BACKEND", "subprocess"),
+        help="""
+            How git commands are run against the override repo.
+            subprocess (default) runs a separate git command for every operation.
+            cached remembers the branch for the run and writes commits through a single git fast-import process.
+            Can also be set via AW_GIT_BACKEND.
+            """,
+    )
     parser.add_argument(
         "--create-pr",
         default=os.getenv("AW_CREATE_PR", False),
@@ -234,15 +440,30 @@ def setup_args():
     )
     parser.add_argument(
         "--reports-zip",
+        nargs="*",
         default=os.getenv("AW_REPORTS_ZIP", None),
-        help="Path to an autopkg_report-*.zip to extract and process",
+        help="""
+            One or more autopkg_report-*.zip files to process. Reports are
+            read from the zips in place. AW_REPORTS_ZIP accepts a
+            comma-separated list.
+            """,
+    )
+    parser.add_argument(
+        "--reports-extract",
+        action="store_true",
+        default=validate_bool(os.getenv("AW_REPORTS_EXTRACT", False)),
+        help="""
+            Extract report zips into --reports-extract-dir before processing
+            instead of reading them in place.
+            Can also be set via AW_REPORTS_EXTRACT.
+            """,
     )
     parser.add_argument(
         "--reports-extract-dir",
         default=getenv_with_default(
             "AW_REPORTS_EXTRACT_DIR", "autopkg_reports_summary/reports"
         ),
-        help="Directory to extract the zip into (default: autopkg_reports_summary/reports)",
+        help="Directory to extract zips into with --reports-extract (default: autopkg_reports_summary/reports)",
     )
     parser.add_argument(
         "--reports-dir",
@@ -266,5 +487,93 @@ def setup_args():
         action="store_true",
         help="Exit non-zero if any errors are detected in processed reports",
     )
+    parser.add_argument(
+        "--reports-spill-rows",
+        type=int,
+        default=int(getenv_with_default("AW_REPORTS_SPILL_ROWS", "0")),
+        help="""
+            Maximum number of summary table rows to hold in memory per table
+            while processing reports; further rows are spilled to a temporary
+            directory. 0 keeps every row in memory (default: 0).
+            Can also be set via AW_REPORTS_SPILL_ROWS.
+            """,
+    )
+    parser.add_argument(
+        "--reports-workers",
+        type=int,
+        default=int(getenv_with_default("AW_REPORTS_WORKERS", "1")),
+        help="""
+            Number of processes used to parse report files. Output is the
+            same as a serial parse (default: 1).
+            Can also be set via AW_REPORTS_WORKERS.
+            """,
+    )
+    parser.add_argument(
+        "--reports-ledger",
+        default=os.getenv("AW_REPORTS_LEDGER", None),
+        help="""
+            Path to a ledger file of already-parsed reports. When set, only
+            reports that are new or changed since the last run are parsed.
+            Can also be set via AW_REPORTS_LEDGER.
+            """,
+    )
+    parser.add_argument(
+        "--jamf-cache",
+        default=os.getenv("AW_JAMF_CACHE", None),
+        help="""
+            Path to a file caching Jamf package and policy lookups between
+            report runs. Can also be set via AW_JAMF_CACHE.
+            """,
+    )
+    parser.add_argument(
+        "--jamf-cache-ttl",
+        type=int,
+        default=int(getenv_with_default("AW_JAMF_CACHE_TTL", "3600")),
+        help="""
+            Seconds a cached Jamf lookup stays valid (default: 3600).
+            Can also be set via AW_JAMF_CACHE_TTL.
+            """,
+    )
+    parser.add_argument(
+        "--error-categories",
+        default=os.getenv("AW_ERROR_CATEGORIES", None),
+        help="""
+            Path to a JSON or YAML file of extra error categories used in
+            report summaries, checked before the built-in ones.
+            Can also be set via AW_ERROR_CATEGORIES.
+            """,
+    )
+    parser.add_argument(
+        "--slowest-recipes",
+        type=int,
+        default=int(getenv_with_default("AW_SLOWEST_RECIPES", "10")),
+        help="""
+            Number of recipes to list in the table of slowest recipes, with
+            the time each spent queued, verifying trust, running, updating
+            trust, tidying and in git, logged at the end of a run. Set to 0
+            to disable (default: 10).
+            Can also be set via AW_SLOWEST_RECIPES.
+            """,
+    )
+    parser.add_argument(
+        "--results-file",
+        default=os.getenv("AW_RESULTS_FILE", None),
+        help="""
+            Path to write one result row per recipe run (recipe, status,
+            duration, versions, packages, policies and error category).
+            Can also be set via AW_RESULTS_FILE.
+            """,
+    )
+    parser.add_argument(
+        "--results-format",
+        choices=["ndjson", "csv"],
+        default=getenv_with_default("AW_RESULTS_FORMAT", None),
+        help="""
+            Format of --results-file, newline-delimited JSON or CSV. Defaults
+            to the --results-file extension, else ndjson. When set,
+            --process-reports also writes a run_results file in this format.
+            Can also be set via AW_RESULTS_FORMAT.
+            """,
+    )
 
     return parser.parse_args()
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import subprocess
+import threading
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+
+# Lines of stdout and stderr kept in memory per command; the full output
+# only goes to the log file and the logger.
+OUTPUT_TAIL_LINES = 200
+
+# Seconds a timed-out command's process group gets to exit after SIGTERM
+# before it is sent SIGKILL
+KILL_GRACE_SECONDS = 5.0
+
+
+@dataclass(frozen=True)
+class CommandResult:
+    """Outcome of run_command.
+
+    Attributes:
+        returncode: Exit status of the command
+        stdout: The last lines of standard output (all of it if the
+            command was run with `tail_lines=None`)
+        stderr: The last lines of standard error, likewise
+        log_path: File the full output was appended to, if any
+        timed_out: Whether the command was killed for running past its
+            timeout
+    """
+
+    returncode: int
+    stdout: str
+    stderr: str
+    log_path: Path | None = None
+    timed_out: bool = False
+
+
+def _kill_process_group(process: subprocess.Popen) -> None:
+    """Stop a command started in its own session, and everything it spawned."""
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            return
+        try:
+            process.wait(timeout=KILL_GRACE_SECONDS)
+            return
+        except subprocess.TimeoutExpired:
+            continue
+
+
+def run_command(
+    cmd: list,
+    *,
+    label: str | None = None,
+    log_path: str | Path | None = None,
+    tail_lines: int | None = OUTPUT_TAIL_LINES,
+    timeout: float | None = None,
+) -> CommandResult:
+    """Run a command, streaming its output as it is produced.
+
+    Each line of stdout and stderr is logged at debug level (prefixed with
+    `label`) and, with `log_path`, appended to that file as it arrives, so
+    verbose output can be followed while the command runs. Only the last
+    `tail_lines` lines of each stream are kept in memory for the result.
+
+    With `timeout`, the command is started in its own session and, if it
+    is still running after `timeout` seconds, its whole process group
+    (autopkg and any curl, installer or upload processes it started) is
+    sent SIGTERM, then SIGKILL.
+
+    Args:
+        cmd: Command and arguments
+        label: Prefix for logged lines, usually the recipe identifier
+        log_path: Optional file to append the command and its output to
+        tail_lines: Lines of each stream to keep, or None to keep everything
+        timeout: Seconds the command may run for, or None for no limit
+
+    Returns:
+        CommandResult: Exit status and the kept output
+    """
+    cmd = [str(part) for part in cmd]
+    prefix = f"[{label}] " if label else ""
+    log_file = None
+    if log_path is not None:
+        log_path = Path(log_path)
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        log_file = open(log_path, "a", encoding="utf-8")  # noqa: SIM115
+        log_file.write(f"$ {' '.join(cmd)}\n")
+        log_file.flush()
+    write_lock = threading.Lock()
+
+    def pump(stream, tail: deque, stream_name: str) -> None:
+        for line in stream:
+            text = line.rstrip("\n")
+            logging.debug(f"{prefix}{text}")
+            with write_lock:
+                tail.append(line)
+                if log_file is None or log_file.closed:
+                    continue
+                log_file.write(
+                    f"{text}\n" if stream_name == "stdout" else f"[stderr] {text}\n"
+                )
+                log_file.flush()
+
+    stdout_tail: deque[str] = deque(maxlen=tail_lines)
+    stderr_tail: deque[str] = deque(maxlen=tail_lines)
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors="replace",
+            start_new_session=timeout is not None,
+        )
+        readers = [
+            threading.Thread(
+                target=pump, args=(process.stdout, stdout_tail, "stdout"), daemon=True
+            ),
+            threading.Thread(
+                target=pump, args=(process.stderr, stderr_tail, "stderr"), daemon=True
+            ),
+        ]
+        for reader in readers:
+            reader.start()
+        timed_out = False
+        try:
+            returncode = process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            logging.warning(
+                f"{prefix}Command timed out after {timeout:.0f}s; stopping it"
+            )
+            _kill_process_group(process)
+            returncode = process.wait()
+        for reader in readers:
+            # A process that left the group could still hold the pipes open
+            reader.join(timeout=KILL_GRACE_SECONDS if timed_out else None)
+        if not any(reader.is_alive() for reader in readers):
+            process.stdout.close()
+            process.stderr.close()
+        if log_file is not None:
+            with write_lock:
+                if timed_out:
+                    log_file.write(f"# timed out after {timeout:.0f}s\n")
+                log_file.write(f"# exit status {returncode}\n")
+    finally:
+        if log_file is not None:
+            with write_lock:
+                log_file.close()
+
+    with write_lock:
+        stdout, stderr = "".join(stdout_tail), "".join(stderr_tail)
+    return CommandResult(
+        returncode=returncode,
+        stdout=stdout,
+        stderr=stderr,
+        log_path=log_path,
+        timed_out=timed_out,
+    )
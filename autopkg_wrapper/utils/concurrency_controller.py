@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+# Seconds between resizing decisions; the 1-minute load average needs a
+# while to reflect a change anyway
+SAMPLE_INTERVAL = 15.0
+
+# Shrink when the 1-minute load average per CPU goes above this
+MAX_LOAD_PER_CPU = 1.25
+
+# Shrink quickly when less than this fraction of memory is available
+MIN_FREE_MEMORY = 0.10
+
+# A window this much slower than the one before counts as throughput
+# having fallen
+_THROUGHPUT_DROP = 0.9
+
+# Samples to hold off growing past a limit where throughput fell
+_CEILING_SAMPLES = 4
+
+_VM_STAT_RE = re.compile(r"^(Pages (?:free|inactive|speculative)):\s+(\d+)\.?$")
+
+
+def load_per_cpu() -> float | None:
+    """Return the 1-minute load average divided by the CPU count."""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+def free_memory_fraction() -> float | None:
+    """Return the fraction of physical memory available, if it can be read.
+
+    Uses MemAvailable from /proc/meminfo on Linux, and the free, inactive
+    and speculative page counts from `vm_stat` on macOS.
+    """
+    try:
+        if sys.platform == "darwin":
+            total = os.sysconf("SC_PHYS_PAGES")
+            output = subprocess.run(
+                ["vm_stat"], capture_output=True, text=True, check=True, timeout=5
+            ).stdout
+            free = sum(
+                int(m.group(2))
+                for m in map(_VM_STAT_RE.match, output.splitlines())
+                if m
+            )
+            return free / total if total else None
+        meminfo = {}
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                key, _sep, value = line.partition(":")
+                meminfo[key] = int(value.split()[0])
+        return meminfo["MemAvailable"] / meminfo["MemTotal"]
+    except (OSError, ValueError, KeyError, IndexError, subprocess.SubprocessError):
+        return None
+
+
+class ConcurrencyController:
+    """Grow or shrink the number of recipes run at once while they run.
+
+    Every `interval` seconds the controller looks at the load average,
+    available memory and how many recipes finished since the last look.
+    It steps down by a quarter when memory runs low and by one when the
+    machine is overloaded or throughput fell after the last step up.
+    Otherwise, if recipes were waiting for a worker, it steps up by one.
+    Every change is logged with the figures behind it.
+    """
+
+    def __init__(
+        self,
+        min_workers: int,
+        max_workers: int,
+        initial: int | None = None,
+        interval: float = SAMPLE_INTERVAL,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.min_workers = max(1, min(min_workers, self.max_workers))
+        if initial is None:
+            initial = os.cpu_count() or self.min_workers
+        self.limit = max(self.min_workers, min(initial, self.max_workers))
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._completed = 0
+        self._sampled_at: float | None = None
+        self._last_throughput: float | None = None
+        self._last_change = 0
+        self._ceiling: int | None = None
+        self._ceiling_samples = 0
+
+    def record_completion(self) -> None:
+        """Count a recipe that finished running."""
+        with self._lock:
+            self._completed += 1
+
+    def seconds_until_sample(self, now: float | None = None) -> float:
+        if self._sampled_at is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._sampled_at + self.interval - now)
+
+    def update(self, busy: bool, now: float | None = None) -> int:
+        """Resize the limit if a sample is due, and return it.
+
+        Args:
+            busy: Whether recipes are waiting for a worker at the limit
+            now: time.monotonic() value, for tests
+        """
+        now = time.monotonic() if now is None else now
+        if self._sampled_at is None:
+            self._sampled_at = now
+            return self.limit
+        elapsed = now - self._sampled_at
+        if elapsed < self.interval:
+            return self.limit
+
+        with self._lock:
+            completed, self._completed = self._completed, 0
+        self._sampled_at = now
+        throughput = completed * 60 / elapsed
+        load = load_per_cpu()
+        free = free_memory_fraction()
+
+        if self._ceiling is not None:
+            self._ceiling_samples -= 1
+            if self._ceiling_samples <= 0:
+                self._ceiling = None
+
+        new_limit = self.limit
+        reason = None
+        if free is not None and free < MIN_FREE_MEMORY:
+            new_limit -= max(1, self.limit // 4)
+            reason = "memory is low"
+        elif load is not None and load > MAX_LOAD_PER_CPU:
+            new_limit -= 1
+            reason = "load is high"
+        elif (
+            self._last_change > 0
+            and self._last_throughput
+            and throughput < self._last_throughput * _THROUGHPUT_DROP
+        ):
+            new_limit -= 1
+            reason = "throughput fell after the last increase"
+            self._ceiling = new_limit
+            self._ceiling_samples = _CEILING_SAMPLES
+        elif busy and (self._ceiling is None or self.limit < self._ceiling):
+            new_limit += 1
+            reason = "recipes are waiting for a worker"
+
+        new_limit = max(self.min_workers, min(new_limit, self.max_workers))
+        self._last_change = new_limit - self.limit
+        self._last_throughput = throughput
+        if new_limit != self.limit:
+            logging.info(
+                f"Concurrency {self.limit} -> {new_limit}: {reason} "
+                f"(load {_format(load, '.2f')}/CPU, "
+                f"{_format(free, '.0%')} memory free, "
+                f"{throughput:.1f} recipes/min)"
+            )
+            self.limit = new_limit
+        return self.limit
+
+
+def _format(value: float | None, spec: str) -> str:
+    return "unknown" if value is None else format(value, spec)
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from pathlib import Path
+
+# Categories in priority order: a message that mentions keywords from
+# several categories gets the first one listed.
+DEFAULT_ERROR_CATEGORIES: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("trust", ("trust",)),
+    ("signature", ("signature", "codesign")),
+    ("download", ("download", "fetch", "curl")),
+    ("network", ("proxy", "timeout", "network", "url", "dns")),
+    ("auth", ("401", "403", "auth", "token", "permission")),
+    ("jamf", ("jamf", "policy")),
+)
+
+FALLBACK_CATEGORY = "other"
+
+# Distinct messages remembered per classifier; a run usually repeats the
+# same handful of failures across many recipes.
+_MEMO_SIZE = 4096
+
+
+def _trie_pattern(keywords) -> str:
+    """Return a regex matching any of `keywords`, preferring the longest.
+
+    The alternation is factored into a prefix tree, so the regex engine
+    follows one branch per character instead of trying every keyword at
+    every position of the message.
+    """
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(node[ch]) for ch in sorted(node) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class ErrorClassifier:
+    """Sort error messages into categories by keyword.
+
+    Every keyword of every category is compiled into a single prefix-tree
+    pattern, so a message is scanned once however many categories and
+    keywords there are. Only when that finds a keyword from a lower
+    priority category is the rest of the message searched again, for the
+    keywords that would beat it. The result is the same as checking each
+    category in turn with substring tests. Results are memoised per
+    message.
+    """
+
+    def __init__(self, categories=DEFAULT_ERROR_CATEGORIES):
+        self.categories: tuple[tuple[str, tuple[str, ...]], ...] = tuple(
+            (str(name), tuple(str(k).lower() for k in keywords if str(k)))
+            for name, keywords in categories
+        )
+        self.category_names = [name for name, _keywords in self.categories] + [
+            FALLBACK_CATEGORY
+        ]
+        priorities: dict[str, int] = {}
+        for priority, (_name, keywords) in enumerate(self.categories):
+            for keyword in keywords:
+                priorities.setdefault(keyword, priority)
+        # A match is the longest keyword starting at its position; every
+        # keyword that is a prefix of it matched there too, so the match
+        # counts as the best priority among them.
+        self._priorities = {
+            keyword: min(p for k, p in priorities.items() if keyword.startswith(k))
+            for keyword in priorities
+        }
+        # _patterns[n] matches the keywords of the first n categories
+        self._patterns: list[re.Pattern | None] = [None]
+        for limit in range(1, len(self.categories) + 1):
+            keywords = [k for k, p in priorities.items() if p < limit]
+            self._patterns.append(
+                re.compile(_trie_pattern(keywords)) if keywords else None
+            )
+        self._memo: dict[str, str] = {}
+
+    def __reduce__(self):
+        # Rebuild from the table in worker processes rather than pickling
+        # the memo
+        return (type(self), (self.categories,))
+
+    @property
+    def fingerprint(self) -> str:
+        data = json.dumps(self.categories)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def classify(self, message: str) -> str:
+        category = self._memo.get(message)
+        if category is None:
+            category = self._classify(message)
+            if len(self._memo) >= _MEMO_SIZE:
+                self._memo.clear()
+            self._memo[message] = category
+        return category
+
+    def _classify(self, message: str) -> str:
+        text = message.lower()
+        best = len(self.categories)
+        pos = 0
+        while best and (pattern := self._patterns[best]) is not None:
+            match = pattern.search(text, pos)
+            if match is None:
+                break
+            # Keywords starting further on may overlap this match, so carry
+            # on from the next character with only the better categories
+            best = self._priorities[match.group()]
+            pos = match.start() + 1
+        if best == len(self.categories):
+            return FALLBACK_CATEGORY
+        return self.categories[best][0]
+
+
+def load_error_categories(path: str | Path) -> list[tuple[str, list[str]]]:
+    """Read extra error categories from a JSON or YAML file.
+
+    The file holds a `categories` list (or is the list itself) of
+    `{"name": ..., "keywords": [...]}` entries, in priority order.
+    """
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        if path.suffix in {".yaml", ".yml"}:
+            from ruamel.yaml import YAML
+
+            data = YAML(typ="safe").load(f)
+        else:
+            data = json.load(f)
+
+    if isinstance(data, dict):
+        data = data.get("categories")
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a list of error categories")
+
+    categories = []
+    for entry in data:
+        if not isinstance(entry, dict) or not entry.get("name"):
+            raise ValueError(f"{path}: each category needs a name: {entry!r}")
+        keywords = entry.get("keywords") or []
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        categories.append((str(entry["name"]), [str(k) for k in keywords]))
+    return categories
+
+
+def build_error_classifier(path: str | Path | None = None) -> ErrorClassifier:
+    """Return a classifier using the categories in `path`, if given.
+
+    Categories from the file are checked before the built-in ones. A file
+    category that shares a built-in category's name replaces it.
+    """
+    if not path:
+        return DEFAULT_ERROR_CLASSIFIER
+    custom = load_error_categories(path)
+    names = {name for name, _keywords in custom}
+    return ErrorClassifier(
+        [
+            *custom,
+            *(c for c in DEFAULT_ERROR_CATEGORIES if c[0] not in names),
+        ]
+    )
+
+
+DEFAULT_ERROR_CLASSIFIER = ErrorClassifier()
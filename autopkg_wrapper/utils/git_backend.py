@@ -0,0 +1,315 @@
+import logging
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+import autopkg_wrapper.utils.git_functions as git
+
+
+class SubprocessGitBackend:
+    """Run every git operation as its own `git` process.
+
+    This is the original behaviour of the wrapper and simply delegates to the
+    functions in git_functions.
+    """
+
+    name = "subprocess"
+
+    def __init__(self, git_info):
+        self.git_info = git_info
+
+    def get_current_branch(self):
+        return git.get_current_branch(self.git_info)
+
+    def create_branch(self):
+        return git.create_branch(self.git_info)
+
+    def stage_recipe(self):
+        return git.stage_recipe(self.git_info)
+
+    def stage_paths(self, paths):
+        return git.stage_paths(self.git_info, paths)
+
+    def commit_recipe(self, message):
+        return git.commit_recipe(self.git_info, message=message)
+
+    def pull_branch(self):
+        return git.pull_branch(self.git_info)
+
+    def push_branch(self):
+        return git.push_branch(self.git_info)
+
+    def close(self):
+        pass
+
+
+class CachedGitBackend(SubprocessGitBackend):
+    """Keep repo state for the run and write commits with `git fast-import`.
+
+    The current branch and tip commit are looked up once and remembered.
+    Commits of explicitly staged paths are streamed to a single long-lived
+    `git fast-import` process rather than running `git add` and `git commit`
+    per recipe. Like `git commit`, a commit whose paths all match the tip is
+    skipped. Pending commits are flushed, and the index synced to them,
+    before anything that talks to the remote; if fast-import fails, flush
+    raises CalledProcessError so the lost commits aren't pushed silently.
+    Staging every tracked change (`git add -u`) still goes through the index
+    and a regular `git commit`.
+    """
+
+    name = "cached"
+
+    def __init__(self, git_info):
+        super().__init__(git_info)
+        self.work_tree = Path(git_info["__work_tree"].removeprefix("--work-tree="))
+        self._branch = None
+        self._tip = None
+        self._needs_from = False
+        # (mode, blob id) of paths written by commits not yet flushed, or
+        # None for deleted paths
+        self._pending_blobs: dict[str, tuple[str, str] | None] = {}
+        self._staged: dict[str, Path] = {}
+        self._index_commit = False
+        self._committed_paths: set[str] = set()
+        self._fast_import = None
+        self._idents = None
+
+    def get_current_branch(self):
+        if self._branch is None:
+            self._branch = super().get_current_branch()
+        return self._branch
+
+    def create_branch(self):
+        self.flush()
+        new_branch = super().create_branch()
+        self._branch = (
+            self.git_info["override_trust_branch"]
+            if new_branch.returncode == 0
+            else None
+        )
+        return new_branch
+
+    def stage_recipe(self):
+        # The index is needed to find every tracked change, so fall back to
+        # a regular add/commit for this commit.
+        self.flush()
+        if self._staged:
+            super().stage_paths(self._staged.values())
+            self._staged.clear()
+        self._index_commit = True
+        return super().stage_recipe()
+
+    def stage_paths(self, paths):
+        for path in paths:
+            path = Path(path).resolve()
+            self._staged[path.relative_to(self.work_tree.resolve()).as_posix()] = path
+
+    def commit_recipe(self, message):
+        if self._index_commit or not self._staged:
+            self._index_commit = False
+            self.flush()
+            return super().commit_recipe(message)
+
+        if self._tip is None:
+            self._tip = git.git_run(
+                self.git_info["__git_dir"], "rev-parse", "HEAD"
+            ).stdout.strip()
+            self._needs_from = True
+        blobs = self._staged_blobs()
+        if all(self._tip_blob(rel) == blob for rel, blob in blobs.items()):
+            self._staged.clear()
+            logging.debug(f"Git Commit (fast-import): nothing to commit for {message}")
+            return subprocess.CompletedProcess(
+                ["git", "fast-import"],
+                1,
+                "nothing to commit, working tree clean\n",
+                "",
+            )
+
+        stream = self._fast_import_stream()
+        author, committer = self._commit_idents()
+        # Match `git commit -m`, which strips trailing whitespace and ends
+        # the message with a newline
+        message_bytes = (message.rstrip() + "\n").encode("utf-8")
+        lines = [
+            f"commit refs/heads/{self.get_current_branch()}".encode(),
+            f"author {author}".encode(),
+            f"committer {committer}".encode(),
+            f"data {len(message_bytes)}".encode(),
+            message_bytes,
+        ]
+        if self._needs_from:
+            lines.append(f"from {self._tip}".encode())
+            self._needs_from = False
+        for rel, path in self._staged.items():
+            quoted = _quote_path(rel)
+            if not path.exists():
+                lines.append(f"D {quoted}".encode())
+                continue
+            content = path.read_bytes()
+            mode = "100755" if os.access(path, os.X_OK) else "100644"
+            lines.append(f"M {mode} inline {quoted}".encode())
+            lines.append(f"data {len(content)}".encode())
+            lines.append(content)
+        self._committed_paths.update(self._staged)
+        self._pending_blobs.update(blobs)
+        self._staged.clear()
+
+        stream.write(b"\n".join(lines) + b"\n\n")
+        stream.flush()
+        logging.debug(f"Git Commit (fast-import): {message}")
+        return subprocess.CompletedProcess(["git", "fast-import"], 0, "", "")
+
+    def pull_branch(self):
+        self.flush()
+        self._tip = None
+        return super().pull_branch()
+
+    def push_branch(self):
+        self.flush()
+        return super().push_branch()
+
+    def flush(self):
+        """Finish pending fast-import commits and sync the index to them.
+
+        Raises:
+            subprocess.CalledProcessError: If fast-import failed, in which
+                case its commits were not made and the index is left alone
+        """
+        # The branch has moved on; look its tip up again on the next commit
+        self._tip = None
+        self._needs_from = False
+        self._pending_blobs.clear()
+        proc = self._fast_import
+        if proc is None:
+            return
+        self._fast_import = None
+        proc.stdin.write(b"done\n")
+        _stdout, stderr = proc.communicate()
+        if proc.returncode != 0:
+            self._committed_paths.clear()
+            stderr = stderr.decode(errors="replace")
+            logging.error(f"git fast-import failed: {stderr}")
+            raise subprocess.CalledProcessError(
+                proc.returncode, proc.args, stderr=stderr
+            )
+        if self._committed_paths:
+            reset = git.git_run(
+                self.git_info["__git_dir"],
+                self.git_info["__work_tree"],
+                "reset",
+                "-q",
+                "--",
+                *[str(self.work_tree / rel) for rel in sorted(self._committed_paths)],
+            )
+            logging.debug(f"Git Reset: {reset}")
+            self._committed_paths.clear()
+
+    def close(self):
+        self.flush()
+
+    def _staged_blobs(self) -> dict[str, tuple[str, str] | None]:
+        """Return the (mode, blob id) each staged path would be committed with."""
+        existing = {rel: path for rel, path in self._staged.items() if path.exists()}
+        ids = []
+        if existing:
+            ids = git.git_run(
+                self.git_info["__git_dir"],
+                "hash-object",
+                "--no-filters",
+                "--",
+                *[str(path) for path in existing.values()],
+            ).stdout.split()
+        blob_ids = dict(zip(existing, ids, strict=True))
+        return {
+            rel: (
+                ("100755" if os.access(path, os.X_OK) else "100644", blob_ids[rel])
+                if rel in blob_ids
+                else None
+            )
+            for rel, path in self._staged.items()
+        }
+
+    def _tip_blob(self, rel: str) -> tuple[str, str] | None:
+        """Return the (mode, blob id) of `rel` at the branch tip, or None."""
+        if rel in self._pending_blobs:
+            return self._pending_blobs[rel]
+        listing = git.git_run(
+            self.git_info["__git_dir"], "ls-tree", "-z", self._tip, "--", rel
+        ).stdout
+        if not listing:
+            return None
+        mode, _type, blob_id = listing.split("\t", 1)[0].split()
+        return mode, blob_id
+
+    def _fast_import_stream(self):
+        if self._fast_import is None:
+            self._fast_import = subprocess.Popen(
+                [
+                    "git",
+                    self.git_info["__git_dir"],
+                    "fast-import",
+                    "--quiet",
+                    "--done",
+                ],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+        return self._fast_import.stdin
+
+    def _commit_idents(self):
+        if self._idents is None:
+            # `git var` honours GIT_AUTHOR_*/GIT_COMMITTER_* and git config;
+            # drop its timestamp so each commit gets the time it was made.
+            self._idents = tuple(
+                git.git_run(self.git_info["__git_dir"], "var", var)
+                .stdout.strip()
+                .rsplit(" ", 2)[0]
+                for var in ("GIT_AUTHOR_IDENT", "GIT_COMMITTER_IDENT")
+            )
+        when = f"{int(time.time())} {time.strftime('%z')}"
+        return tuple(f"{ident} {when}" for ident in self._idents)
+
+
+def _quote_path(path: str) -> str:
+    if not path.startswith('"') and "\n" not in path:
+        return path
+    escaped = path.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+GIT_BACKENDS = {
+    SubprocessGitBackend.name: SubprocessGitBackend,
+    CachedGitBackend.name: CachedGitBackend,
+}
+
+_BACKENDS: dict[tuple[str, str], SubprocessGitBackend] = {}
+_BACKENDS_LOCK = threading.Lock()
+
+
+def get_git_backend(git_info) -> SubprocessGitBackend:
+    """Return the run-scoped git backend for the override repo in `git_info`.
+
+    The backend is chosen by git_info["git_backend"] (see --git-backend) and
+    defaults to the subprocess backend.
+    """
+    name = git_info.get("git_backend") or SubprocessGitBackend.name
+    key = (git_info["__git_dir"], name)
+    with _BACKENDS_LOCK:
+        backend = _BACKENDS.get(key)
+        if backend is None:
+            backend = GIT_BACKENDS[name](git_info)
+            _BACKENDS[key] = backend
+        return backend
+
+
+def close_git_backends() -> None:
+    """Flush and forget every backend created in this process."""
+    with _BACKENDS_LOCK:
+        backends = list(_BACKENDS.values())
+        _BACKENDS.clear()
+    for backend in backends:
+        backend.close()
@@ -1,9 +1,10 @@
+import json
 import logging
 import re
 import subprocess
 from datetime import datetime
 
-from github import Github
+from github import Github, GithubException
 
 # git_info = {
 #         "override_repo_path": override_repo_path,
@@ -72,6 +73,19 @@ def stage_recipe(git_info):
     return add
 
 
+def stage_paths(git_info, paths):
+    add = git_run(
+        git_info["__git_dir"],
+        git_info["__work_tree"],
+        "add",
+        "--",
+        *[str(path) for path in paths],
+    )
+
+    logging.debug(f"Git Add: {add}")
+    return add
+
+
 def commit_recipe(git_info, message):
     commit = git_run(
         git_info["__git_dir"], git_info["__work_tree"], "commit", "-m", message
@@ -109,18 +123,140 @@ def push_branch(git_info):
     return push
 
 
+class GitHubSession:
+    """Run-scoped access to the override repo on GitHub.
+
+    The authenticated client and `Repository` object are created once, and
+    listings of open PRs and issues are cached along with their ETags.
+    Repeat lookups send `If-None-Match`, so an unchanged listing costs a
+    304 response that GitHub doesn't count against the rate limit.
+    """
+
+    def __init__(self, token, repo_ref):
+        self.token = token
+        self.repo_ref = repo_ref
+        self._github = None
+        self._repo = None
+        self._listings: dict[tuple, tuple[str | None, list, str | None]] = {}
+
+    @property
+    def github(self):
+        if self._github is None:
+            self._github = Github(self.token)
+        return self._github
+
+    @property
+    def repo(self):
+        if self._repo is None:
+            self._repo = self.github.get_repo(self.repo_ref)
+        return self._repo
+
+    def _get_listing(self, path, parameters):
+        """GET a paginated listing, reusing the cached copy on a 304."""
+        items = []
+        url = path
+        params = {**parameters, "per_page": 100}
+        while url:
+            # The same path can be listed with different filters
+            key = (url, tuple(sorted((params or {}).items())))
+            etag, cached, next_url = self._listings.get(key, (None, None, None))
+            headers = {"If-None-Match": etag} if etag else {}
+            status, response_headers, body = self.github.requester.requestJson(
+                "GET", url, parameters=params, headers=headers
+            )
+            response_headers = {k.lower(): v for k, v in response_headers.items()}
+            if status == 304 and cached is not None:
+                # A 304 need not repeat the Link header, so use the cached one
+                page = cached
+            elif status == 200:
+                page = json.loads(body)
+                # Follow-up page URLs already carry the query string
+                match = re.search(
+                    r'<([^>]+)>;\s*rel="next"', response_headers.get("link", "")
+                )
+                next_url = match.group(1) if match else None
+                self._listings[key] = (response_headers.get("etag"), page, next_url)
+            else:
+                raise GithubException(status, body, response_headers)
+            items.extend(page)
+            url = next_url
+            params = None
+        return items
+
+    def open_pulls(self):
+        return self._get_listing(f"/repos/{self.repo_ref}/pulls", {"state": "open"})
+
+    def open_issues(self):
+        return [
+            issue
+            for issue in self._get_listing(
+                f"/repos/{self.repo_ref}/issues", {"state": "open"}
+            )
+            # The issues endpoint also lists pull requests
+            if "pull_request" not in issue
+        ]
+
+    def find_open_issue(self, title, label):
+        for issue in self.open_issues():
+            labels = {lbl.get("name") for lbl in issue.get("labels", [])}
+            if issue.get("title") == title and label in labels:
+                return issue
+        return None
+
+    def find_open_pull(self, head_branch):
+        for pull in self.open_pulls():
+            if pull.get("head", {}).get("ref") == head_branch:
+                return pull
+        return None
+
+    def create_pull(self, **kwargs):
+        pr = self.repo.create_pull(**kwargs)
+        self._listings.clear()
+        return pr
+
+    def comment_on_issue(self, number, body):
+        comment = self.repo.get_issue(number).create_comment(body)
+        self._listings.clear()
+        return comment
+
+    def create_issue(self, **kwargs):
+        issue = self.repo.create_issue(**kwargs)
+        self._listings.clear()
+        return issue
+
+
+def get_github_session(git_info):
+    """Return the GitHub session for this run, creating it on first use."""
+    session = git_info.get("github_session")
+    if session is None:
+        session = GitHubSession(
+            git_info["github_token"], git_info["override_repo_remote_ref"]
+        )
+        git_info["github_session"] = session
+    return session
+
+
 def create_pull_request(git_info, recipe):
+    session = get_github_session(git_info)
+    head = git_info["override_trust_branch"]
+
+    try:
+        existing = session.find_open_pull(head)
+    except Exception as e:
+        logging.debug(f"Could not list open pull requests: {e}")
+        existing = None
+    if existing:
+        pr_url = f"{git_info['override_repo_url']}/pull/{existing['number']}"
+        logging.info(f"Pull request for {head} is already open: {pr_url}")
+        return pr_url
+
     title = f"Update Trust Information: {recipe.identifier}"
     body = f"""
 Recipe Verification information is out-of-date for {recipe.identifier}.
 Please review and merge the updated trust information for this override.
     """
 
-    g = Github(git_info["github_token"])
-    repo = g.get_repo(git_info["override_repo_remote_ref"])
-    pr = repo.create_pull(
-        title=title, body=body, head=git_info["override_trust_branch"], base="main"
-    )
+    pr = session.create_pull(title=title, body=body, head=head, base="main")
     pr_url = f"{git_info['override_repo_url']}/pull/{pr.number}"
 
     logging.debug(f"PR URL: {pr_url}")
@@ -136,15 +272,16 @@ def create_issue_for_failed_recipes(git_info, failed_recipes):
         failed_recipes (list): List of Recipe objects that failed during processing
 
     Returns:
-        str: URL of the created GitHub issue, or None if no issue was created
+        str: URL of the created GitHub issue, or of today's open failure
+        issue when the failures were added to it as a comment, or None if
+        no issue was created
     """
 
     if not failed_recipes:
         logging.debug("No failed recipes to report")
         return None
 
-    g = Github(git_info["github_token"])
-    repo = g.get_repo(git_info["override_repo_remote_ref"])
+    session = get_github_session(git_info)
 
     # Create issue title and body
     current_date = datetime.now().strftime("%Y-%m-%d")
@@ -163,8 +300,19 @@ def create_issue_for_failed_recipes(git_info, failed_recipes):
 
     body += "\nThis issue was automatically generated by autopkg-wrapper."
 
+    try:
+        existing = session.find_open_issue(title, "autopkg-failure")
+    except Exception as e:
+        logging.debug(f"Could not list open issues: {e}")
+        existing = None
+    if existing:
+        issue_url = f"{git_info['override_repo_url']}/issues/{existing['number']}"
+        logging.info(f"Adding recipe failures to the open issue: {issue_url}")
+        session.comment_on_issue(existing["number"], body)
+        return issue_url
+
     # Create the issue
-    issue = repo.create_issue(
+    issue = session.create_issue(
         title=title,
         body=body,
         labels=["autopkg-failure"],
@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import quote
+
+import requests
+
+# Bump when the cache layout changes so stale files are ignored.
+_CACHE_VERSION = 1
+
+# Names per RSQL filter; keeps the query string well under URL length limits
+_FILTER_CHUNK = 40
+_PAGE_SIZE = 100
+
+
+def normalize_jss_url(jss_url: str) -> str:
+    """Return `jss_url` with a scheme (https:// if it had none) and no trailing slash."""
+    url = (jss_url or "").strip().rstrip("/")
+    if url and "://" not in url:
+        url = f"https://{url}"
+    return url
+
+
+def package_url(jss_url: str, package_id) -> str:
+    return f"{jss_url}/view/settings/computer-management/packages/{package_id}"
+
+
+def policy_url(jss_url: str, policy_id) -> str:
+    return f"{jss_url}/policies.html?id={policy_id}"
+
+
+def _rsql_quote(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+class JamfApiClient:
+    """Minimal Jamf Pro API client that shares one OAuth token across threads.
+
+    The token is fetched with the client-credentials grant on first use and
+    refreshed shortly before it expires, or once if a request comes back 401.
+    """
+
+    def __init__(
+        self,
+        jss_url: str,
+        client_id: str,
+        client_secret: str,
+        session: requests.Session | None = None,
+        timeout: float = 30,
+    ):
+        self.jss_url = normalize_jss_url(jss_url)
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.timeout = timeout
+        self._session = session or requests.Session()
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = threading.Lock()
+
+    def close(self) -> None:
+        self._session.close()
+
+    def _get_token(self, refresh: bool = False) -> str:
+        with self._token_lock:
+            if refresh or not self._token or time.time() > self._token_expires - 60:
+                response = self._session.post(
+                    f"{self.jss_url}/api/oauth/token",
+                    data={
+                        "grant_type": "client_credentials",
+                        "client_id": self.client_id,
+                        "client_secret": self.client_secret,
+                    },
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+                data = response.json()
+                self._token = data["access_token"]
+                self._token_expires = time.time() + float(data.get("expires_in", 300))
+            return self._token
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        headers = {"Accept": "application/json", **kwargs.pop("headers", {})}
+        for attempt in range(2):
+            headers["Authorization"] = f"Bearer {self._get_token(refresh=attempt > 0)}"
+            response = self._session.request(
+                method,
+                f"{self.jss_url}{path}",
+                headers=headers,
+                timeout=self.timeout,
+                **kwargs,
+            )
+            if response.status_code != 401:
+                break
+        return response
+
+    def find_packages(self, names) -> dict[str, str]:
+        """Return {packageName: id} for packages matching any of `names`."""
+        found: dict[str, str] = {}
+        names = sorted(set(names))
+        for start in range(0, len(names), _FILTER_CHUNK):
+            chunk = names[start : start + _FILTER_CHUNK]
+            rsql = f"packageName=in=({','.join(_rsql_quote(n) for n in chunk)})"
+            page = 0
+            while True:
+                response = self.request(
+                    "GET",
+                    "/api/v1/packages",
+                    params={"page": page, "page-size": _PAGE_SIZE, "filter": rsql},
+                )
+                response.raise_for_status()
+                data = response.json()
+                results = data.get("results") or []
+                for item in results:
+                    name = str(item.get("packageName") or "").strip()
+                    pid = str(item.get("id") or "").strip()
+                    if name and pid:
+                        found.setdefault(name, pid)
+                page += 1
+                if not results or page * _PAGE_SIZE >= int(data.get("totalCount", 0)):
+                    break
+        return found
+
+    def find_policy(self, name: str) -> str | None:
+        """Return the id of the policy called `name`, or None if there isn't one."""
+        response = self.request(
+            "GET", f"/JSSResource/policies/name/{quote(name, safe='')}"
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        general = (response.json().get("policy") or {}).get("general") or {}
+        pid = general.get("id")
+        return str(pid) if pid is not None else None
+
+
+class JamfLookupCache:
+    """Resolve package and policy names to Jamf links, caching the answers.
+
+    Only names that aren't already cached (or whose entries are older than
+    `ttl` seconds) are looked up: packages with filtered, paginated queries
+    against the Jamf Pro API and policies by name against the Classic API.
+    Package and policy lookups run concurrently over one shared client.
+    Names that Jamf doesn't know are cached too, so they aren't asked for
+    again until the TTL runs out. With `cache_path` the cache is kept on
+    disk between runs.
+    """
+
+    def __init__(
+        self,
+        jss_url: str,
+        client_id: str,
+        client_secret: str,
+        cache_path: str | Path | None = None,
+        ttl: float = 3600,
+        client: JamfApiClient | None = None,
+        max_workers: int = 4,
+    ):
+        self.jss_url = normalize_jss_url(jss_url)
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.ttl = ttl
+        self.max_workers = max(1, max_workers)
+        self.client = client or JamfApiClient(self.jss_url, client_id, client_secret)
+        self.errors: list[str] = []
+        self._entries: dict[str, dict[str, dict]] = {"packages": {}, "policies": {}}
+        self._load()
+
+    def _load(self) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != _CACHE_VERSION
+            or data.get("jss_url") != self.jss_url
+        ):
+            return
+        for kind in self._entries:
+            self._entries[kind] = data.get(kind) or {}
+
+    def save(self) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_path.with_suffix(".tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "version": _CACHE_VERSION,
+                        "jss_url": self.jss_url,
+                        **self._entries,
+                    },
+                    f,
+                )
+            os.replace(tmp_file, self.cache_path)
+        except OSError as e:
+            logging.debug(f"Could not write Jamf lookup cache {self.cache_path}: {e}")
+
+    def close(self) -> None:
+        self.save()
+        self.client.close()
+
+    def _missing(self, kind: str, names) -> list[str]:
+        now = time.time()
+        entries = self._entries[kind]
+        return sorted(
+            name
+            for name in set(names)
+            if name not in entries or now - entries[name].get("fetched", 0) > self.ttl
+        )
+
+    def _store(self, kind: str, ids: dict[str, str | None]) -> None:
+        now = time.time()
+        for name, pid in ids.items():
+            self._entries[kind][name] = {"id": pid, "fetched": now}
+
+    def _fetch_packages(self, names: list[str]) -> None:
+        if not names:
+            return
+        try:
+            found = self.client.find_packages(names)
+        except Exception as e:
+            self.errors.append(f"packages lookup failed: {e!r}")
+            logging.exception("Jamf package lookup failed")
+            return
+        by_lower: dict[str, str] = {}
+        for name, pid in found.items():
+            by_lower.setdefault(name.lower(), pid)
+        self._store(
+            "packages",
+            {name: found.get(name) or by_lower.get(name.lower()) for name in names},
+        )
+
+    def _fetch_policies(self, names: list[str], executor) -> None:
+        if not names:
+            return
+        ids: dict[str, str | None] = {}
+        futures = {
+            name: executor.submit(self.client.find_policy, name) for name in names
+        }
+        for name, future in futures.items():
+            try:
+                ids[name] = future.result()
+            except Exception as e:
+                self.errors.append(f"policy lookup failed for {name}: {e!r}")
+        if ids:
+            self._store("policies", ids)
+
+    def lookup(
+        self, package_names, policy_names
+    ) -> tuple[dict[str, str], dict[str, str]]:
+        """Return ({package: url}, {policy: url}) for the names Jamf knows."""
+        package_names = [n for n in package_names if n and n != "-"]
+        policy_names = [n for n in policy_names if n and n != "-"]
+        missing_packages = self._missing("packages", package_names)
+        missing_policies = self._missing("policies", policy_names)
+        logging.debug(
+            f"Jamf lookups: {len(missing_packages)} packages and "
+            f"{len(missing_policies)} policies not cached"
+        )
+
+        # One extra worker for the package query alongside the policy lookups
+        with ThreadPoolExecutor(max_workers=self.max_workers + 1) as executor:
+            packages = executor.submit(self._fetch_packages, missing_packages)
+            self._fetch_policies(missing_policies, executor)
+            packages.result()
+
+        return (
+            self._links("packages", package_names, package_url),
+            self._links("policies", policy_names, policy_url),
+        )
+
+    def _links(self, kind: str, names, make_url) -> dict[str, str]:
+        links = {}
+        for name in names:
+            pid = (self._entries[kind].get(name) or {}).get("id")
+            if pid:
+                links[name] = make_url(self.jss_url, pid)
+        return links
@@ -10,6 +10,12 @@ class HasName(Protocol):
     name: str
 
 
+# What a recipe mostly waits on, for per-class concurrency limits:
+# download recipes on the network, pkg recipes on disk and CPU, and Jamf
+# recipes on the Jamf Pro API
+RESOURCE_CLASSES = ("download", "pkg", "jamf", "other")
+
+
 def recipe_type_for(recipe: HasName) -> str:
     """Extract the recipe type from the recipe name.
 
@@ -23,6 +29,24 @@ def recipe_type_for(recipe: HasName) -> str:
     return parts[1] if len(parts) == 2 else ""
 
 
+def resource_class_for(recipe: HasName) -> str:
+    """Get the resource class a recipe belongs to, from its type.
+
+    Args:
+        recipe: Recipe object with a name attribute
+
+    Returns:
+        str: One of RESOURCE_CLASSES (e.g., "jamf" from "Firefox.upload.jamf"
+        or "Firefox.self_service.jamf", "pkg" from "Firefox.pkg")
+    """
+    parts = recipe_type_for(recipe).split(".")
+    if "jamf" in parts or "jss" in parts:
+        return "jamf"
+    if parts[0] in ("download", "pkg"):
+        return parts[0]
+    return "other"
+
+
 def recipe_identifier_for(recipe: HasName) -> str:
     """Get the recipe identifier for display purposes.
 
@@ -74,3 +98,43 @@ def describe_recipe_batches[T: HasName](
         for batch in batches
         if (batch_list := list(batch)) is not None
     ]
+
+
+def recipe_title_for(recipe: HasName) -> str:
+    """Extract the software title from the recipe name.
+
+    Args:
+        recipe: Recipe object with a name attribute
+
+    Returns:
+        str: Software title (e.g., "Firefox" from "Firefox.upload.jamf")
+    """
+    return recipe.name.split(".", 1)[0]
+
+
+def build_recipe_dependencies[T: HasName](
+    batches: Iterable[Iterable[T]],
+) -> dict[T, list[T]]:
+    """Work out which recipes each recipe has to wait for.
+
+    Batch order is only enforced within a software title: a recipe waits for
+    the recipes of the same title in earlier batches (so Firefox.self_service
+    waits for Firefox.upload) but not for unrelated titles.
+
+    Args:
+        batches: Batches as returned by build_recipe_batches
+
+    Returns:
+        dict: Mapping of each recipe to the recipes it depends on
+    """
+    dependencies: dict[T, list[T]] = {}
+    earlier_by_title: dict[str, list[T]] = {}
+    for batch in batches:
+        batch_list = list(batch)
+        for recipe in batch_list:
+            dependencies[recipe] = list(
+                earlier_by_title.get(recipe_title_for(recipe), [])
+            )
+        for recipe in batch_list:
+            earlier_by_title.setdefault(recipe_title_for(recipe), []).append(recipe)
+    return dependencies
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import statistics
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+# Bump when the history layout changes so stale files are ignored.
+_HISTORY_VERSION = 1
+
+# Weight of the latest run in a recipe's moving average, so one unusually
+# slow or fast run doesn't swing the estimate
+_EWMA_WEIGHT = 0.5
+
+
+class DurationHistory:
+    """Per-recipe run durations carried over from earlier runs.
+
+    Each recipe keeps an exponentially weighted moving average of how long
+    it took (every timed phase except waiting in the queue), its latest
+    duration and how many runs went into the average. Only recipes that
+    ran cleanly first time are recorded, since a recipe that fails early
+    or was retried says little about how long a real run takes.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.entries: dict[str, dict] = {}
+        self._median: float | None = None
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != _HISTORY_VERSION:
+            return
+        self.entries = data.get("recipes") or {}
+
+    def get(self, identifier: str) -> float | None:
+        entry = self.entries.get(identifier)
+        return entry.get("duration") if entry else None
+
+    def estimate(self, identifier: str) -> float:
+        """Return the expected duration, or the median of known ones if new."""
+        duration = self.get(identifier)
+        if duration is not None:
+            return duration
+        if self._median is None:
+            known = [e["duration"] for e in self.entries.values() if "duration" in e]
+            self._median = statistics.median(known) if known else 0.0
+        return self._median
+
+    def record(self, recipes: Iterable) -> int:
+        """Fold the durations of cleanly finished recipes into the history."""
+        now = time.time()
+        count = 0
+        for recipe in recipes:
+            duration = recipe.duration
+            if (
+                duration is None
+                or "run" not in recipe.timings
+                or recipe.error
+                or recipe.results.get("failed")
+                or recipe.verified is False
+                or getattr(recipe, "attempts", 1) > 1
+            ):
+                continue
+            entry = self.entries.get(recipe.identifier) or {}
+            previous = entry.get("duration")
+            average = (
+                duration
+                if previous is None
+                else _EWMA_WEIGHT * duration + (1 - _EWMA_WEIGHT) * previous
+            )
+            self.entries[recipe.identifier] = {
+                "duration": round(average, 3),
+                "last": round(duration, 3),
+                "runs": entry.get("runs", 0) + 1,
+                "updated": now,
+            }
+            count += 1
+        self._median = None
+        return count
+
+    def save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.path.with_suffix(".tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": _HISTORY_VERSION, "recipes": self.entries},
+                    f,
+                    indent=2,
+                    sort_keys=True,
+                )
+            os.replace(tmp_file, self.path)
+        except OSError as e:
+            logging.warning(f"Could not write duration history {self.path}: {e}")
+
+
+def longest_first_priorities[T](
+    recipes: Iterable[T],
+    dependencies: dict[T, list[T]] | None,
+    history: DurationHistory,
+) -> dict[T, float]:
+    """Work out longest-processing-time-first priorities for the scheduler.
+
+    A recipe's priority is its expected duration plus the longest chain of
+    recipes that have to wait for it, so a quick upload recipe whose slow
+    self-service recipe must follow it still starts early. Recipes with no
+    history are expected to take the median of the known durations.
+
+    Args:
+        recipes: Recipes to schedule
+        dependencies: Mapping of recipe to the recipes it must wait for
+            (see build_recipe_dependencies)
+        history: Durations from earlier runs
+
+    Returns:
+        dict: Mapping of recipe to priority; higher starts first
+    """
+    recipes = list(recipes)
+    dependants: dict[int, list[T]] = {}
+    for recipe in recipes:
+        for dep in (dependencies or {}).get(recipe, []):
+            dependants.setdefault(id(dep), []).append(recipe)
+
+    priorities: dict[int, float] = {}
+
+    def priority(recipe: T) -> float:
+        key = id(recipe)
+        if key not in priorities:
+            tail = max(
+                (priority(d) for d in dependants.get(key, [])),
+                default=0.0,
+            )
+            priorities[key] = history.estimate(recipe.identifier) + tail
+        return priorities[key]
+
+    return {recipe: priority(recipe) for recipe in recipes}
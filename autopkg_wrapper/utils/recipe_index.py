@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import glob as glob_module
+import json
+import logging
+import os
+import plistlib
+import re
+import threading
+from dataclasses import dataclass, field
+from functools import cache
+from pathlib import Path
+
+# Recipe file extensions in lookup precedence order. When a directory holds
+# more than one file for the same recipe name, the earlier extension wins.
+RECIPE_EXTENSIONS = (".recipe.yaml", ".recipe", ".recipe.plist")
+
+_SKIP_DIRS = {".git"}
+
+# Bump when the on-disk cache layout changes so stale files are ignored.
+_CACHE_VERSION = 1
+_CACHE_FILENAME = "autopkg_wrapper/recipe_index.json"
+
+_INDEX_CACHE: dict[Path, RecipeIndex] = {}
+_INDEX_LOCK = threading.Lock()
+# .git directory of the override repo the persistent cache lives in, if any
+_cache_git_dir: Path | None = None
+
+
+@dataclass(frozen=True)
+class RecipeIndexEntry:
+    """A single recipe file discovered while indexing a directory tree.
+
+    Attributes:
+        name: Recipe name without extension (e.g., "Firefox.upload.jamf")
+        path: Absolute path to the recipe file
+        format: Recipe file format, either "yaml" or "plist"
+        mtime: Modification time of the recipe file when its directory was
+            last listed
+    """
+
+    name: str
+    path: Path
+    format: str
+    mtime: float
+
+
+@dataclass
+class RecipeIndex:
+    """Recipe files under a root directory, built from a single tree walk.
+
+    `entries` keeps every recipe file in walk order (parents before children,
+    siblings sorted) so glob discovery can see duplicates, while `by_name` maps
+    each recipe name to the first file found for it. `dirs` is the per-directory
+    listing the index was built from, which is what gets persisted to disk.
+    """
+
+    root: Path
+    entries: list[RecipeIndexEntry] = field(default_factory=list)
+    by_name: dict[str, RecipeIndexEntry] = field(default_factory=dict)
+    dirs: dict[str, dict] = field(default_factory=dict, repr=False)
+
+    def add(self, entry: RecipeIndexEntry) -> None:
+        self.entries.append(entry)
+        self.by_name.setdefault(entry.name, entry)
+
+    def lookup(self, name: str) -> RecipeIndexEntry | None:
+        return self.by_name.get(name)
+
+    def subset(self, root: Path) -> RecipeIndex:
+        """Return the portion of this index that lives under `root`."""
+        index = RecipeIndex(root=root)
+        for entry in self.entries:
+            if entry.path.is_relative_to(root):
+                index.add(entry)
+        return index
+
+    def match(self, pattern: str) -> list[RecipeIndexEntry]:
+        """Return entries whose path relative to the root matches a glob pattern.
+
+        Matching follows `glob.glob(pattern, recursive=True)` semantics, so `**`
+        spans directories and hidden files are only matched explicitly.
+        """
+        regex = re.compile(
+            glob_module.translate(
+                pattern, recursive=True, include_hidden=False, seps="/"
+            )
+        )
+        return [
+            entry
+            for entry in self.entries
+            if regex.match(entry.path.relative_to(self.root).as_posix())
+        ]
+
+
+def split_recipe_filename(filename: str) -> tuple[str, str] | None:
+    """Split a recipe filename into its recipe name and extension.
+
+    Returns:
+        Tuple of (name, extension), or None if the file is not a recipe
+    """
+    for ext in RECIPE_EXTENSIONS:
+        if filename.endswith(ext) and len(filename) > len(ext):
+            return filename[: -len(ext)], ext
+    return None
+
+
+def _recipe_format(ext: str) -> str:
+    return "yaml" if ext == ".recipe.yaml" else "plist"
+
+
+def _list_directory(path: Path) -> dict:
+    subdirs = []
+    recipes = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in _SKIP_DIRS:
+                    subdirs.append(entry.name)
+                continue
+            if entry.is_dir():
+                # Symlinked directories are listed but not followed, as with os.walk
+                continue
+            split = split_recipe_filename(entry.name)
+            if not split:
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            recipes.append((RECIPE_EXTENSIONS.index(split[1]), entry.name, mtime))
+
+    return {
+        "subdirs": sorted(subdirs),
+        "recipes": [[name, mtime] for _priority, name, mtime in sorted(recipes)],
+    }
+
+
+def build_recipe_index(
+    root: Path, cached_dirs: dict[str, dict] | None = None
+) -> RecipeIndex:
+    """Walk `root` once and index every recipe file beneath it.
+
+    Args:
+        root: Directory to index
+        cached_dirs: Directory listings from a previous build, keyed by path
+            relative to `root`. A cached listing is reused without reading the
+            directory when its mtime is unchanged.
+
+    Returns:
+        RecipeIndex for `root`
+    """
+    cached_dirs = cached_dirs or {}
+    index = RecipeIndex(root=root)
+    reused = 0
+
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        rel = path.relative_to(root).as_posix()
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except OSError:
+            continue
+
+        listing = cached_dirs.get(rel)
+        if listing is not None and listing.get("mtime_ns") == mtime_ns:
+            reused += 1
+        else:
+            try:
+                listing = {"mtime_ns": mtime_ns, **_list_directory(path)}
+            except OSError:
+                continue
+        index.dirs[rel] = listing
+
+        for filename, mtime in listing["recipes"]:
+            name, ext = split_recipe_filename(filename)
+            index.add(
+                RecipeIndexEntry(
+                    name=name,
+                    path=path / filename,
+                    format=_recipe_format(ext),
+                    mtime=mtime,
+                )
+            )
+        stack.extend(path / d for d in reversed(listing["subdirs"]))
+
+    logging.debug(
+        f"Indexed {len(index.entries)} recipe files under {root} "
+        f"({reused}/{len(index.dirs)} directory listings reused from cache)"
+    )
+    return index
+
+
+def _cache_file_for(root: Path) -> Path | None:
+    """Locate the persistent cache file for `root`, if it is in the override repo."""
+    if _cache_git_dir is None or not root.is_relative_to(_cache_git_dir.parent):
+        return None
+    return _cache_git_dir / _CACHE_FILENAME
+
+
+def _read_cache_roots(cache_file: Path) -> dict[str, dict]:
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != _CACHE_VERSION:
+        return {}
+    return data.get("roots") or {}
+
+
+def _save_cached_dirs(cache_file: Path, root: Path, dirs: dict[str, dict]) -> None:
+    roots = _read_cache_roots(cache_file)
+    roots[str(root)] = dirs
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"version": _CACHE_VERSION, "roots": roots}, f)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        logging.debug(f"Could not write recipe index cache {cache_file}: {e}")
+
+
+def set_persistent_cache_repo(override_dir: Path | str | None) -> None:
+    """Keep the on-disk recipe index cache in the override repo's .git directory.
+
+    As when the override repo is set up for git commands, the repo is
+    `override_dir` itself or its parent. Indexes of directories outside that
+    repo, or of any directory when there is no override repo, are only kept
+    in memory. Pass None to disable the on-disk cache.
+    """
+    global _cache_git_dir
+    _cache_git_dir = None
+    if not override_dir:
+        return
+    override_dir = Path(override_dir).resolve()
+    for candidate in (override_dir, override_dir.parent):
+        if (candidate / ".git").is_dir():
+            _cache_git_dir = candidate / ".git"
+            return
+
+
+def get_recipe_index(root: Path | str) -> RecipeIndex:
+    """Return the run-scoped recipe index for `root`, building it on first use.
+
+    If an index already exists for a parent directory it is filtered rather
+    than walking the tree again. Otherwise, for directories in the override
+    repo, directory listings are loaded from the persistent cache under its
+    `.git` directory, and only directories whose mtime changed since the last
+    run are read again.
+    """
+    root = Path(root).resolve()
+    with _INDEX_LOCK:
+        index = _INDEX_CACHE.get(root)
+        if index is not None:
+            return index
+
+        for cached_root, cached_index in _INDEX_CACHE.items():
+            if root.is_relative_to(cached_root):
+                index = cached_index.subset(root)
+                break
+        else:
+            cache_file = _cache_file_for(root)
+            cached_dirs = (
+                _read_cache_roots(cache_file).get(str(root), {}) if cache_file else {}
+            )
+            index = build_recipe_index(root, cached_dirs)
+            if cache_file and index.dirs != cached_dirs:
+                _save_cached_dirs(cache_file, root, index.dirs)
+
+        _INDEX_CACHE[root] = index
+        return index
+
+
+def clear_recipe_index_cache() -> None:
+    """Forget every index built so far in this process."""
+    with _INDEX_LOCK:
+        _INDEX_CACHE.clear()
+    resolve_recipe_override_dir.cache_clear()
+
+
+@cache
+def resolve_recipe_override_dir(
+    overrides_repo_path: Path | str | None = None,
+    autopkg_prefs: Path | str | None = None,
+) -> Path | None:
+    """Work out the recipe override directory from args or autopkg prefs.
+
+    The result is cached so the prefs file is read at most once per run.
+
+    Args:
+        overrides_repo_path: Explicit path passed via --overrides-repo-path
+        autopkg_prefs: Path to an autopkg prefs file (.json or .plist)
+
+    Returns:
+        Path to the override directory, or None if it could not be determined
+    """
+    if overrides_repo_path:
+        logging.debug(f"Using overrides_repo_path: {overrides_repo_path}")
+        return Path(overrides_repo_path)
+
+    if autopkg_prefs:
+        autopkg_prefs_path = Path(autopkg_prefs).resolve()
+        try:
+            if autopkg_prefs_path.suffix == ".json":
+                with open(autopkg_prefs_path) as f:
+                    prefs = json.load(f)
+            elif autopkg_prefs_path.suffix == ".plist":
+                prefs = plistlib.loads(autopkg_prefs_path.read_bytes())
+            else:
+                return None
+
+            recipe_override_dir = Path(prefs.get("RECIPE_OVERRIDE_DIRS", "")).resolve()
+            logging.debug(
+                f"Using RECIPE_OVERRIDE_DIRS from prefs: {recipe_override_dir}"
+            )
+            return recipe_override_dir
+        except Exception as e:
+            logging.debug(f"Failed to read autopkg prefs: {e}")
+            return None
+
+    # Try default location
+    autopkg_prefs_path = Path.home() / "Library/Preferences/com.github.autopkg.plist"
+    if not autopkg_prefs_path.is_file():
+        return None
+    try:
+        prefs = plistlib.loads(autopkg_prefs_path.resolve().read_bytes())
+        recipe_override_dir = Path(prefs.get("RECIPE_OVERRIDE_DIRS", "")).resolve()
+        logging.debug(
+            f"Using RECIPE_OVERRIDE_DIRS from default prefs: {recipe_override_dir}"
+        )
+        return recipe_override_dir
+    except Exception as e:
+        logging.debug(f"Failed to read default autopkg prefs: {e}")
+        return None
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+
+from autopkg_wrapper.utils.error_classifier import (
+    DEFAULT_ERROR_CLASSIFIER,
+    ErrorClassifier,
+)
+
+# Error categories worth another attempt: the next run may well get through
+RETRYABLE_CATEGORIES = ("network", "download")
+
+
+def _failure_message(recipe) -> str:
+    failed = recipe.results.get("failed") or []
+    first = failed[0] if failed else {}
+    message = first.get("message") if isinstance(first, dict) else first
+    return str(message or "")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """When and how soon to run a failed recipe again.
+
+    Attributes:
+        max_attempts: Runs allowed per recipe, including the first
+        backoff: Seconds to wait before the first retry; each later retry
+            waits twice as long as the one before
+        categories: Error categories that are retried
+        classifier: Classifier used to categorise the failure message
+    """
+
+    max_attempts: int = 1
+    backoff: float = 30.0
+    categories: tuple[str, ...] = RETRYABLE_CATEGORIES
+    classifier: ErrorClassifier = DEFAULT_ERROR_CLASSIFIER
+
+    def retry_delay(self, recipe) -> float | None:
+        """Return seconds to wait before running `recipe` again, or None.
+
+        Only recipes whose run failed with an error in `categories` are
+        retried. Timed-out and untrusted recipes never are. Suitable as a
+        Stage `retry` callback.
+        """
+        if recipe.attempts >= self.max_attempts:
+            return None
+        if not (recipe.error or recipe.results.get("failed")):
+            return None
+        if recipe.results.get("timed_out") or recipe.verified is False:
+            return None
+        message = _failure_message(recipe)
+        category = self.classifier.classify(message)
+        if category not in self.categories:
+            return None
+        logging.info(
+            f"{recipe.identifier} failed with a {category} error "
+            f"(attempt {recipe.attempts} of {self.max_attempts}): {message}"
+        )
+        return self.backoff * 2 ** (recipe.attempts - 1)
@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import time
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from autopkg_wrapper.utils.concurrency_controller import ConcurrencyController
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One step of the per-recipe pipeline.
+
+    Attributes:
+        name: Stage name used in logs (e.g., "verify", "run", "notify")
+        func: Callable invoked with the recipe on a worker thread
+        max_concurrency: Optional cap on how many recipes may be in this
+            stage at once (1 makes the stage serial)
+        when: Optional predicate; the stage is skipped for recipes where it
+            returns False
+        retry: Optional callable given the recipe after the stage; it
+            returns the seconds to wait before running the stage again, or
+            None to move on (see RetryPolicy.retry_delay)
+        class_limits: Optional caps on how many recipes of each class may
+            be in this stage at once, keyed by `resource_class(recipe)`;
+            classes not listed are only capped by max_concurrency
+        resource_class: Callable giving a recipe's class for class_limits
+            (see resource_class_for)
+        after_failure: Whether the stage still runs for a recipe after one
+            of its earlier stages raised; stages that only report the
+            outcome (e.g., "notify") set this, the rest are skipped
+    """
+
+    name: str
+    func: Callable
+    max_concurrency: int | None = None
+    when: Callable | None = None
+    retry: Callable | None = None
+    class_limits: dict[str, int] | None = None
+    resource_class: Callable | None = None
+    after_failure: bool = False
+
+
+class RecipeScheduler:
+    """Run recipes through a pipeline of stages on one worker pool.
+
+    Each recipe moves on to its next stage as soon as its previous stage
+    finishes, so a recipe can be notifying while others are still running.
+    Recipes become eligible once every recipe they depend on has passed the
+    `release_after` stage, and ready work is started whenever a worker is
+    free, preferring later stages, then higher priority, then list order.
+    Time spent ready but waiting for a worker is passed to the recipe's
+    `record_timing("queue", seconds)`, if it has one. Once a `deadline` has
+    passed no more recipes are started, though those already started
+    finish their stages. With a `controller`, the number of stages run at
+    once follows its limit. Stages can also cap how many recipes of each
+    resource class they run at once, so a class held back doesn't keep the
+    others waiting.
+
+    A stage with a `retry` callback can send a recipe back through the
+    same stage after a delay; the recipe's `prepare_retry()` is called
+    first, if it has one. Retries wait behind fresh work, and are dropped
+    if they couldn't start before the deadline.
+    """
+
+    def __init__(
+        self, max_workers: int, controller: ConcurrencyController | None = None
+    ):
+        """Create a scheduler.
+
+        Args:
+            max_workers: Most stages to run at once
+            controller: Optional ConcurrencyController that adjusts how many
+                stages run at once, up to its own max_workers, as the run
+                goes
+        """
+        self.controller = controller
+        self.max_workers = max(
+            1, controller.max_workers if controller is not None else max_workers
+        )
+
+    def run[T](
+        self,
+        recipes: Iterable[T],
+        stages: Callable[[T], object] | Sequence[Stage],
+        dependencies: dict[T, list[T]] | None = None,
+        release_after: str | None = None,
+        priority: dict[T, float] | None = None,
+        deadline: float | None = None,
+    ) -> list[T]:
+        """Run every recipe through every stage.
+
+        Args:
+            recipes: Recipes to process, in preferred start order
+            stages: Stages to run in order, or a single callable
+            dependencies: Optional mapping of recipe to the recipes it must
+                wait for (see build_recipe_dependencies)
+            release_after: Name of the stage after which dependants may
+                start; defaults to the last stage
+            priority: Optional mapping of recipe to priority; among ready
+                recipes at the same stage, higher priorities start first
+                (see longest_first_priorities)
+            deadline: Optional time.monotonic() value after which recipes
+                that haven't started are marked as timed out and skipped,
+                along with the recipes waiting for them
+
+        Returns:
+            list: Recipes in the order they finished their last stage,
+            followed by any skipped at the deadline
+        """
+        if callable(stages):
+            stages = [Stage("run", stages)]
+        stages = list(stages)
+        release_index = len(stages) - 1
+        if release_after is not None:
+            release_index = [s.name for s in stages].index(release_after)
+
+        recipes = list(recipes)
+        dependencies = dependencies or {}
+        order = {id(r): i for i, r in enumerate(recipes)}
+        rank = {id(r): -(priority or {}).get(r, 0.0) for r in recipes}
+
+        waiting_on: dict[int, int] = {}
+        dependants: dict[int, list[T]] = {}
+        for recipe in recipes:
+            deps = [d for d in dependencies.get(recipe, []) if id(d) in order]
+            waiting_on[id(recipe)] = len(deps)
+            for dep in deps:
+                dependants.setdefault(id(dep), []).append(recipe)
+
+        seq = itertools.count()
+        ready: list[tuple[bool, int, float, int, int, float, int, T]] = []
+        delayed: list[tuple[float, int, int, T]] = []
+        in_stage = [0] * len(stages)
+        in_class: list[dict[str, int]] = [{} for _stage in stages]
+        completed: list[T] = []
+        started: set[int] = set()
+        skipped: list[T] = []
+        failed: set[int] = set()
+
+        def release(recipe: T) -> None:
+            for dependant in dependants.get(id(recipe), []):
+                waiting_on[id(dependant)] -= 1
+                if waiting_on[id(dependant)] == 0:
+                    advance(dependant, 0)
+
+        def push(recipe: T, stage_index: int, retrying: bool = False) -> None:
+            heapq.heappush(
+                ready,
+                (
+                    retrying,
+                    -stage_index,
+                    rank[id(recipe)],
+                    order[id(recipe)],
+                    next(seq),
+                    time.monotonic(),
+                    stage_index,
+                    recipe,
+                ),
+            )
+
+        def advance(recipe: T, stage_index: int) -> None:
+            # Skip stages that don't apply, releasing dependants on the way
+            while stage_index < len(stages):
+                stage = stages[stage_index]
+                if (id(recipe) not in failed or stage.after_failure) and (
+                    stage.when is None or stage.when(recipe)
+                ):
+                    push(recipe, stage_index)
+                    return
+                if stage_index == release_index:
+                    release(recipe)
+                stage_index += 1
+            completed.append(recipe)
+
+        def class_of(recipe: T, stage_index: int) -> str | None:
+            stage = stages[stage_index]
+            if not stage.class_limits or stage.resource_class is None:
+                return None
+            return stage.resource_class(recipe)
+
+        def retry_later(recipe: T, stage_index: int) -> bool:
+            stage = stages[stage_index]
+            if stage.retry is None:
+                return False
+            try:
+                delay = stage.retry(recipe)
+            except Exception as e:
+                logging.error(f"Retry check failed for {stage.name} stage: {e}")
+                return False
+            if delay is None:
+                return False
+            name = getattr(recipe, "identifier", recipe)
+            due = time.monotonic() + delay
+            if deadline is not None and due >= deadline:
+                logging.warning(
+                    f"Not retrying {name}: the retry would start after the run deadline"
+                )
+                return False
+            prepare_retry = getattr(recipe, "prepare_retry", None)
+            if prepare_retry is not None:
+                prepare_retry()
+            logging.warning(f"Retrying {stage.name} for {name} in {delay:.0f}s")
+            heapq.heappush(delayed, (due, next(seq), stage_index, recipe))
+            return True
+
+        for recipe in recipes:
+            if waiting_on[id(recipe)] == 0:
+                advance(recipe, 0)
+
+        active: dict[Future, tuple[T, int]] = {}
+        controller = self.controller
+        workers = self.max_workers
+        busy = False
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while ready or active or delayed:
+                while delayed and delayed[0][0] <= time.monotonic():
+                    _due, _seq, stage_index, recipe = heapq.heappop(delayed)
+                    push(recipe, stage_index, retrying=True)
+                if controller is not None:
+                    workers = controller.update(busy)
+
+                deferred = []
+                while ready and len(active) < workers:
+                    item = heapq.heappop(ready)
+                    *_key, ready_at, stage_index, recipe = item
+                    if (
+                        deadline is not None
+                        and id(recipe) not in started
+                        and time.monotonic() >= deadline
+                    ):
+                        _mark_timed_out(
+                            recipe, "Not started: the run deadline was reached"
+                        )
+                        skipped.append(recipe)
+                        release(recipe)
+                        continue
+                    limit = stages[stage_index].max_concurrency
+                    if limit is not None and in_stage[stage_index] >= limit:
+                        deferred.append(item)
+                        continue
+                    cls = class_of(recipe, stage_index)
+                    class_limit = (stages[stage_index].class_limits or {}).get(cls)
+                    class_count = in_class[stage_index].get(cls, 0)
+                    if class_limit is not None and class_count >= class_limit:
+                        deferred.append(item)
+                        continue
+                    in_stage[stage_index] += 1
+                    if cls is not None:
+                        in_class[stage_index][cls] = class_count + 1
+                    started.add(id(recipe))
+                    record_timing = getattr(recipe, "record_timing", None)
+                    if record_timing is not None:
+                        record_timing("queue", time.monotonic() - ready_at)
+                    future = executor.submit(stages[stage_index].func, recipe)
+                    active[future] = (recipe, stage_index)
+                for item in deferred:
+                    heapq.heappush(ready, item)
+                busy = bool(ready) and len(active) >= workers
+
+                # Wake for the next retry that falls due, or the controller's
+                # next look, if nothing ends first
+                wake_in = []
+                if delayed:
+                    wake_in.append(max(0.0, delayed[0][0] - time.monotonic()))
+                if controller is not None and active:
+                    wake_in.append(controller.seconds_until_sample())
+                timeout = min(wake_in) if wake_in else None
+                if not active:
+                    time.sleep(timeout or 0)
+                    continue
+                done, _pending = wait(
+                    active, timeout=timeout, return_when=FIRST_COMPLETED
+                )
+                for fut in done:
+                    recipe, stage_index = active.pop(fut)
+                    in_stage[stage_index] -= 1
+                    cls = class_of(recipe, stage_index)
+                    if cls is not None:
+                        in_class[stage_index][cls] -= 1
+                    raised = False
+                    try:
+                        fut.result()
+                    except Exception as e:
+                        logging.error(
+                            f"Unexpected error in {stages[stage_index].name} stage "
+                            f"for {getattr(recipe, 'identifier', recipe)}: {e}"
+                        )
+                        _mark_failed(recipe, str(e))
+                        raised = True
+                    if retry_later(recipe, stage_index):
+                        continue
+                    if raised:
+                        failed.add(id(recipe))
+                    if stage_index == release_index:
+                        if controller is not None:
+                            controller.record_completion()
+                        release(recipe)
+                    advance(recipe, stage_index + 1)
+
+        if skipped:
+            logging.warning(
+                f"Run deadline reached; {len(skipped)} recipes were not started"
+            )
+        return completed + skipped
+
+
+def run_stages_serially[T](recipes: Iterable[T], stages: Sequence[Stage]) -> list[T]:
+    """Run each recipe through every stage in turn on the calling thread.
+
+    Used for dry runs, where interleaved logs from a pool would be hard to
+    follow.
+    """
+    recipes = list(recipes)
+    for recipe in recipes:
+        for stage in stages:
+            if stage.when is None or stage.when(recipe):
+                stage.func(recipe)
+    return recipes
+
+
+def _mark_timed_out(recipe, message: str) -> None:
+    mark_timed_out = getattr(recipe, "mark_timed_out", None)
+    if mark_timed_out is not None:
+        mark_timed_out(message)
+    else:
+        _mark_failed(recipe, message)
+
+
+def _mark_failed(recipe, message: str) -> None:
+    if hasattr(recipe, "error"):
+        recipe.error = True
+    results = getattr(recipe, "results", None)
+    if isinstance(results, dict) and not results.get("failed"):
+        results["failed"] = [{"message": message}]
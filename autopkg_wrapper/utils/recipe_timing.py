@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import logging
+
+# Phases recorded on Recipe.timings, with their column headings
+TIMING_PHASES = (
+    ("queue", "Queue"),
+    ("verify", "Verify"),
+    ("run", "Run"),
+    ("update_trust", "Trust"),
+    ("tidy", "Tidy"),
+    ("git", "Git"),
+)
+
+
+def _seconds(value: float | None) -> str:
+    return f"{value:.1f}s" if value is not None else "-"
+
+
+def slowest_recipes_table(recipes, limit: int = 10) -> list[str]:
+    """Return the lines of a table of the `limit` slowest recipes.
+
+    Recipes are ranked by the time spent working on them (every phase
+    except waiting in the queue). Recipes with no recorded timings are
+    left out.
+    """
+    timed = [r for r in recipes if r.duration is not None]
+    if not timed or limit <= 0:
+        return []
+    slowest = sorted(timed, key=lambda r: r.duration, reverse=True)[:limit]
+
+    header = ["Recipe", "Total", *(title for _phase, title in TIMING_PHASES)]
+    rows = [
+        [
+            r.identifier,
+            _seconds(r.duration),
+            *(_seconds(r.timings.get(phase)) for phase, _title in TIMING_PHASES),
+        ]
+        for r in slowest
+    ]
+    widths = [max(len(row[i]) for row in [header, *rows]) for i in range(len(header))]
+
+    def format_row(row: list[str]) -> str:
+        cells = [row[0].ljust(widths[0])]
+        cells.extend(
+            cell.rjust(width) for cell, width in zip(row[1:], widths[1:], strict=True)
+        )
+        return "  ".join(cells)
+
+    return [
+        f"Slowest recipes ({len(slowest)} of {len(timed)} timed):",
+        format_row(header),
+        *(format_row(row) for row in rows),
+    ]
+
+
+def log_slowest_recipes(recipes, limit: int = 10) -> None:
+    for line in slowest_recipes_table(recipes, limit):
+        logging.info(line)
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+
+from autopkg_wrapper.utils.error_classifier import (
+    DEFAULT_ERROR_CLASSIFIER,
+    ErrorClassifier,
+)
+
+# Bump when the ledger layout or the shape of parsed reports changes so
+# stale ledgers are ignored.
+_LEDGER_VERSION = 3
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def fingerprint_link_map(recipe_link_map: dict[str, str] | None) -> str:
+    """Return a stable fingerprint of a recipe link map."""
+    data = json.dumps(sorted((recipe_link_map or {}).items()))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ReportLedger:
+    """Remember which report files were parsed and what they contained.
+
+    Each entry records a report's size, modification time and content hash
+    alongside its parsed result. A file whose size and mtime are unchanged
+    is reused without being read; if only the mtime moved, its content is
+    hashed and reused when the hash still matches. Zip members are keyed by
+    zip path and member name and identified by their size, timestamp and
+    CRC from the zip's directory, so they are never read to be checked.
+
+    The ledger is a JSON-lines file: a header, then one line per report.
+    Only each report's stamp and the offset of its line are held in memory.
+    Reused results are read back from the ledger when they are needed, and
+    results parsed this run are spilled to a temporary file until `save()`,
+    so memory stays bounded however many reports there are.
+
+    Plist results embed recipe links and error categories, so they are
+    dropped whenever the recipe link map or the error category table
+    differs from the one the ledger was written with.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        recipe_link_map=None,
+        error_classifier: ErrorClassifier | None = None,
+    ):
+        self.path = Path(path)
+        self.link_map_fingerprint = fingerprint_link_map(recipe_link_map)
+        self.error_categories_fingerprint = (
+            error_classifier or DEFAULT_ERROR_CLASSIFIER
+        ).fingerprint
+        # Report key -> stamp, kind and the offset of its line in the ledger
+        self.entries: dict[str, dict] = {}
+        self._seen: dict[str, dict] = {}
+        self._zip_infos: dict[str, dict[str, zipfile.ZipInfo]] = {}
+        self._ledger_file = None
+        self._spill_file = None
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _header(self) -> dict:
+        return {
+            "version": _LEDGER_VERSION,
+            "link_map": self.link_map_fingerprint,
+            "error_categories": self.error_categories_fingerprint,
+        }
+
+    def _load(self) -> None:
+        try:
+            # Kept open to read cached results back from; see close()
+            f = open(self.path, "rb")  # noqa: SIM115
+        except OSError:
+            return
+        try:
+            header = json.loads(f.readline())
+            if not isinstance(header, dict) or header.get("version") != _LEDGER_VERSION:
+                f.close()
+                return
+            keep_plists = (
+                header.get("link_map") == self.link_map_fingerprint
+                and header.get("error_categories") == self.error_categories_fingerprint
+            )
+            entries = {}
+            offset = f.tell()
+            for line in f:
+                record = json.loads(line)
+                record.pop("data", None)
+                key = record.pop("key")
+                if keep_plists or record.get("kind") != "plist":
+                    entries[key] = {**record, "offset": offset}
+                offset += len(line)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # A damaged ledger is ignored as a whole, as if it weren't there
+            f.close()
+            return
+        self.entries = entries
+        self._ledger_file = f
+
+    @staticmethod
+    def key_for(source: str | tuple[str, str]) -> str:
+        if isinstance(source, str):
+            return os.path.abspath(source)
+        zip_path, member = source
+        return f"{os.path.abspath(zip_path)}::{member}"
+
+    def _zip_info(self, zip_path: str, member: str) -> zipfile.ZipInfo:
+        infos = self._zip_infos.get(zip_path)
+        if infos is None:
+            with zipfile.ZipFile(zip_path, "r") as zf:
+                infos = {info.filename: info for info in zf.infolist()}
+            self._zip_infos[zip_path] = infos
+        return infos[member]
+
+    def is_current(self, source: str | tuple[str, str]) -> bool:
+        """Return whether the ledger's result for a report can be reused."""
+        key = self.key_for(source)
+        if isinstance(source, str):
+            st = os.stat(source)
+            stamp = {"size": st.st_size, "mtime": st.st_mtime_ns}
+        else:
+            info = self._zip_info(*source)
+            stamp = {
+                "size": info.file_size,
+                "mtime": list(info.date_time),
+                "hash": f"crc32:{info.CRC:08x}",
+            }
+
+        entry = self.entries.get(key)
+        if entry is not None and entry.get("size") == stamp["size"]:
+            unchanged = entry.get("mtime") == stamp["mtime"]
+            if not unchanged and isinstance(source, str):
+                stamp["hash"] = _hash_file(source)
+            if unchanged or entry.get("hash") == stamp["hash"]:
+                self._seen[key] = {**entry, **stamp}
+                self.hits += 1
+                return True
+
+        self._seen[key] = stamp
+        self.misses += 1
+        return False
+
+    def cached(self, source: str | tuple[str, str]) -> tuple[str, object]:
+        """Return the (kind, data) stored for a report is_current() accepted."""
+        entry = self._seen[self.key_for(source)]
+        return entry["kind"], self._read_data(entry)
+
+    def record(self, source: str | tuple[str, str], kind: str, data: object) -> None:
+        """Store the parsed result for a report that is_current() rejected."""
+        key = self.key_for(source)
+        stamp = self._seen.get(key) or {}
+        if "hash" not in stamp and isinstance(source, str):
+            stamp["hash"] = _hash_file(source)
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(prefix="report-ledger-")  # noqa: SIM115
+        self._spill_file.seek(0, os.SEEK_END)
+        spill_offset = self._spill_file.tell()
+        self._spill_file.write(json.dumps(data).encode("utf-8") + b"\n")
+        self._seen[key] = {**stamp, "kind": kind, "spill_offset": spill_offset}
+
+    def _read_data(self, entry: dict) -> object:
+        if "spill_offset" in entry:
+            f, offset = self._spill_file, entry["spill_offset"]
+        else:
+            f, offset = self._ledger_file, entry["offset"]
+        f.seek(offset)
+        record = json.loads(f.readline())
+        return record if "spill_offset" in entry else record["data"]
+
+    def close(self) -> None:
+        for f in (self._ledger_file, self._spill_file):
+            if f is not None:
+                f.close()
+        self._ledger_file = self._spill_file = None
+
+    def save(self) -> None:
+        """Write the entries seen this run, dropping reports that have gone.
+
+        The ledger's files are closed afterwards, so results can't be read
+        back from it any more.
+        """
+        seen = {k: v for k, v in self._seen.items() if "kind" in v}
+        entries = {}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.path.with_suffix(".tmp")
+            with open(tmp_file, "wb") as f:
+                f.write(json.dumps(self._header()).encode("utf-8") + b"\n")
+                for key, entry in seen.items():
+                    stamp = {
+                        k: v
+                        for k, v in entry.items()
+                        if k not in ("offset", "spill_offset")
+                    }
+                    line = json.dumps(
+                        {"key": key, **stamp, "data": self._read_data(entry)}
+                    ).encode("utf-8")
+                    entries[key] = {**stamp, "offset": f.tell()}
+                    f.write(line + b"\n")
+            os.replace(tmp_file, self.path)
+            self.entries = entries
+        except OSError as e:
+            logging.warning(f"Could not write report ledger {self.path}: {e}")
+        finally:
+            self.close()
+        logging.info(f"Report ledger: {self.hits} reports reused, {self.misses} parsed")
@@ -1,10 +1,32 @@
+from __future__ import annotations
+
+import heapq
+import io
+import itertools
 import json
 import logging
 import os
 import plistlib
 import re
+import tempfile
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import IO
+
+from autopkg_wrapper.utils.error_classifier import (
+    DEFAULT_ERROR_CLASSIFIER,
+    ErrorClassifier,
+    build_error_classifier,
+)
+from autopkg_wrapper.utils.jamf_lookup import JamfLookupCache
+from autopkg_wrapper.utils.recipe_index import get_recipe_index
+from autopkg_wrapper.utils.report_ledger import ReportLedger
+from autopkg_wrapper.utils.run_results import (
+    add_report_to_result,
+    new_result,
+    write_run_results,
+)
 
 
 def find_report_dirs(base_path: str) -> list[str]:
@@ -29,8 +51,10 @@ def find_report_dirs(base_path: str) -> list[str]:
     return sorted(dirs)
 
 
-def parse_json_file(path: str) -> dict:
+def parse_json_file(path: str, *, fileobj: IO[bytes] | None = None) -> dict:
     try:
+        if fileobj is not None:
+            return json.load(fileobj)
         with open(path, encoding="utf-8") as f:
             return json.load(f)
     except Exception:
@@ -82,65 +106,137 @@ def _build_recipe_link_map(
         return {}
 
     recipe_link_map: dict[str, str] = {}
-    for path in repo_root.rglob("*.recipe*"):
-        if not path.is_file():
-            continue
-        rel = path.relative_to(repo_root).as_posix()
-        recipe_base = path.name
-        recipe_name = recipe_base.split(".recipe", 1)[0]
-        if recipe_name not in recipe_link_map:
-            recipe_link_map[recipe_name] = f"{repo_url}/blob/{repo_branch}/{rel}"
+    index = get_recipe_index(repo_root)
+    for entry in index.entries:
+        if entry.name not in recipe_link_map:
+            rel = entry.path.relative_to(index.root).as_posix()
+            recipe_link_map[entry.name] = f"{repo_url}/blob/{repo_branch}/{rel}"
     return recipe_link_map
 
 
-def parse_text_file(path: str) -> dict[str, list]:
+# Text log patterns, compiled once. A line can only match one of them if it
+# contains one of these keywords, so most verbose log lines are rejected by
+# a single search.
+_TEXT_KEYWORDS = ("error", "upload", "policy ")
+_RE_TEXT_KEYWORDS = re.compile("|".join(_TEXT_KEYWORDS), re.IGNORECASE)
+_RE_TEXT_ERROR = re.compile(r"ERROR[:\s-]+(.+)", re.IGNORECASE)
+_RE_TEXT_POLICY = re.compile(r"Policy (created|updated):\s*(?P<name>.+)", re.IGNORECASE)
+
+# The upload pattern is written with possessive quantifiers so a long line
+# that doesn't match is rejected in one pass instead of being retried from
+# every position, which the lazy groups of a plain regex do.
+_RE_TEXT_UPLOAD = re.compile(
+    r"""
+    (?:(?!upload)[^\n])*+                 # skip to the first "upload"
+    (Uploaded|Upload|Uploading)
+    (?:[^\n]*?(?<![A-Za-z0-9 ._+\-]))??   # the name starts where a run
+                                          # of name characters does
+    (?P<name>
+        (?:[A-Za-z0-9 ._+\-](?!\s++\bversion\b|$))*+
+        [A-Za-z0-9 ._+\-]                 # and ends before " version"
+    )                                     # or at the end of the line
+    (?:[^\n]*?\bversion\b[^\d]*+(?P<version>\d++(?:\.\d++)+))?
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+_TEXT_CHUNK_SIZE = 1024 * 1024
+
+
+def parse_text_lines(lines) -> dict[str, list]:
+    """Extract uploads, policies and errors from autopkg log lines."""
     uploads: list[dict] = []
     policies: list[dict] = []
     errors: list[str] = []
 
-    re_error = re.compile(r"ERROR[:\s-]+(.+)", re.IGNORECASE)
-    re_upload = re.compile(
-        r"(Uploaded|Upload|Uploading)[^\n]*?(?P<name>[A-Za-z0-9 ._+\-]+?)(?=(?:\s+\bversion\b)|$)(?:[^\n]*?\bversion\b[^\d]*(?P<version>\d+(?:\.\d+)+))?",
-        re.IGNORECASE,
-    )
-    re_policy = re.compile(r"Policy (created|updated):\s*(?P<name>.+)", re.IGNORECASE)
+    for line in lines:
+        if not _RE_TEXT_KEYWORDS.search(line):
+            continue
 
-    try:
-        with open(path, encoding="utf-8", errors="ignore") as f:
-            for line in f:
-                m_err = re_error.search(line)
-                if m_err:
-                    errors.append(m_err.group(1).strip())
-                    continue
-
-                m_up = re_upload.search(line)
-                if m_up:
-                    uploads.append(
-                        {
-                            "name": (m_up.group("name") or "").strip(),
-                            "version": (m_up.group("version") or "-") or "-",
-                        }
-                    )
-                    continue
+        m_err = _RE_TEXT_ERROR.search(line)
+        if m_err:
+            errors.append(m_err.group(1).strip())
+            continue
 
-                m_pol = re_policy.search(line)
-                if m_pol:
-                    action = "updated" if "updated" in line.lower() else "created"
-                    policies.append(
-                        {
-                            "name": m_pol.group("name").strip(),
-                            "action": action,
-                        }
-                    )
-    except Exception:
-        pass
+        m_up = _RE_TEXT_UPLOAD.match(line)
+        if m_up:
+            uploads.append(
+                {
+                    "name": m_up.group("name").strip(),
+                    "version": m_up.group("version") or "-",
+                }
+            )
+            continue
+
+        m_pol = _RE_TEXT_POLICY.search(line)
+        if m_pol:
+            action = "updated" if "updated" in line.lower() else "created"
+            policies.append(
+                {
+                    "name": m_pol.group("name").strip(),
+                    "action": action,
+                }
+            )
 
     return {"uploads": uploads, "policies": policies, "errors": errors}
 
 
+def _iter_keyword_lines(f, chunk_size: int = _TEXT_CHUNK_SIZE):
+    """Yield only the lines of a text file that contain a log keyword.
+
+    The file is read in chunks and the keyword search runs over each chunk
+    as a whole, so lines without a keyword are never split out. A read
+    error ends the file early rather than losing what was parsed before it.
+    """
+    pending = ""
+    while True:
+        try:
+            chunk = f.read(chunk_size)
+        except Exception:
+            return
+        if not chunk:
+            break
+        block = pending + chunk
+        cut = block.rfind("\n") + 1
+        block, pending = block[:cut], block[cut:]
+        yield from _keyword_lines(block)
+    yield from _keyword_lines(pending)
+
+
+def _keyword_lines(block: str):
+    line_end = -1
+    for m in _RE_TEXT_KEYWORDS.finditer(block):
+        start, end = m.span()
+        if start <= line_end:
+            continue
+        line_start = block.rfind("\n", 0, start) + 1
+        line_end = block.find("\n", end)
+        if line_end == -1:
+            yield block[line_start:]
+            return
+        yield block[line_start : line_end + 1]
+
+
+def parse_text_file(path: str, *, fileobj: IO[bytes] | None = None) -> dict[str, list]:
+    try:
+        with (
+            io.TextIOWrapper(fileobj, encoding="utf-8", errors="ignore")
+            if fileobj is not None
+            else open(path, encoding="utf-8", errors="ignore")
+        ) as f:
+            return parse_text_lines(_iter_keyword_lines(f))
+    except Exception:
+        return {"uploads": [], "policies": [], "errors": []}
+
+
 def parse_plist_file(
-    path: str, *, recipe_link_map: dict[str, str] | None = None
+    path: str,
+    *,
+    recipe_link_map: dict[str, str] | None = None,
+    fileobj: IO[bytes] | None = None,
+    error_classifier: ErrorClassifier | None = None,
 ) -> dict[str, list]:
+    classifier = error_classifier or DEFAULT_ERROR_CLASSIFIER
     uploads: list[dict] = []
     policies: list[dict] = []
     errors: list[str] = []
@@ -149,10 +245,16 @@ def parse_plist_file(
     error_rows: list[dict] = []
 
     try:
-        with open(path, "rb") as f:
-            plist = plistlib.load(f)
+        if fileobj is not None:
+            # Binary plists seek around the file, which is slow on a
+            # compressed zip member, so read it into memory first
+            plist = plistlib.loads(fileobj.read())
+        else:
+            with open(path, "rb") as f:
+                plist = plistlib.load(f)
     except Exception:
         return {
+            "recipe_name": _infer_recipe_identifier_from_filename(path),
             "uploads": uploads,
             "policies": policies,
             "errors": errors,
@@ -261,11 +363,12 @@ def parse_plist_file(
         error_rows.append(
             {
                 "recipe_name": rec,
-                "error_type": _classify_error_simple(msg),
+                "error_type": classifier.classify(msg),
             }
         )
 
     return {
+        "recipe_name": recipe_name,
         "uploads": uploads,
         "policies": policies,
         "errors": errors,
@@ -275,128 +378,554 @@ def parse_plist_file(
     }
 
 
-def aggregate_reports(
-    base_path: str,
-    *,
-    recipe_link_map: dict[str, str] | None = None,
-) -> dict:
-    summary = {
-        "uploads": [],
-        "policies": [],
-        "errors": [],
-        "recipes": 0,
-        "upload_rows": [],
-        "policy_rows": [],
-        "error_rows": [],
-    }
-    report_dirs = find_report_dirs(base_path)
+def _row_sort_key(row: dict) -> str:
+    return str(row.get("recipe_name", "")).lower()
+
+
+def _plausible_app_name(n: str) -> bool:
+    if not n or n == "-":
+        return False
+    if n.lower() in {"apps", "packages", "pkg", "file", "37"}:
+        return False
+    return re.search(r"[A-Za-z]", n) is not None
+
+
+class RowSpool:
+    """Append-only row store that can spill to disk.
+
+    Rows are kept in memory until `spill_rows` of them have accumulated,
+    then written to a temporary JSON-lines file as one run (sorted by
+    `sort_key` when given). Iterating with `ordered=True` merges the runs
+    with `heapq.merge`, which gives the same order as a stable `sorted()`
+    over every row. Unordered iteration only preserves insertion order
+    when there is no `sort_key`.
+    """
+
+    def __init__(self, sort_key=None, spill_rows: int = 0, spill_dir=None):
+        self.sort_key = sort_key
+        self.spill_rows = spill_rows
+        self._spill_dir = spill_dir
+        self._buffer: list[dict] = []
+        self._runs: list[str] = []
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, row: dict) -> None:
+        self._buffer.append(row)
+        self._count += 1
+        if self.spill_rows and len(self._buffer) >= self.spill_rows:
+            self._spill()
+
+    def extend(self, rows) -> None:
+        for row in rows:
+            self.append(row)
+
+    def _spill(self) -> None:
+        rows = self._buffer
+        if self.sort_key is not None:
+            rows = sorted(rows, key=self.sort_key)
+        fd, path = tempfile.mkstemp(
+            prefix="rows-", suffix=".jsonl", dir=self._spill_dir()
+        )
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row))
+                f.write("\n")
+        self._runs.append(path)
+        self._buffer = []
+
+    @staticmethod
+    def _read_run(path: str):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def __iter__(self):
+        return self.iter(ordered=False)
+
+    def iter(self, ordered: bool = False):
+        """Iterate over rows, in insertion order or sorted by `sort_key`."""
+        if ordered and self.sort_key is not None:
+            runs = [self._read_run(path) for path in self._runs]
+            runs.append(iter(sorted(self._buffer, key=self.sort_key)))
+            return heapq.merge(*runs, key=self.sort_key)
+        return itertools.chain(
+            *(self._read_run(path) for path in self._runs), self._buffer
+        )
+
+
+class ReportAggregator:
+    """Fold parsed reports into running totals as they are read.
+
+    Counts, the per-app version sets and per-policy action sets used by the
+    rendered summary, and error categories are updated per report, so
+    rendering doesn't need another pass over every upload. Table rows go
+    into RowSpools; with `spill_rows` set, at most that many rows per table
+    are held in memory and the rest are written to a temporary directory.
+
+    `keep_raw` also keeps the raw upload/policy/error items so that
+    `to_summary()` can return the classic summary dict. Errors are counted
+    by the categories of `error_classifier`; plist reports carry the
+    category on their error rows, so those messages aren't classified
+    again.
+    """
+
+    def __init__(
+        self,
+        *,
+        keep_raw: bool = False,
+        spill_rows: int = 0,
+        error_classifier: ErrorClassifier | None = None,
+    ):
+        self.keep_raw = keep_raw
+        self.error_classifier = error_classifier or DEFAULT_ERROR_CLASSIFIER
+        self.recipes = 0
+        self.upload_count = 0
+        self.policy_count = 0
+        self.error_count = 0
+        self.uploads_by_app: dict[str, set] = {}
+        self.policies_by_name: dict[str, set] = {}
+        self.error_categories: dict[str, int] = dict.fromkeys(
+            self.error_classifier.category_names, 0
+        )
+        self.uploads: list = []
+        self.policies: list = []
+        self.errors: list = []
+        self.package_links: dict[str, str] = {}
+        self.policy_links: dict[str, str] = {}
+        # One run results row per recipe seen in a plist report
+        self.recipe_results: dict[str, dict] = {}
+
+        self._tmpdir = None
+        self.rows = {
+            "upload_rows": RowSpool(_row_sort_key, spill_rows, self._spill_dir),
+            "policy_rows": RowSpool(_row_sort_key, spill_rows, self._spill_dir),
+            "error_rows": RowSpool(None, spill_rows, self._spill_dir),
+        }
+
+    def _spill_dir(self) -> str:
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.TemporaryDirectory(prefix="autopkg_reports-")
+        return self._tmpdir.name
+
+    def close(self) -> None:
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+            self._tmpdir = None
+
+    @classmethod
+    def from_summary(cls, summary: dict) -> ReportAggregator:
+        """Build an aggregator from a classic summary dict."""
+        aggregator = cls(keep_raw=True)
+        aggregator.add_items(
+            summary.get("uploads", []),
+            summary.get("policies", []),
+            summary.get("errors", []),
+        )
+        for key, spool in aggregator.rows.items():
+            spool.extend(summary.get(key, []))
+        aggregator.recipes = summary.get("recipes", 0)
+        return aggregator
+
+    def add_items(self, uploads, policies, errors, error_types=None) -> None:
+        """Count raw items; `error_types` gives the errors' categories if known."""
+        for u in uploads:
+            if isinstance(u, dict):
+                name = (u.get("name") or "-").strip()
+                ver = (u.get("version") or "-").strip()
+            else:
+                name = str(u).strip()
+                ver = "-"
+            if not _plausible_app_name(name):
+                name = "-"
+            self.uploads_by_app.setdefault(name, set()).add(ver)
+            self.upload_count += 1
+
+        for p in policies:
+            if isinstance(p, dict):
+                name = (p.get("name") or "-").strip()
+                action = (p.get("action") or "-").strip()
+            else:
+                name = str(p).strip()
+                action = "-"
+            self.policies_by_name.setdefault(name, set()).add(action)
+            self.policy_count += 1
+
+        if error_types is None or len(error_types) != len(errors):
+            classify = self.error_classifier.classify
+            error_types = [
+                classify(e if isinstance(e, str) else json.dumps(e)) for e in errors
+            ]
+        for cat in error_types:
+            self.error_categories[cat] = self.error_categories.get(cat, 0) + 1
+            self.error_count += 1
+
+        if self.keep_raw:
+            self.uploads.extend(uploads)
+            self.policies.extend(policies)
+            self.errors.extend(errors)
+
+    def add_report(self, kind: str, data) -> None:
+        """Fold one parsed report file into the totals.
+
+        Args:
+            kind: "plist", "json" or "text", as returned by parse_report_file
+            data: The parsed report
+        """
+        if kind == "plist":
+            # parse_plist_file writes one error row per error, in order
+            self.add_items(
+                data.get("uploads", []),
+                data.get("policies", []),
+                data.get("errors", []),
+                error_types=[
+                    row.get("error_type") or "other"
+                    for row in data.get("error_rows", [])
+                ],
+            )
+            for key, spool in self.rows.items():
+                spool.extend(data.get(key, []))
+            self.recipes += 1
+            name = data.get("recipe_name") or "-"
+            result = self.recipe_results.get(name)
+            if result is None:
+                result = self.recipe_results[name] = new_result(name)
+            add_report_to_result(result, data)
+        elif kind == "json":
+            if not data or not isinstance(data, dict):
+                return
+            uploads = data.get("uploads")
+            policies = data.get("policies")
+            errors = data.get("errors")
+            recipes = data.get("recipes")
+            self.add_items(
+                uploads if isinstance(uploads, list) else [],
+                policies if isinstance(policies, list) else [],
+                errors if isinstance(errors, list) else [],
+            )
+            if isinstance(errors, list):
+                self.rows["error_rows"].extend(
+                    {
+                        "recipe_name": e.get("recipe") or "-",
+                        "error_type": self.error_classifier.classify(
+                            str(e.get("message") or json.dumps(e))
+                        ),
+                    }
+                    for e in errors
+                    if isinstance(e, dict)
+                )
+            if isinstance(recipes, int):
+                self.recipes += recipes
+        else:
+            self.add_items(
+                data.get("uploads", []),
+                data.get("policies", []),
+                data.get("errors", []),
+            )
+
+    def link_packages(self, pkg_map: dict[str, str]) -> int:
+        """Link upload rows to Jamf packages, returning how many matched."""
+        self.package_links = _case_insensitive_links(pkg_map)
+        return sum(1 for row in self.iter_rows("upload_rows") if row.get("package_url"))
+
+    def link_policies(self, policy_map: dict[str, str]) -> int:
+        """Link policy rows to Jamf policies, returning how many matched."""
+        self.policy_links = _case_insensitive_links(policy_map)
+        return sum(1 for row in self.iter_rows("policy_rows") if row.get("policy_url"))
+
+    def iter_rows(self, key: str, ordered: bool = False):
+        """Iterate over a row table, applying any Jamf links set on the aggregator."""
+        for row in self.rows[key].iter(ordered=ordered):
+            if key == "upload_rows" and self.package_links:
+                _link_row(row, "package", "package_url", self.package_links)
+            elif key == "policy_rows" and self.policy_links:
+                _link_row(row, "policy", "policy_url", self.policy_links)
+            yield row
+
+    def to_summary(self) -> dict:
+        """Return the classic summary dict (requires keep_raw)."""
+        return {
+            "uploads": list(self.uploads),
+            "policies": list(self.policies),
+            "errors": list(self.errors),
+            "recipes": self.recipes,
+            "upload_rows": list(self.iter_rows("upload_rows")),
+            "policy_rows": list(self.iter_rows("policy_rows")),
+            "error_rows": list(self.iter_rows("error_rows")),
+        }
+
 
-    for repdir in report_dirs:
+def _link_row(row: dict, name_key: str, url_key: str, links: dict[str, str]) -> bool:
+    name = str(row.get(name_key) or "").strip()
+    url = links.get(name) or links.get(f"\0{name.lower()}")
+    if url:
+        row[url_key] = url
+        return True
+    return False
+
+
+def _case_insensitive_links(links: dict[str, str]) -> dict[str, str]:
+    # Lower-cased names are prefixed with NUL so they can't shadow exact
+    # matches in the same dict
+    return {**{f"\0{k.lower()}": v for k, v in links.items()}, **links}
+
+
+def iter_report_files(base_path: str):
+    """Yield every report file under the report directories of `base_path`."""
+    for repdir in find_report_dirs(base_path):
         for root, _subdirs, files in os.walk(repdir):
             for fn in files:
-                p = os.path.join(root, fn)
-                ext = os.path.splitext(fn)[1].lower()
-
-                if ext == ".plist":
-                    data = parse_plist_file(p, recipe_link_map=recipe_link_map)
-                    summary["uploads"] += data.get("uploads", [])
-                    summary["policies"] += data.get("policies", [])
-                    summary["errors"] += data.get("errors", [])
-                    summary["upload_rows"] += data.get("upload_rows", [])
-                    summary["policy_rows"] += data.get("policy_rows", [])
-                    summary["error_rows"] += data.get("error_rows", [])
-                    summary["recipes"] += 1
-                elif ext == ".json":
-                    data = parse_json_file(p)
-                    if not data:
-                        continue
-                    if isinstance(data, dict):
-                        uploads = data.get("uploads")
-                        policies = data.get("policies")
-                        errors = data.get("errors")
-                        recipes = data.get("recipes")
-                        if isinstance(uploads, list):
-                            summary["uploads"] += uploads
-                        if isinstance(policies, list):
-                            summary["policies"] += policies
-                        if isinstance(errors, list):
-                            summary["errors"] += errors
-                            summary["error_rows"] += [
-                                {
-                                    "recipe_name": e.get("recipe") or "-",
-                                    "error_type": _classify_error_simple(
-                                        str(e.get("message") or json.dumps(e))
-                                    ),
-                                }
-                                for e in errors
-                                if isinstance(e, dict)
-                            ]
-                        if isinstance(recipes, int):
-                            summary["recipes"] += recipes
-                else:
-                    data = parse_text_file(p)
-                    summary["uploads"] += data.get("uploads", [])
-                    summary["policies"] += data.get("policies", [])
-                    summary["errors"] += data.get("errors", [])
+                yield os.path.join(root, fn)
+
+
+def zip_report_members(zf: zipfile.ZipFile) -> list[str]:
+    """Return the report members of a zip, as find_report_dirs would see them.
+
+    Members under `autopkg_report-*` directories are returned; if the zip
+    has none, every member is returned provided there are files at its top
+    level.
+    """
+    names = sorted(info.filename for info in zf.infolist() if not info.is_dir())
+    report_dirs: set[str] = set()
+    for name in names:
+        parts = name.split("/")[:-1]
+        for i, part in enumerate(parts):
+            if part.startswith("autopkg_report-"):
+                report_dirs.add("/".join(parts[: i + 1]) + "/")
+    if not report_dirs:
+        return names if any("/" not in name for name in names) else []
+    return [
+        name
+        for report_dir in sorted(report_dirs)
+        for name in names
+        if name.startswith(report_dir)
+    ]
 
-    return summary
 
+def iter_report_sources(base_path: str | None, zip_files=()):
+    """Yield report files under `base_path`, then members of each zip.
 
-# ---------- Rendering ----------
+    Files are yielded as paths and zip members as (zip_path, member) tuples.
+    """
+    if base_path is not None:
+        yield from iter_report_files(base_path)
+    for zip_path in zip_files:
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            members = zip_report_members(zf)
+        for member in members:
+            yield (zip_path, member)
 
 
-def _aggregate_for_display(
-    summary: dict,
-) -> tuple[dict[str, set], dict[str, set], dict[str, int]]:
-    uploads = summary.get("uploads", [])
-    policies = summary.get("policies", [])
-    errors = summary.get("errors", [])
-
-    def plausible_app_name(n: str) -> bool:
-        if not n or n == "-":
-            return False
-        if n.lower() in {"apps", "packages", "pkg", "file", "37"}:
-            return False
-        return re.search(r"[A-Za-z]", n) is not None
-
-    uploads_by_app: dict[str, set] = {}
-    for u in uploads:
-        if isinstance(u, dict):
-            name = (u.get("name") or "-").strip()
-            ver = (u.get("version") or "-").strip()
-        else:
-            name = str(u).strip()
-            ver = "-"
-        if not plausible_app_name(name):
-            name = "-"
-        uploads_by_app.setdefault(name, set()).add(ver)
-
-    policies_by_name: dict[str, set] = {}
-    for p in policies:
-        if isinstance(p, dict):
-            name = (p.get("name") or "-").strip()
-            action = (p.get("action") or "-").strip()
+def parse_report_file(
+    path: str,
+    *,
+    recipe_link_map: dict[str, str] | None = None,
+    fileobj: IO[bytes] | None = None,
+    error_classifier: ErrorClassifier | None = None,
+) -> tuple[str, object]:
+    """Parse a single report file according to its extension.
+
+    Args:
+        path: Path of the report; only its name is used when `fileobj` is given
+        recipe_link_map: Optional map of recipe name to repo URL
+        fileobj: Optional binary file object to read the report from
+        error_classifier: Classifier for plist error rows (defaults to the
+            built-in categories)
+
+    Returns:
+        Tuple of (kind, data) where kind is "plist", "json" or "text"
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".plist":
+        return "plist", parse_plist_file(
+            path,
+            recipe_link_map=recipe_link_map,
+            fileobj=fileobj,
+            error_classifier=error_classifier,
+        )
+    if ext == ".json":
+        return "json", parse_json_file(path, fileobj=fileobj)
+    return "text", parse_text_file(path, fileobj=fileobj)
+
+
+def _parse_report_source(
+    source: str | tuple[str, str],
+    recipe_link_map: dict[str, str] | None,
+    open_zips: dict[str, zipfile.ZipFile],
+    error_classifier: ErrorClassifier | None = None,
+) -> tuple[str, object]:
+    if isinstance(source, str):
+        return parse_report_file(
+            source, recipe_link_map=recipe_link_map, error_classifier=error_classifier
+        )
+    zip_path, member = source
+    zf = open_zips.get(zip_path)
+    if zf is None:
+        zf = open_zips[zip_path] = zipfile.ZipFile(zip_path, "r")
+    with zf.open(member) as f:
+        return parse_report_file(
+            member,
+            recipe_link_map=recipe_link_map,
+            fileobj=f,
+            error_classifier=error_classifier,
+        )
+
+
+_WORKER_LINK_MAP: dict[str, str] | None = None
+_WORKER_CLASSIFIER: ErrorClassifier | None = None
+_WORKER_ZIPS: dict[str, zipfile.ZipFile] = {}
+
+
+def _init_parse_worker(
+    recipe_link_map: dict[str, str] | None,
+    error_classifier: ErrorClassifier | None = None,
+) -> None:
+    global _WORKER_LINK_MAP, _WORKER_CLASSIFIER
+    _WORKER_LINK_MAP = recipe_link_map
+    _WORKER_CLASSIFIER = error_classifier
+
+
+def _parse_report_file_in_worker(
+    source: str | tuple[str, str],
+) -> tuple[str, object]:
+    return _parse_report_source(
+        source, _WORKER_LINK_MAP, _WORKER_ZIPS, _WORKER_CLASSIFIER
+    )
+
+
+def _parse_report_files(
+    sources,
+    recipe_link_map: dict[str, str] | None,
+    workers: int = 1,
+    error_classifier: ErrorClassifier | None = None,
+):
+    """Yield (kind, data) for each report source, in the order given."""
+    if workers <= 1:
+        open_zips: dict[str, zipfile.ZipFile] = {}
+        try:
+            for source in sources:
+                yield _parse_report_source(
+                    source, recipe_link_map, open_zips, error_classifier
+                )
+        finally:
+            for zf in open_zips.values():
+                zf.close()
+        return
+
+    paths = list(sources)
+    if not paths:
+        return
+    # Larger chunks cut down on pickling round trips for the many small
+    # files a report directory usually holds
+    chunksize = max(1, min(64, len(paths) // (workers * 4)))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_parse_worker,
+        initargs=(recipe_link_map, error_classifier),
+    ) as executor:
+        yield from executor.map(
+            _parse_report_file_in_worker, paths, chunksize=chunksize
+        )
+
+
+def _parse_with_ledger(
+    sources,
+    recipe_link_map: dict[str, str] | None,
+    workers: int,
+    ledger,
+    error_classifier: ErrorClassifier | None = None,
+):
+    """Parse the sources the ledger misses and merge in its cached results."""
+    sources = list(sources)
+    current = [ledger.is_current(source) for source in sources]
+    missing = [source for source, hit in zip(sources, current, strict=True) if not hit]
+    fresh = iter(
+        _parse_report_files(missing, recipe_link_map, workers, error_classifier)
+    )
+    for source, hit in zip(sources, current, strict=True):
+        if hit:
+            # Read back one at a time, so cached results aren't all held
+            yield ledger.cached(source)
         else:
-            name = str(p).strip()
-            action = "-"
-        policies_by_name.setdefault(name, set()).add(action)
-
-    error_categories: dict[str, int] = {
-        "trust": 0,
-        "signature": 0,
-        "download": 0,
-        "network": 0,
-        "auth": 0,
-        "jamf": 0,
-        "other": 0,
-    }
+            parsed = next(fresh)
+            ledger.record(source, *parsed)
+            yield parsed
 
-    for e in errors:
-        emsg = e if isinstance(e, str) else json.dumps(e)
-        cat = _classify_error_simple(emsg)
-        error_categories[cat] = error_categories.get(cat, 0) + 1
 
-    return uploads_by_app, policies_by_name, error_categories
+def aggregate_reports(
+    base_path: str | None,
+    *,
+    recipe_link_map: dict[str, str] | None = None,
+    streaming: bool = False,
+    spill_rows: int = 0,
+    workers: int = 1,
+    zip_files=(),
+    ledger: ReportLedger | None = None,
+    error_classifier: ErrorClassifier | None = None,
+) -> dict | ReportAggregator:
+    """Parse every report under `base_path` and combine the results.
+
+    Reports inside `zip_files` are read in place, without extracting them;
+    `base_path` may be None when only zips are processed.
+
+    By default the classic summary dict is returned. With `streaming=True`
+    the ReportAggregator is returned instead, and the raw upload, policy
+    and error items are not kept; `spill_rows` then bounds how many table
+    rows are held in memory.
+
+    With `workers` above 1, files are parsed in a process pool. Parsed
+    reports are still folded in directory-walk order, so the result is the
+    same as a serial parse.
+
+    With a `ledger`, only reports that are new or have changed since the
+    ledger was saved are parsed; the rest come from the ledger. The caller
+    saves the ledger.
+
+    Errors are categorised with `error_classifier`, or the built-in
+    categories when it isn't given.
+    """
+    aggregator = ReportAggregator(
+        keep_raw=not streaming,
+        spill_rows=spill_rows if streaming else 0,
+        error_classifier=error_classifier,
+    )
+    sources = iter_report_sources(base_path, zip_files)
+    if ledger is not None:
+        parsed = _parse_with_ledger(
+            sources, recipe_link_map, workers, ledger, error_classifier
+        )
+    else:
+        parsed = _parse_report_files(
+            sources, recipe_link_map, workers, error_classifier
+        )
+    for kind, data in parsed:
+        aggregator.add_report(kind, data)
+
+    if streaming:
+        return aggregator
+    return aggregator.to_summary()
+
+
+# ---------- Rendering ----------
+
+
+def _as_aggregator(summary: dict | ReportAggregator) -> ReportAggregator:
+    if isinstance(summary, ReportAggregator):
+        return summary
+    return ReportAggregator.from_summary(summary)
+
+
+def _aggregate_for_display(
+    summary: dict | ReportAggregator,
+) -> tuple[dict[str, set], dict[str, set], dict[str, int]]:
+    aggregator = _as_aggregator(summary)
+    return (
+        aggregator.uploads_by_app,
+        aggregator.policies_by_name,
+        aggregator.error_categories,
+    )
 
 
 def render_job_summary(summary: dict, environment: str, run_date: str) -> str:
@@ -412,12 +941,12 @@ def render_job_summary(summary: dict, environment: str, run_date: str) -> str:
         lines.append("# Autopkg Report Summary")
     lines.append("")
 
-    total_uploads_raw = len(summary.get("uploads", []))
-    uploads_by_app, policies_by_name, error_categories = _aggregate_for_display(summary)
-    total_uploads_apps = len(uploads_by_app)
-    total_policies = len(policies_by_name)
-    total_errors = len(summary.get("errors", []))
-    recipes = summary.get("recipes") or "N/A"
+    aggregator = _as_aggregator(summary)
+    total_uploads_raw = aggregator.upload_count
+    total_uploads_apps = len(aggregator.uploads_by_app)
+    total_policies = len(aggregator.policies_by_name)
+    total_errors = aggregator.error_count
+    recipes = aggregator.recipes or "N/A"
 
     lines.append("| Metric | Value |")
     lines.append("| --- | --- |")
@@ -429,14 +958,12 @@ def render_job_summary(summary: dict, environment: str, run_date: str) -> str:
     lines.append(f"| Errors | {total_errors} |")
     lines.append("")
 
-    if summary.get("upload_rows"):
+    if aggregator.rows["upload_rows"]:
         lines.append("## Uploaded Recipes")
         lines.append("")
         lines.append("| Recipe Name | Identifier | Package | Version |")
         lines.append("| --- | --- | --- | --- |")
-        for row in sorted(
-            summary["upload_rows"], key=lambda r: str(r.get("recipe_name", "")).lower()
-        ):
+        for row in aggregator.iter_rows("upload_rows", ordered=True):
             pkg = row.get("package", "-")
             pkg_url = row.get("package_url")
             pkg_cell = f"[{pkg}]({pkg_url})" if pkg_url else pkg
@@ -454,14 +981,12 @@ def render_job_summary(summary: dict, environment: str, run_date: str) -> str:
         lines.append("No uploads in this run.")
         lines.append("")
 
-    if summary.get("policy_rows"):
+    if aggregator.rows["policy_rows"]:
         lines.append("## Policy Recipes")
         lines.append("")
         lines.append("| Recipe Name | Identifier | Policy |")
         lines.append("| --- | --- | --- |")
-        for row in sorted(
-            summary["policy_rows"], key=lambda r: str(r.get("recipe_name", "")).lower()
-        ):
+        for row in aggregator.iter_rows("policy_rows", ordered=True):
             recipe_identifier = row.get("recipe_identifier", "-")
             recipe_name = _display_recipe_name(str(recipe_identifier))
             recipe_url = row.get("recipe_url")
@@ -479,7 +1004,7 @@ def render_job_summary(summary: dict, environment: str, run_date: str) -> str:
         lines.append("")
         lines.append("| Recipe | Error Type |")
         lines.append("| --- | --- |")
-        for row in summary.get("error_rows", []):
+        for row in aggregator.iter_rows("error_rows"):
             lines.append(
                 f"| {row.get('recipe_name', '-')} | {row.get('error_type', 'other')} |"
             )
@@ -490,10 +1015,8 @@ def render_job_summary(summary: dict, environment: str, run_date: str) -> str:
 
 def render_issue_body(summary: dict, environment: str, run_date: str) -> str:
     lines: list[str] = []
-    total_errors = len(summary.get("errors", []))
-    _uploads_by_app, _policies_by_name, _error_categories = _aggregate_for_display(
-        summary
-    )
+    aggregator = _as_aggregator(summary)
+    total_errors = aggregator.error_count
 
     prefix = "Autopkg run"
     suffix_bits: list[str] = []
@@ -510,7 +1033,7 @@ def render_issue_body(summary: dict, environment: str, run_date: str) -> str:
     lines.append("### Errors")
     lines.append("| Recipe | Error Type |")
     lines.append("| --- | --- |")
-    for row in summary.get("error_rows", []):
+    for row in aggregator.iter_rows("error_rows"):
         lines.append(
             f"| {row.get('recipe_name', '-')} | {row.get('error_type', 'other')} |"
         )
@@ -520,222 +1043,17 @@ def render_issue_body(summary: dict, environment: str, run_date: str) -> str:
     return "\n".join(lines)
 
 
-def _classify_error_simple(msg: str) -> str:
-    lm = msg.lower()
-    if "trust" in lm:
-        return "trust"
-    if "signature" in lm or "codesign" in lm:
-        return "signature"
-    if "download" in lm or "fetch" in lm or "curl" in lm:
-        return "download"
-    if (
-        "proxy" in lm
-        or "timeout" in lm
-        or "network" in lm
-        or "url" in lm
-        or "dns" in lm
-    ):
-        return "network"
-    if (
-        "401" in lm
-        or "403" in lm
-        or "auth" in lm
-        or "token" in lm
-        or "permission" in lm
-    ):
-        return "auth"
-    if "jamf" in lm or "policy" in lm:
-        return "jamf"
-    return "other"
-
-
-# ---------- Jamf Helpers ----------
-
-
-def _coerce_jamf_items(items) -> list:
-    if not items:
+def _split_zip_files(zip_file: str | list[str] | None) -> list[str]:
+    if not zip_file:
         return []
-    if isinstance(items, list):
-        return items
-    if isinstance(items, dict):
-        for key in ("results", "items", "data", "packages", "policies"):
-            value = items.get(key)
-            if isinstance(value, list):
-                return value
-    for attr in ("results", "items", "data"):
-        value = getattr(items, attr, None)
-        if isinstance(value, list):
-            return value
-    try:
-        return list(items)
-    except TypeError:
-        return []
-
-
-def _extract_classic_policy_items(response) -> list[dict]:
-    if response is None:
-        return []
-    try:
-        data = response.json()
-    except Exception:
-        return []
-    if not isinstance(data, dict):
-        return []
-    items = data.get("policies") or data.get("policy")
-    if isinstance(items, dict):
-        items = items.get("policy") or items
-    if isinstance(items, list):
-        return [i for i in items if isinstance(i, dict)]
-    if isinstance(items, dict) and {"id", "name"}.issubset(items.keys()):
-        return [items]
-    return []
-
-
-def _normalize_host(url: str) -> str:
-    h = (url or "").strip()
-    if h.startswith("https://"):
-        h = h[len("https://") :]
-    if h.startswith("http://"):
-        h = h[len("http://") :]
-    return h.rstrip("/")
-
-
-def build_pkg_map(
-    jss_url: str,
-    client_id: str,
-    client_secret: str,
-    errors: list[str] | None = None,
-) -> dict[str, str]:
-    pkg_map: dict[str, str] = {}
-    try:
-        from jamf_pro_sdk import (  # type: ignore
-            ApiClientCredentialsProvider,
-            JamfProClient,
-        )
-
-        client = JamfProClient(
-            _normalize_host(jss_url),
-            ApiClientCredentialsProvider(client_id, client_secret),
-        )
-        packages = client.pro_api.get_packages_v1()
-        for p in _coerce_jamf_items(packages):
-            try:
-                name = str(p.packageName).strip()
-                pid = str(p.id).strip()
-            except Exception as e:  # noqa: F841
-                # ignore objects that do not match expected shape
-                continue
-            if not name or not pid:
-                continue
-            url = f"{jss_url}/view/settings/computer-management/packages/{pid}"
-            if name not in pkg_map:
-                pkg_map[name] = url
-    except Exception as e:  # noqa: F841
-        if errors is not None:
-            errors.append(f"packages lookup failed: {e!r}")
-        logging.exception("Jamf package lookup failed")
-        return {}
-    return pkg_map
-
-
-def build_policy_map(
-    jss_url: str,
-    client_id: str,
-    client_secret: str,
-    errors: list[str] | None = None,
-) -> dict[str, str]:
-    policy_map: dict[str, str] = {}
-    try:
-        from jamf_pro_sdk import (  # type: ignore
-            ApiClientCredentialsProvider,
-            JamfProClient,
-        )
-
-        client = JamfProClient(
-            _normalize_host(jss_url),
-            ApiClientCredentialsProvider(client_id, client_secret),
-        )
-        if not hasattr(client, "classic_api_request"):
-            raise AttributeError("Jamf SDK has no classic API request method")
-        resp = client.classic_api_request(
-            "GET", "policies", override_headers={"Accept": "application/json"}
-        )
-        if not getattr(resp, "ok", False):
-            status = getattr(resp, "status_code", "unknown")
-            body = (getattr(resp, "text", "") or "").strip()
-            snippet = body[:200] if body else ""
-            raise RuntimeError(f"Classic policies request failed: {status} {snippet}")
-        policies = _extract_classic_policy_items(resp)
-        for p in _coerce_jamf_items(policies):
-            try:
-                name = str(getattr(p, "name", "") or p.get("name")).strip()
-                pid = str(getattr(p, "id", "") or p.get("id")).strip()
-            except Exception:
-                continue
-            if not name or not pid:
-                continue
-            url = f"{jss_url}/policies.html?id={pid}"
-            if name not in policy_map:
-                policy_map[name] = url
-    except Exception as e:  # noqa: F841
-        if errors is not None:
-            errors.append(f"policies lookup failed: {e!r}")
-        logging.exception("Jamf policy lookup failed")
-        return {}
-    return policy_map
-
-
-def enrich_upload_rows(upload_rows: list[dict], pkg_map: dict[str, str]) -> int:
-    linked = 0
-    norm_map = {k.lower(): v for k, v in pkg_map.items()}
-    for row in upload_rows:
-        pkg_name = str(row.get("package") or "").strip()
-        url = pkg_map.get(pkg_name) or norm_map.get(pkg_name.lower())
-        if url:
-            row["package_url"] = url
-            linked += 1
-    return linked
-
-
-def enrich_policy_rows(policy_rows: list[dict], policy_map: dict[str, str]) -> int:
-    linked = 0
-    norm_map = {k.lower(): v for k, v in policy_map.items()}
-    for row in policy_rows:
-        policy_name = str(row.get("policy") or "").strip()
-        url = policy_map.get(policy_name) or norm_map.get(policy_name.lower())
-        if url:
-            row["policy_url"] = url
-            linked += 1
-    return linked
-
-
-def enrich_upload_rows_with_jamf(
-    summary: dict,
-    jss_url: str,
-    client_id: str,
-    client_secret: str,
-    errors: list[str] | None = None,
-) -> tuple[int, list[str]]:
-    pkg_map = build_pkg_map(jss_url, client_id, client_secret, errors=errors)
-    linked = enrich_upload_rows(summary.get("upload_rows", []), pkg_map)
-    return linked, sorted(set(pkg_map.keys()))
-
-
-def enrich_policy_rows_with_jamf(
-    summary: dict,
-    jss_url: str,
-    client_id: str,
-    client_secret: str,
-    errors: list[str] | None = None,
-) -> tuple[int, list[str]]:
-    policy_map = build_policy_map(jss_url, client_id, client_secret, errors=errors)
-    linked = enrich_policy_rows(summary.get("policy_rows", []), policy_map)
-    return linked, sorted(set(policy_map.keys()))
+    if isinstance(zip_file, str):
+        zip_file = zip_file.split(",")
+    return [z.strip() for z in zip_file if z and z.strip()]
 
 
 def process_reports(
     *,
-    zip_file: str | None,
+    zip_file: str | list[str] | None,
     extract_dir: str,
     reports_dir: str | None,
     environment: str = "",
@@ -746,17 +1064,49 @@ def process_reports(
     repo_url: str | None = None,
     repo_branch: str | None = None,
     repo_path: str | None = None,
+    spill_rows: int = 0,
+    workers: int = 1,
+    extract: bool = False,
+    ledger_path: str | None = None,
+    jamf_cache_path: str | None = None,
+    jamf_cache_ttl: float = 3600,
+    error_categories_path: str | None = None,
+    results_format: str | None = None,
 ) -> int:
+    """Summarise autopkg reports from a directory or one or more zips.
+
+    Zips are read in place unless `extract` is set, in which case they are
+    extracted into `extract_dir` and that directory is processed. With
+    `ledger_path`, parsed reports are kept in a ledger so later runs only
+    parse new or changed reports.
+
+    Upload and policy rows are linked to Jamf when AUTOPKG_JSS_URL,
+    AUTOPKG_CLIENT_ID and AUTOPKG_CLIENT_SECRET are set; lookups are kept
+    in `jamf_cache_path` for `jamf_cache_ttl` seconds when a path is given.
+
+    `error_categories_path` names a JSON or YAML file of extra error
+    categories, checked before the built-in ones.
+
+    With `results_format` ("ndjson" or "csv"), one row per recipe is also
+    written to run_results.ndjson or run_results.csv alongside
+    job_summary.md.
+    """
     os.makedirs(out_dir, exist_ok=True)
+    error_classifier = build_error_classifier(error_categories_path)
 
-    if zip_file:
-        zpath = zip_file
+    zip_files = _split_zip_files(zip_file)
+    for zpath in zip_files:
         if not os.path.exists(zpath):
             raise FileNotFoundError(f"zip file not found: {zpath}")
+    if zip_files and extract:
         os.makedirs(extract_dir, exist_ok=True)
-        with zipfile.ZipFile(zpath, "r") as zf:
-            zf.extractall(extract_dir)
+        for zpath in zip_files:
+            with zipfile.ZipFile(zpath, "r") as zf:
+                zf.extractall(extract_dir)
+        zip_files = []
         process_dir = extract_dir
+    elif zip_files:
+        process_dir = None
     else:
         process_dir = reports_dir or extract_dir
 
@@ -771,7 +1121,19 @@ def process_reports(
     # so the trailing summary below can accurately say 'no report files
     # found' only when that's actually the cause.
     preflight_flagged_empty = False
-    if not os.path.exists(process_dir):
+    if process_dir is None:
+        member_count = 0
+        for zpath in zip_files:
+            with zipfile.ZipFile(zpath, "r") as zf:
+                member_count += len(zip_report_members(zf))
+        if not member_count:
+            logging.info(
+                "Report zip(s) %s contain no autopkg_report-* directories or "
+                "report files; nothing to process.",
+                ", ".join(zip_files),
+            )
+            preflight_flagged_empty = True
+    elif not os.path.exists(process_dir):
         # Missing dir is surprising when process_reports was called —
         # the caller explicitly asked to process reports. Warn so
         # consumers filtering to WARNING+ see the signal.
@@ -794,8 +1156,55 @@ def process_reports(
         )
         preflight_flagged_empty = True
 
-    summary = aggregate_reports(process_dir, recipe_link_map=recipe_link_map)
+    ledger = (
+        ReportLedger(ledger_path, recipe_link_map, error_classifier)
+        if ledger_path
+        else None
+    )
+    summary = _as_aggregator(
+        aggregate_reports(
+            process_dir,
+            recipe_link_map=recipe_link_map,
+            streaming=True,
+            spill_rows=spill_rows,
+            workers=workers,
+            zip_files=zip_files,
+            ledger=ledger,
+            error_classifier=error_classifier,
+        )
+    )
+    if ledger is not None:
+        ledger.save()
+    try:
+        return _write_report_outputs(
+            summary,
+            environment=environment,
+            run_date=run_date,
+            out_dir=out_dir,
+            debug=debug,
+            strict=strict,
+            preflight_flagged_empty=preflight_flagged_empty,
+            jamf_cache_path=jamf_cache_path,
+            jamf_cache_ttl=jamf_cache_ttl,
+            results_format=results_format,
+        )
+    finally:
+        summary.close()
+
 
+def _write_report_outputs(
+    summary: ReportAggregator,
+    *,
+    environment: str,
+    run_date: str,
+    out_dir: str,
+    debug: bool,
+    strict: bool,
+    preflight_flagged_empty: bool,
+    jamf_cache_path: str | None = None,
+    jamf_cache_ttl: float = 3600,
+    results_format: str | None = None,
+) -> int:
     jss_url = os.environ.get("AUTOPKG_JSS_URL")
     jss_client_id = os.environ.get("AUTOPKG_CLIENT_ID")
     jss_client_secret = os.environ.get("AUTOPKG_CLIENT_SECRET")
@@ -805,8 +1214,8 @@ def process_reports(
     jamf_keys: list[str] = []
     jamf_policy_linked = 0
     jamf_policy_keys: list[str] = []
-    jamf_total = len(summary.get("upload_rows", []))
-    jamf_policy_total = len(summary.get("policy_rows", []))
+    jamf_total = len(summary.rows["upload_rows"])
+    jamf_policy_total = len(summary.rows["policy_rows"])
     if (
         jss_url
         and jss_client_id
@@ -815,23 +1224,35 @@ def process_reports(
     ):
         jamf_attempted = True
         try:
-            if jamf_total:
-                jamf_linked, jamf_keys = enrich_upload_rows_with_jamf(
-                    summary,
-                    jss_url,
-                    jss_client_id,
-                    jss_client_secret,
-                    errors=jamf_errors,
+            jamf = JamfLookupCache(
+                jss_url,
+                jss_client_id,
+                jss_client_secret,
+                cache_path=jamf_cache_path,
+                ttl=jamf_cache_ttl,
+            )
+            try:
+                pkg_map, policy_map = jamf.lookup(
+                    [
+                        str(r.get("package") or "").strip()
+                        for r in summary.iter_rows("upload_rows")
+                    ],
+                    [
+                        str(r.get("policy") or "").strip()
+                        for r in summary.iter_rows("policy_rows")
+                    ],
                 )
+            finally:
+                jamf.close()
+                jamf_errors.extend(jamf.errors)
+            if jamf_total:
+                jamf_linked = summary.link_packages(pkg_map)
+                jamf_keys = sorted(pkg_map)
             if jamf_policy_total:
-                jamf_policy_linked, jamf_policy_keys = enrich_policy_rows_with_jamf(
-                    summary,
-                    jss_url,
-                    jss_client_id,
-                    jss_client_secret,
-                    errors=jamf_errors,
-                )
+                jamf_policy_linked = summary.link_policies(policy_map)
+                jamf_policy_keys = sorted(policy_map)
         except Exception:
+            logging.exception("Jamf lookup failed")
             jamf_linked = 0
             jamf_policy_linked = 0
 
@@ -840,30 +1261,31 @@ def process_reports(
     with open(os.path.join(out_dir, "job_summary.md"), "w", encoding="utf-8") as f:
         f.write(job_md)
 
+    if results_format:
+        write_run_results(
+            summary.recipe_results.values(),
+            os.path.join(out_dir, f"run_results.{results_format}"),
+            results_format,
+        )
+
     jamf_log_path = ""
     if debug:
         jamf_log_path = os.path.join(out_dir, "jamf_lookup_debug.json")
         try:
-            upload_pkg_names = [
-                str(r.get("package") or "").strip()
-                for r in summary.get("upload_rows", [])
-            ]
-            policy_names = [
-                str(r.get("policy") or "").strip()
-                for r in summary.get("policy_rows", [])
-            ]
-            matched = [
-                r for r in summary.get("upload_rows", []) if r.get("package_url")
-            ]
-            unmatched = [
-                r for r in summary.get("upload_rows", []) if not r.get("package_url")
-            ]
-            policy_matched = [
-                r for r in summary.get("policy_rows", []) if r.get("policy_url")
-            ]
-            policy_unmatched = [
-                r for r in summary.get("policy_rows", []) if not r.get("policy_url")
-            ]
+            matched_count = 0
+            unmatched = []
+            for r in summary.iter_rows("upload_rows"):
+                if r.get("package_url"):
+                    matched_count += 1
+                else:
+                    unmatched.append(r.get("package"))
+            policy_matched_count = 0
+            policy_unmatched = []
+            for r in summary.iter_rows("policy_rows"):
+                if r.get("policy_url"):
+                    policy_matched_count += 1
+                else:
+                    policy_unmatched.append(r.get("policy"))
             diag = {
                 "jss_url": jss_url or "",
                 "jamf_errors": jamf_errors,
@@ -871,16 +1293,14 @@ def process_reports(
                 "jamf_keys_sample": jamf_keys[:20],
                 "jamf_policy_keys_count": len(jamf_policy_keys),
                 "jamf_policy_keys_sample": jamf_policy_keys[:20],
-                "uploads_count": len(upload_pkg_names),
-                "matched_count": len(matched),
+                "uploads_count": jamf_total,
+                "matched_count": matched_count,
                 "unmatched_count": len(unmatched),
-                "unmatched_names": [r.get("package") for r in unmatched][:20],
-                "policies_count": len(policy_names),
-                "policy_matched_count": len(policy_matched),
+                "unmatched_names": unmatched[:20],
+                "policies_count": jamf_policy_total,
+                "policy_matched_count": policy_matched_count,
                 "policy_unmatched_count": len(policy_unmatched),
-                "policy_unmatched_names": [r.get("policy") for r in policy_unmatched][
-                    :20
-                ],
+                "policy_unmatched_names": policy_unmatched[:20],
             }
             with open(jamf_log_path, "w", encoding="utf-8") as jf:
                 json.dump(diag, jf, indent=2)
@@ -893,7 +1313,7 @@ def process_reports(
     # If aggregate_reports returned 0 despite find_report_dirs finding
     # content (e.g. all report files were unparseable), DO NOT claim
     # no files were found — that would be actively misleading.
-    recipes_processed = summary.get("recipes", "N/A")
+    recipes_processed = summary.recipes
     if preflight_flagged_empty and recipes_processed == 0:
         logging.info("Processed 0 recipes (no report files found)")
     else:
@@ -903,6 +1323,6 @@ def process_reports(
             f"Jamf links added: packages {jamf_linked}/{jamf_total}, policies {jamf_policy_linked}/{jamf_policy_total}"
         )
 
-    if strict and summary.get("errors"):
+    if strict and summary.error_count:
         return 1
     return 0
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import os
+from pathlib import Path
+
+from autopkg_wrapper.utils.error_classifier import (
+    DEFAULT_ERROR_CLASSIFIER,
+    ErrorClassifier,
+)
+
+# One row per recipe, in this column order. versions, packages and
+# policies are lists; CSV joins them with LIST_SEPARATOR.
+RESULT_FIELDS = (
+    "recipe",
+    "status",
+    "attempts",
+    "duration",
+    "versions",
+    "packages",
+    "policies",
+    "error_category",
+)
+RESULT_FORMATS = ("ndjson", "csv")
+LIST_FIELDS = ("versions", "packages", "policies")
+LIST_SEPARATOR = ";"
+
+
+def new_result(recipe: str) -> dict:
+    # attempts stays None unless it is known from the Recipe that ran: a
+    # directory of reports can hold plists from earlier runs as well as
+    # retries, so they can't be counted from the reports
+    return {
+        "recipe": recipe,
+        "status": "ok",
+        "attempts": None,
+        "duration": None,
+        "versions": [],
+        "packages": [],
+        "policies": [],
+        "error_category": None,
+    }
+
+
+def _add_unique(items: list, value) -> None:
+    if value and value != "-" and value not in items:
+        items.append(value)
+
+
+def add_report_to_result(result: dict, data: dict) -> None:
+    """Fold one parsed plist report into a recipe's result row."""
+    for row in data.get("upload_rows", []):
+        _add_unique(result["versions"], row.get("version"))
+        _add_unique(result["packages"], row.get("package"))
+    for row in data.get("policy_rows", []):
+        _add_unique(result["policies"], row.get("policy"))
+    error_rows = data.get("error_rows", [])
+    if error_rows:
+        result["status"] = "failed"
+        if result["error_category"] is None:
+            result["error_category"] = error_rows[0].get("error_type") or "other"
+    elif result["status"] == "ok" and (result["packages"] or result["policies"]):
+        result["status"] = "updated"
+
+
+def recipe_result(
+    recipe,
+    report: dict | None = None,
+    error_classifier: ErrorClassifier | None = None,
+) -> dict:
+    """Build the result row for a Recipe after a run.
+
+    Args:
+        recipe: The Recipe that was run
+        report: Optional parsed report plist (from parse_plist_file) for
+            the packages, versions and policies the run uploaded
+        error_classifier: Classifier for the recipe's failure message
+    """
+    result = new_result(recipe.identifier)
+    result["attempts"] = getattr(recipe, "attempts", 0)
+    duration = getattr(recipe, "duration", None)
+    result["duration"] = round(duration, 3) if duration is not None else None
+    if report:
+        add_report_to_result(result, report)
+
+    for item in recipe.results.get("imported") or []:
+        if isinstance(item, dict):
+            _add_unique(result["versions"], item.get("version"))
+            _add_unique(
+                result["packages"],
+                os.path.basename(item.get("pkg_repo_path") or "") or item.get("name"),
+            )
+
+    failed = recipe.results.get("failed") or []
+    if recipe.results.get("timed_out"):
+        result["status"] = "timed_out"
+        result["error_category"] = "timeout"
+    elif recipe.verified is False:
+        result["status"] = "untrusted"
+        result["error_category"] = "trust"
+    elif recipe.error or failed:
+        result["status"] = "failed"
+        if result["error_category"] is None:
+            first = failed[0] if failed else {}
+            message = first.get("message") if isinstance(first, dict) else first
+            result["error_category"] = (
+                error_classifier or DEFAULT_ERROR_CLASSIFIER
+            ).classify(str(message or ""))
+    elif result["status"] == "ok" and (result["versions"] or result["policies"]):
+        result["status"] = "updated"
+    return result
+
+
+def results_format_for(path: str | Path, fmt: str | None = None) -> str:
+    """Return the format to write `path` in: `fmt` if given, else by suffix."""
+    if fmt:
+        return fmt
+    return "csv" if Path(path).suffix.lower() == ".csv" else "ndjson"
+
+
+def write_run_results(results, path: str | Path, fmt: str | None = None) -> int:
+    """Write result rows as newline-delimited JSON or CSV.
+
+    The file is written to a temporary name and moved into place, so
+    readers never see a partial file. Returns the number of rows written.
+    """
+    path = Path(path)
+    fmt = results_format_for(path, fmt)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_suffix(path.suffix + ".tmp")
+    count = 0
+    with open(tmp_file, "w", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            for result in results:
+                row = {field: result.get(field) for field in RESULT_FIELDS}
+                for field in LIST_FIELDS:
+                    row[field] = LIST_SEPARATOR.join(row[field] or [])
+                writer.writerow(row)
+                count += 1
+        else:
+            for result in results:
+                row = {field: result.get(field) for field in RESULT_FIELDS}
+                f.write(json.dumps(row, separators=(",", ":")) + "\n")
+                count += 1
+    os.replace(tmp_file, path)
+    logging.debug(f"Wrote {count} run results to {path}")
+    return count
+
+
+def load_run_results(path: str | Path, fmt: str | None = None) -> list[dict]:
+    """Read a run results file back into result rows."""
+    fmt = results_format_for(path, fmt)
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt != "csv":
+            return [json.loads(line) for line in f if line.strip()]
+        results = []
+        for row in csv.DictReader(f):
+            for field in LIST_FIELDS:
+                row[field] = row[field].split(LIST_SEPARATOR) if row[field] else []
+            row["attempts"] = int(row["attempts"]) if row["attempts"] else None
+            row["duration"] = float(row["duration"]) if row["duration"] else None
+            row["error_category"] = row["error_category"] or None
+            results.append(row)
+        return results
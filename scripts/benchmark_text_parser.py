@@ -0,0 +1,129 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.14"
+# dependencies = []
+# ///
+
+"""Benchmark the report text-log parser against the original regex parser.
+
+Generates a synthetic autopkg verbose log (or uses --log) and times parsing
+it with parse_text_file and with the original per-line regex loop.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from autopkg_wrapper.utils.report_processor import parse_text_file  # noqa: E402
+
+_LINES = [
+    "Processing {app}.upload.jamf...",
+    "URLDownloader: Storing new Last-Modified header: Mon, 02 Feb 2026 01:02:03 GMT",
+    "CodeSignatureVerifier: Verifying code signature...",
+    "PkgCreator: Creating package {app}-{version}.pkg in /private/tmp/cache",
+    "{{'Input': {{'pkg_path': '/Users/runner/Library/AutoPkg/Cache/{app}'}}}}",
+    "JamfPackageUploader: Uploaded {app}-{version}.pkg version {version}",
+    "Uploading package {app}-{version}.pkg to Jamf Pro (attempt 1)",
+    "JamfPolicyUploader: Policy updated: Install {app}",
+    "ERROR: {app} download failed: HTTP Error 503",
+]
+
+
+def _legacy_parse(path: str) -> dict[str, list]:
+    uploads, policies, errors = [], [], []
+    re_error = re.compile(r"ERROR[:\s-]+(.+)", re.IGNORECASE)
+    re_upload = re.compile(
+        r"(Uploaded|Upload|Uploading)[^\n]*?(?P<name>[A-Za-z0-9 ._+\-]+?)(?=(?:\s+\bversion\b)|$)(?:[^\n]*?\bversion\b[^\d]*(?P<version>\d+(?:\.\d+)+))?",
+        re.IGNORECASE,
+    )
+    re_policy = re.compile(r"Policy (created|updated):\s*(?P<name>.+)", re.IGNORECASE)
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            m_err = re_error.search(line)
+            if m_err:
+                errors.append(m_err.group(1).strip())
+                continue
+            m_up = re_upload.search(line)
+            if m_up:
+                uploads.append(
+                    {
+                        "name": (m_up.group("name") or "").strip(),
+                        "version": (m_up.group("version") or "-") or "-",
+                    }
+                )
+                continue
+            m_pol = re_policy.search(line)
+            if m_pol:
+                action = "updated" if "updated" in line.lower() else "created"
+                policies.append({"name": m_pol.group("name").strip(), "action": action})
+    return {"uploads": uploads, "policies": policies, "errors": errors}
+
+
+def _write_log(path: Path, size_mb: float, long_lines: int) -> None:
+    rng = random.Random(0)
+    target = int(size_mb * 1024 * 1024)
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            # Most of a verbose log is processor chatter without keywords
+            template = rng.choice(_LINES[:5] if rng.random() < 0.9 else _LINES[5:])
+            line = template.format(
+                app=f"App{rng.randint(0, 500)}",
+                version=f"{rng.randint(1, 40)}.{rng.randint(0, 9)}.{rng.randint(0, 9)}",
+            )
+            written += f.write(line + "\n")
+        for _ in range(long_lines):
+            # A line the upload pattern can't match backtracks quadratically
+            f.write("Uploading " + "part " * 2000 + "(retrying)\n")
+
+
+def _time(func, path: str, repeat: int) -> tuple[float, dict]:
+    best = float("inf")
+    result = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(path)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--log", help="Existing autopkg log to parse")
+    parser.add_argument("--size-mb", type=float, default=8, help="Synthetic log size")
+    parser.add_argument(
+        "--long-lines",
+        type=int,
+        default=1,
+        help="Number of ~10KB unmatched upload lines to append to the synthetic log",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as td:
+        path = args.log
+        if not path:
+            path = str(Path(td) / "autopkg.log")
+            _write_log(Path(path), args.size_mb, args.long_lines)
+        size_mb = Path(path).stat().st_size / (1024 * 1024)
+
+        legacy_time, legacy = _time(_legacy_parse, path, args.repeat)
+        new_time, new = _time(parse_text_file, path, args.repeat)
+
+    print(f"log: {size_mb:.1f} MB")
+    print(f"legacy regex parser: {legacy_time:.3f}s")
+    print(f"parse_text_file:     {new_time:.3f}s ({legacy_time / new_time:.1f}x)")
+    if new != legacy:
+        raise SystemExit("results differ from the legacy parser")
+
+
+if __name__ == "__main__":
+    main()
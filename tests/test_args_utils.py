@@ -1,7 +1,10 @@
+import argparse
 import os
 import tempfile
 from unittest.mock import patch
 
+import pytest
+
 from autopkg_wrapper.utils import args as args_utils
 
 
@@ -20,6 +23,16 @@ class TestArgsUtils:
         assert args_utils.validate_bool("YES") is True
         assert args_utils.validate_bool("t") is True
 
+    def test_validate_class_limits(self):
+        assert args_utils.validate_class_limits("jamf=3, download=15") == {
+            "jamf": 3,
+            "download": 15,
+        }
+        assert args_utils.validate_class_limits("") == {}
+        for bad in ("jamf", "jamf=many", "upload=2"):
+            with pytest.raises(argparse.ArgumentTypeError):
+                args_utils.validate_class_limits(bad)
+
     def test_validate_file_and_directory(self):
         with tempfile.TemporaryDirectory() as td:
             # directory
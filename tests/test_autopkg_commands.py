@@ -1,9 +1,12 @@
+import json
+import plistlib
 import tempfile
 from pathlib import Path as RealPath
 from types import SimpleNamespace
 from unittest.mock import patch
 
-from autopkg_wrapper.models.recipe import Recipe
+from autopkg_wrapper.models.recipe import Recipe, verify_trust_info_batch
+from autopkg_wrapper.utils.command_runner import CommandResult
 from autopkg_wrapper.utils.recipe_batching import (
     build_recipe_batches,
     describe_recipe_batches,
@@ -20,8 +23,8 @@ class TestAutopkgCommands:
             dry_run=False,
         )
 
-        with patch("autopkg_wrapper.models.recipe.subprocess.run") as run:
-            run.return_value = SimpleNamespace(returncode=0, stderr="", stdout="")
+        with patch("autopkg_wrapper.models.recipe.run_command") as run:
+            run.return_value = CommandResult(returncode=0, stderr="", stdout="")
             ok = r.verify_trust_info(args)
 
         assert ok is True
@@ -39,8 +42,8 @@ class TestAutopkgCommands:
             dry_run=False,
         )
 
-        with patch("autopkg_wrapper.models.recipe.subprocess.run") as run:
-            run.return_value = SimpleNamespace(
+        with patch("autopkg_wrapper.models.recipe.run_command") as run:
+            run.return_value = CommandResult(
                 returncode=1, stderr="bad trust", stdout=""
             )
             ok = r.verify_trust_info(args)
@@ -84,14 +87,14 @@ class TestAutopkgCommands:
 
             with (
                 patch("autopkg_wrapper.models.recipe.Path", side_effect=fake_path),
-                patch("autopkg_wrapper.models.recipe.subprocess.run") as run,
+                patch("autopkg_wrapper.models.recipe.run_command") as run,
                 patch.object(
                     r,
                     "_parse_report",
                     return_value={"imported": [], "failed": []},
                 ),
             ):
-                run.return_value = SimpleNamespace(returncode=0, stderr="", stdout="")
+                run.return_value = CommandResult(returncode=0, stderr="", stdout="")
                 r.verified = True
                 r.run(args)
 
@@ -100,6 +103,203 @@ class TestAutopkgCommands:
         assert called_cmd[1] == "run"
         assert "--report-plist" in called_cmd
 
+    def _run_with_fake_report(self, r, args, result, report_data=None):
+        with tempfile.TemporaryDirectory() as td:
+
+            def fake_path(arg):
+                if arg == "/private/tmp/autopkg":
+                    return RealPath(td)
+                return RealPath(arg)
+
+            def fake_run(cmd, **_kwargs):
+                if report_data is not None:
+                    with open(cmd[cmd.index("--report-plist") + 1], "wb") as f:
+                        plistlib.dump(report_data, f)
+                return result
+
+            with (
+                patch("autopkg_wrapper.models.recipe.Path", side_effect=fake_path),
+                patch(
+                    "autopkg_wrapper.models.recipe.run_command",
+                    side_effect=fake_run,
+                ) as run,
+            ):
+                r.run(args, enforce_trust=True)
+        return run.call_args.args[0]
+
+    def test_run_with_enforced_trust_sets_verified_true(self):
+        r = Recipe("Foo.download")
+        args = SimpleNamespace(
+            debug=False,
+            autopkg_prefs=None,
+            autopkg_bin="/custom/autopkg",
+            dry_run=False,
+        )
+
+        called_cmd = self._run_with_fake_report(
+            r,
+            args,
+            CommandResult(returncode=0, stderr="", stdout=""),
+            report_data={"failures": [], "summary_results": {}},
+        )
+
+        assert "--key" not in called_cmd
+        prefs = RealPath(called_cmd[called_cmd.index("--prefs") + 1])
+        assert plistlib.loads(prefs.read_bytes())["FAIL_RECIPES_WITHOUT_TRUST_INFO"]
+        assert r.verified is True
+        assert r.error is False
+
+    def test_run_with_enforced_trust_sets_the_preference_in_a_prefs_copy(self):
+        r = Recipe("Foo.download")
+        source = RealPath(__file__).parent / "prefs.json"
+        args = SimpleNamespace(
+            debug=False,
+            autopkg_prefs=source,
+            autopkg_bin="/custom/autopkg",
+            dry_run=False,
+        )
+
+        called_cmd = self._run_with_fake_report(
+            r,
+            args,
+            CommandResult(returncode=0, stderr="", stdout=""),
+            report_data={"failures": [], "summary_results": {}},
+        )
+
+        prefs_path = RealPath(called_cmd[called_cmd.index("--prefs") + 1])
+        assert prefs_path != source
+        prefs = json.loads(prefs_path.read_text())
+        assert prefs["FAIL_RECIPES_WITHOUT_TRUST_INFO"] is True
+        original = json.loads(source.read_text())
+        assert {k: prefs[k] for k in original} == original
+        assert "FAIL_RECIPES_WITHOUT_TRUST_INFO" not in original
+
+    def test_run_with_enforced_trust_detects_trust_failure_in_report(self):
+        r = Recipe("Foo.download")
+        args = SimpleNamespace(
+            debug=False,
+            autopkg_prefs=None,
+            autopkg_bin="/custom/autopkg",
+            dry_run=False,
+        )
+
+        self._run_with_fake_report(
+            r,
+            args,
+            CommandResult(returncode=70, stderr="", stdout=""),
+            report_data={
+                "failures": [
+                    {
+                        "message": "Parent recipe(s) failed trust verification",
+                        "recipe": "Foo.download",
+                    }
+                ],
+                "summary_results": {},
+            },
+        )
+
+        assert r.verified is False
+        assert r.error is False
+        assert r.results == {"message": "Parent recipe(s) failed trust verification"}
+
+    def test_run_with_enforced_trust_detects_trust_failure_in_stderr(self):
+        r = Recipe("Foo.download")
+        args = SimpleNamespace(
+            debug=False,
+            autopkg_prefs=None,
+            autopkg_bin="/custom/autopkg",
+            dry_run=False,
+        )
+
+        self._run_with_fake_report(
+            r,
+            args,
+            CommandResult(
+                returncode=70, stderr="Foo.download is missing trust info", stdout=""
+            ),
+        )
+
+        assert r.verified is False
+        assert r.results["message"] == "Foo.download is missing trust info"
+
+    def test_run_with_enforced_trust_keeps_other_failures_as_errors(self):
+        r = Recipe("Foo.download")
+        args = SimpleNamespace(
+            debug=False,
+            autopkg_prefs=None,
+            autopkg_bin="/custom/autopkg",
+            dry_run=False,
+        )
+
+        self._run_with_fake_report(
+            r,
+            args,
+            CommandResult(returncode=70, stderr="Download failed", stdout=""),
+        )
+
+        assert r.verified is True
+        assert r.error is True
+        assert r.results["failed"] == [{"message": "Download failed"}]
+
+    def test_verify_trust_info_batch_parses_verdicts_per_recipe(self):
+        recipes = [Recipe("Foo.download"), Recipe("Bar.download"), Recipe("Baz.pkg")]
+        args = SimpleNamespace(
+            debug=False,
+            autopkg_prefs=None,
+            autopkg_bin="/custom/autopkg",
+            dry_run=False,
+            recipe_log_dir="/logs",
+        )
+        outputs = {
+            ("Foo.download", "Bar.download"): CommandResult(
+                returncode=1,
+                stdout="Foo.download: OK\n",
+                stderr="Bar.download: FAILED\n    Parent recipe changed\n",
+            ),
+            ("Baz.pkg",): CommandResult(
+                returncode=0, stdout="Baz.pkg: OK\n", stderr=""
+            ),
+        }
+
+        def fake_run(cmd, **_kwargs):
+            return outputs[tuple(n for n in cmd[2:] if not n.startswith("-"))]
+
+        with patch(
+            "autopkg_wrapper.models.recipe.run_command", side_effect=fake_run
+        ) as run:
+            remaining = verify_trust_info_batch(recipes, args, batch_size=2)
+
+        assert run.call_count == 2
+        assert sorted(c.kwargs["log_path"].name for c in run.call_args_list) == [
+            "verify-trust-info-1.log",
+            "verify-trust-info-2.log",
+        ]
+        assert remaining == []
+        assert [r.verified for r in recipes] == [True, False, True]
+        assert recipes[1].results["message"] == "Parent recipe changed"
+
+    def test_verify_trust_info_batch_leaves_ambiguous_recipes_unverified(self):
+        recipes = [Recipe("Foo.download"), Recipe("Bar.download")]
+        args = SimpleNamespace(
+            debug=False,
+            autopkg_prefs=None,
+            autopkg_bin="/custom/autopkg",
+            dry_run=False,
+        )
+
+        with patch("autopkg_wrapper.models.recipe.run_command") as run:
+            # Bar has no verdict line at all, and the non-zero exit code
+            # contradicts the lone OK, so neither verdict is trusted.
+            run.return_value = CommandResult(
+                returncode=1,
+                stdout="Foo.download: OK\n",
+                stderr="No valid recipe found for Bar.download\n",
+            )
+            remaining = verify_trust_info_batch(recipes, args, batch_size=10)
+
+        assert remaining == recipes
+        assert [r.verified for r in recipes] == [None, None]
+
     def test_build_recipe_batches_without_processing_order(self):
         recipes = [Recipe("Foo.upload.jamf"), Recipe("Foo.auto_install.jamf")]
         batches = build_recipe_batches(
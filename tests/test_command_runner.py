@@ -0,0 +1,181 @@
+import logging
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+from autopkg_wrapper.models.recipe import Recipe
+from autopkg_wrapper.utils.command_runner import run_command
+
+
+def _python(code):
+    return [sys.executable, "-c", code]
+
+
+class TestRunCommand:
+    def test_output_reaches_the_log_while_the_command_runs(self, tmp_path):
+        log_path = tmp_path / "logs" / "Foo.download.log"
+        release = tmp_path / "release"
+        code = (
+            "import os, sys, time\n"
+            "print('first line', flush=True)\n"
+            f"while not os.path.exists({str(release)!r}):\n"
+            "    time.sleep(0.01)\n"
+            "print('oops', file=sys.stderr)\n"
+        )
+        seen_early = []
+
+        def watch():
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                if (
+                    log_path.exists()
+                    and "first line" in log_path.read_text().splitlines()
+                ):
+                    seen_early.append(True)
+                    break
+                time.sleep(0.01)
+            release.touch()
+
+        watcher = threading.Thread(target=watch)
+        watcher.start()
+        result = run_command(_python(code), label="Foo.download", log_path=log_path)
+        watcher.join()
+
+        assert seen_early == [True]
+        assert result.returncode == 0
+        assert result.stdout == "first line\n"
+        assert result.stderr == "oops\n"
+        log = log_path.read_text().splitlines()
+        assert log[0].startswith(f"$ {sys.executable} -c")
+        assert log[-3:] == ["first line", "[stderr] oops", "# exit status 0"]
+
+    def test_only_a_bounded_tail_is_kept(self, caplog):
+        code = "import sys\nfor i in range(1000): print(i)\nsys.exit(3)"
+
+        with caplog.at_level(logging.DEBUG):
+            result = run_command(_python(code), label="Big", tail_lines=5)
+
+        assert result.returncode == 3
+        assert result.stdout.splitlines() == ["995", "996", "997", "998", "999"]
+        logged = [r.getMessage() for r in caplog.records if r.getMessage() != ""]
+        assert "[Big] 0" in logged and "[Big] 999" in logged
+
+        everything = run_command(_python(code), tail_lines=None)
+        assert len(everything.stdout.splitlines()) == 1000
+
+    def test_recipe_output_goes_to_a_per_recipe_log(self, tmp_path):
+        autopkg = tmp_path / "autopkg"
+        autopkg.write_text(
+            f"#!{sys.executable}\n"
+            "import sys\n"
+            "print('checking', sys.argv[2])\n"
+            "print('trust mismatch', file=sys.stderr)\n"
+            "sys.exit(1)\n"
+        )
+        autopkg.chmod(0o755)
+        args = SimpleNamespace(
+            debug=False,
+            autopkg_prefs=None,
+            autopkg_bin=str(autopkg),
+            dry_run=False,
+            recipe_log_dir=str(tmp_path / "logs"),
+        )
+        recipe = Recipe("Foo.download")
+
+        assert recipe.verify_trust_info(args) is False
+
+        assert recipe.results["message"] == "trust mismatch"
+        log = (tmp_path / "logs" / "Foo.download.log").read_text()
+        assert "checking Foo.download" in log
+        assert "[stderr] trust mismatch" in log
+
+
+def _process_exited(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split()[2] == "Z"
+    except FileNotFoundError:
+        return True
+
+
+class TestTimeouts:
+    def test_timeout_kills_the_whole_process_group(self, tmp_path):
+        code = (
+            "import subprocess, sys, time\n"
+            "child = subprocess.Popen([sys.executable, '-c', "
+            "'import time; time.sleep(60)'])\n"
+            "print(child.pid, flush=True)\n"
+            "time.sleep(60)\n"
+        )
+        started = time.monotonic()
+        result = run_command(_python(code), log_path=tmp_path / "slow.log", timeout=0.5)
+
+        assert time.monotonic() - started < 10
+        assert result.timed_out is True
+        assert result.returncode != 0
+        grandchild = int(result.stdout.split()[0])
+        deadline = time.monotonic() + 5
+        while not _process_exited(grandchild) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert _process_exited(grandchild)
+        assert "# timed out after 0s" in (tmp_path / "slow.log").read_text()
+
+    def test_command_timeout_is_capped_by_the_run_deadline(self):
+        recipe = Recipe("Foo.download")
+        assert recipe.command_timeout(SimpleNamespace()) is None
+        assert recipe.command_timeout(SimpleNamespace(recipe_timeout=600)) == 600
+
+        recipe.deadline = time.monotonic() + 30
+        assert 25 < recipe.command_timeout(SimpleNamespace(recipe_timeout=600)) <= 30
+
+        recipe.deadline = time.monotonic() - 1
+        assert recipe.command_timeout(SimpleNamespace(recipe_timeout=0)) == 0.0
+
+    def test_timed_out_run_marks_the_recipe(self, tmp_path):
+        autopkg = tmp_path / "autopkg"
+        autopkg.write_text(f"#!{sys.executable}\nimport time\ntime.sleep(60)\n")
+        autopkg.chmod(0o755)
+        args = SimpleNamespace(
+            debug=False,
+            autopkg_prefs=None,
+            autopkg_bin=str(autopkg),
+            dry_run=False,
+            recipe_timeout=1,
+        )
+        recipe = Recipe("Foo.download")
+
+        assert recipe.verify_trust_info(args) is None
+        assert recipe.error is True
+        assert recipe.results["timed_out"] is True
+        assert recipe.results["failed"] == [{"message": "Trust verification timed out"}]
+
+    def test_nothing_is_started_once_the_deadline_has_passed(self, tmp_path):
+        autopkg = tmp_path / "autopkg"
+        started = tmp_path / "started"
+        autopkg.write_text(f"#!{sys.executable}\nopen({str(started)!r}, 'w').close()\n")
+        autopkg.chmod(0o755)
+        args = SimpleNamespace(
+            debug=False,
+            autopkg_prefs=None,
+            autopkg_bin=str(autopkg),
+            dry_run=False,
+            recipe_timeout=0,
+            recipe_log_dir=None,
+        )
+        verifying = Recipe("Foo.download")
+        verifying.deadline = time.monotonic() - 1
+        running = Recipe("Bar.download")
+        running.deadline = time.monotonic() - 1
+        running.verified = True
+
+        verifying.verify_trust_info(args)
+        running.run(args)
+
+        assert not started.exists()
+        for recipe in (verifying, running):
+            assert recipe.error is True
+            assert recipe.results["timed_out"] is True
+            assert recipe.results["failed"] == [
+                {"message": "Not started: the run deadline was reached"}
+            ]
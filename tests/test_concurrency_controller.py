@@ -0,0 +1,110 @@
+import logging
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from autopkg_wrapper.models.recipe import Recipe
+from autopkg_wrapper.utils import concurrency_controller as cc
+from autopkg_wrapper.utils.concurrency_controller import ConcurrencyController
+from autopkg_wrapper.utils.recipe_scheduler import RecipeScheduler
+
+
+def _sample(controller, busy=True, completed=0, load=0.5, free=0.5):
+    """Run one sampling window with the given machine readings."""
+    now = controller._sampled_at + controller.interval
+    for _ in range(completed):
+        controller.record_completion()
+    with (
+        patch.object(cc, "load_per_cpu", return_value=load),
+        patch.object(cc, "free_memory_fraction", return_value=free),
+    ):
+        return controller.update(busy, now=now)
+
+
+def _controller(initial, min_workers=1, max_workers=8):
+    controller = ConcurrencyController(min_workers, max_workers, initial=initial)
+    controller.update(False, now=0.0)
+    return controller
+
+
+class TestConcurrencyController:
+    def test_grows_while_recipes_wait_up_to_the_maximum(self, caplog):
+        controller = _controller(initial=7)
+
+        with caplog.at_level(logging.INFO):
+            assert _sample(controller, completed=10) == 8
+            assert _sample(controller, completed=10) == 8
+
+        assert "Concurrency 7 -> 8: recipes are waiting for a worker" in caplog.text
+        # Nothing waiting, so no reason to grow
+        assert _sample(_controller(initial=4), busy=False) == 4
+
+    def test_waits_for_the_sample_interval(self):
+        controller = _controller(initial=2)
+
+        assert controller.update(True, now=controller.interval / 2) == 2
+        assert controller.seconds_until_sample(now=0.0) == controller.interval
+
+    def test_shrinks_on_high_load_and_low_memory(self, caplog):
+        controller = _controller(initial=8, min_workers=3)
+
+        with caplog.at_level(logging.INFO):
+            assert _sample(controller, load=2.0) == 7
+            assert _sample(controller, free=0.05) == 6
+            assert _sample(controller, free=0.05) == 5
+            assert _sample(controller, free=0.05) == 4
+            assert _sample(controller, free=0.05) == 3
+            assert _sample(controller, free=0.05) == 3
+
+        assert "Concurrency 8 -> 7: load is high (load 2.00/CPU" in caplog.text
+        assert "Concurrency 7 -> 6: memory is low" in caplog.text
+
+    def test_steps_back_when_growing_slowed_things_down(self):
+        controller = _controller(initial=4)
+
+        assert _sample(controller, completed=20) == 5
+        assert _sample(controller, completed=10) == 4
+        # Held below the limit that was slower for a few samples
+        assert _sample(controller, completed=10) == 4
+        assert _sample(controller, completed=10) == 4
+        assert _sample(controller, completed=10) == 4
+        assert _sample(controller, completed=10) == 5
+
+    def test_free_memory_from_vm_stat(self):
+        vm_stat = (
+            "Mach Virtual Memory Statistics: (page size of 16384 bytes)\n"
+            "Pages free:                               100.\n"
+            "Pages active:                             500.\n"
+            "Pages inactive:                           150.\n"
+            "Pages speculative:                         50.\n"
+        )
+        with (
+            patch.object(cc.sys, "platform", "darwin"),
+            patch.object(cc.os, "sysconf", return_value=1000),
+            patch.object(
+                cc.subprocess, "run", return_value=SimpleNamespace(stdout=vm_stat)
+            ),
+        ):
+            assert cc.free_memory_fraction() == 0.3
+
+    def test_scheduler_runs_no_more_than_the_controller_allows(self):
+        controller = ConcurrencyController(1, 6, initial=2, interval=3600)
+        lock = threading.Lock()
+        running = 0
+        peak = 0
+
+        def task(_recipe):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+
+        recipes = [Recipe(f"App{i}.download") for i in range(8)]
+        RecipeScheduler(max_workers=1, controller=controller).run(recipes, task)
+
+        assert peak == 2
+        assert controller._completed == 8
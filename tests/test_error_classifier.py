@@ -0,0 +1,156 @@
+import pickle
+import plistlib
+import random
+
+import pytest
+
+from autopkg_wrapper.utils import report_processor as rp
+from autopkg_wrapper.utils.error_classifier import (
+    DEFAULT_ERROR_CLASSIFIER,
+    ErrorClassifier,
+    build_error_classifier,
+    load_error_categories,
+)
+
+
+def _legacy_classify(msg):
+    lm = msg.lower()
+    if "trust" in lm:
+        return "trust"
+    if "signature" in lm or "codesign" in lm:
+        return "signature"
+    if "download" in lm or "fetch" in lm or "curl" in lm:
+        return "download"
+    if (
+        "proxy" in lm
+        or "timeout" in lm
+        or "network" in lm
+        or "url" in lm
+        or "dns" in lm
+    ):
+        return "network"
+    if (
+        "401" in lm
+        or "403" in lm
+        or "auth" in lm
+        or "token" in lm
+        or "permission" in lm
+    ):
+        return "auth"
+    if "jamf" in lm or "policy" in lm:
+        return "jamf"
+    return "other"
+
+
+class TestErrorClassifier:
+    def test_matches_the_original_keyword_checks(self):
+        rng = random.Random(0)
+        pieces = [
+            "TRUST",
+            "Signature",
+            "codesign",
+            "download",
+            "fetch",
+            "cURL",
+            "proxy",
+            "timeout",
+            "network",
+            "url",
+            "dns",
+            "401",
+            "403",
+            "Auth",
+            "token",
+            "permission",
+            "jamf",
+            "policy",
+            "tru",
+            "ur",
+            "40",
+            "İ",
+            " ",
+            "x",
+            "-",
+        ]
+        classifier = ErrorClassifier()
+        for _ in range(5000):
+            msg = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 8)))
+            assert classifier.classify(msg) == _legacy_classify(msg), msg
+
+    def test_overlapping_keywords_use_category_priority(self):
+        # "curl" and "url" overlap; the download category comes first
+        assert DEFAULT_ERROR_CLASSIFIER.classify("curl failed") == "download"
+        assert DEFAULT_ERROR_CLASSIFIER.classify("bad url, token expired") == "network"
+        classifier = ErrorClassifier([("late", ("ab",)), ("early", ("abc", "b"))])
+        assert classifier.classify("xabcx") == "late"
+        assert classifier.classify("xbx") == "early"
+        assert classifier.classify("nothing") == "other"
+        # The longest keyword at a position stands in for its prefixes
+        classifier = ErrorClassifier([("short", ("auth",)), ("long", ("author",))])
+        assert classifier.classify("unknown author") == "short"
+
+    def test_custom_categories_from_file(self, tmp_path):
+        yaml_file = tmp_path / "categories.yaml"
+        yaml_file.write_text(
+            "categories:\n"
+            "  - name: vpn\n"
+            "    keywords: [GlobalProtect, vpn]\n"
+            "  - name: jamf\n"
+            "    keywords: jamf\n",
+            encoding="utf-8",
+        )
+        classifier = build_error_classifier(yaml_file)
+
+        assert classifier.category_names == [
+            "vpn",
+            "jamf",
+            "trust",
+            "signature",
+            "download",
+            "network",
+            "auth",
+            "other",
+        ]
+        assert classifier.classify("globalprotect proxy timeout") == "vpn"
+        # The file's jamf category replaced the built-in one
+        assert classifier.classify("Policy not found") == "other"
+        assert classifier.fingerprint != DEFAULT_ERROR_CLASSIFIER.fingerprint
+        restored = pickle.loads(pickle.dumps(classifier))
+        assert restored.categories == classifier.categories
+
+        json_file = tmp_path / "categories.json"
+        json_file.write_text('[{"name": "disk", "keywords": ["no space"]}]')
+        assert load_error_categories(json_file) == [("disk", ["no space"])]
+
+        json_file.write_text('{"categories": [{"keywords": ["x"]}]}')
+        with pytest.raises(ValueError):
+            load_error_categories(json_file)
+
+    def test_plist_error_rows_carry_the_category(self, tmp_path):
+        repdir = tmp_path / "autopkg_report-1"
+        repdir.mkdir()
+        with open(repdir / "Foo-2026-02-02T01-02-03.plist", "wb") as f:
+            plistlib.dump(
+                {
+                    "failures": [
+                        {"message": "GlobalProtect dropped", "recipe": "Foo"},
+                        {"message": "Code signature invalid", "recipe": "Foo"},
+                    ],
+                    "summary_results": {},
+                },
+                f,
+            )
+        classifier = ErrorClassifier(
+            [("vpn", ("globalprotect",)), *rp.DEFAULT_ERROR_CLASSIFIER.categories]
+        )
+        aggregator = rp.aggregate_reports(
+            str(tmp_path), streaming=True, error_classifier=classifier
+        )
+
+        assert [r["error_type"] for r in aggregator.iter_rows("error_rows")] == [
+            "vpn",
+            "signature",
+        ]
+        assert aggregator.error_categories["vpn"] == 1
+        assert aggregator.error_categories["signature"] == 1
+        assert aggregator.error_count == 2
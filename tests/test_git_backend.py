@@ -0,0 +1,170 @@
+import subprocess
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import autopkg_wrapper.utils.git_functions as gf
+from autopkg_wrapper.autopkg_wrapper import update_recipe_repo_batched
+from autopkg_wrapper.models.recipe import Recipe
+from autopkg_wrapper.utils import recipe_index
+from autopkg_wrapper.utils.git_backend import (
+    CachedGitBackend,
+    SubprocessGitBackend,
+    close_git_backends,
+    get_git_backend,
+)
+
+
+@pytest.fixture(autouse=True)
+def _git_env(monkeypatch):
+    for var in ("GIT_AUTHOR", "GIT_COMMITTER"):
+        monkeypatch.setenv(f"{var}_NAME", "Test")
+        monkeypatch.setenv(f"{var}_EMAIL", "test@example.com")
+    recipe_index.clear_recipe_index_cache()
+    yield
+    close_git_backends()
+    recipe_index.clear_recipe_index_cache()
+
+
+def _git(*args, cwd):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, text=True, capture_output=True
+    ).stdout
+
+
+def _make_repo(tmp: Path, backend: str):
+    remote = tmp / "remote.git"
+    repo = tmp / "overrides"
+    _git("init", "--bare", "-q", str(remote), cwd=tmp)
+    _git("init", "-q", str(repo), cwd=tmp)
+    _git("remote", "add", "origin", str(remote), cwd=repo)
+    (repo / "Firefox").mkdir()
+    (repo / "Firefox" / "Firefox.upload.jamf.recipe.yaml").write_text("a: 1\n")
+    (repo / "Chrome.upload.jamf.recipe.yaml").write_text("a: 1\n")
+    _git("add", "-A", cwd=repo)
+    _git("commit", "-q", "-m", "initial", cwd=repo)
+
+    git_info = {
+        "__work_tree": f"--work-tree={repo}",
+        "__git_dir": f"--git-dir={repo / '.git'}",
+        "override_trust_branch": "fix/update_trust_information/test",
+        "git_backend": backend,
+    }
+    return remote, repo, git_info
+
+
+class TestGetGitBackend:
+    def test_defaults_to_subprocess_and_is_reused(self):
+        git_info = {"__git_dir": "--git-dir=/tmp/x/.git", "__work_tree": "/tmp/x"}
+
+        backend = get_git_backend(git_info)
+
+        assert isinstance(backend, SubprocessGitBackend)
+        assert not isinstance(backend, CachedGitBackend)
+        assert get_git_backend(git_info) is backend
+
+    def test_cached_backend_looks_up_branch_once(self):
+        git_info = {
+            "__git_dir": "--git-dir=/tmp/x/.git",
+            "__work_tree": "--work-tree=/tmp/x",
+            "git_backend": "cached",
+        }
+        backend = get_git_backend(git_info)
+
+        with patch.object(gf, "git_run") as git_run:
+            git_run.return_value = SimpleNamespace(stdout="main\n")
+            branches = [backend.get_current_branch() for _ in range(3)]
+
+        assert branches == ["main"] * 3
+        git_run.assert_called_once()
+
+
+class TestCachedGitBackend:
+    @pytest.mark.parametrize("changed", [True, False])
+    @pytest.mark.parametrize("mode", ["batched", "single"])
+    def test_matches_subprocess_backend(self, mode, changed):
+        results = {}
+        for backend in ("subprocess", "cached"):
+            with tempfile.TemporaryDirectory() as td:
+                remote, repo, git_info = _make_repo(Path(td).resolve(), backend)
+                recipes = [Recipe("Firefox.upload.jamf"), Recipe("Chrome.upload.jamf")]
+                for r in recipes:
+                    r.verified = False
+                if changed:
+                    (repo / "Firefox" / "Firefox.upload.jamf.recipe.yaml").write_text(
+                        "a: 2\n"
+                    )
+                    (repo / "Chrome.upload.jamf.recipe.yaml").write_text("a: 3\n")
+                args = SimpleNamespace(
+                    overrides_repo_path=repo,
+                    autopkg_prefs=None,
+                    git_commit_mode=mode,
+                )
+
+                with patch.object(
+                    gf, "commit_recipe", wraps=gf.commit_recipe
+                ) as commit:
+                    update_recipe_repo_batched(recipes, git_info, False, args)
+                    close_git_backends()
+
+                branch = git_info["override_trust_branch"]
+                results[backend] = {
+                    "log": _git("log", "--format=%s%n%b", branch, cwd=remote),
+                    "tree": _git("ls-tree", "-r", branch, cwd=remote),
+                    "status": _git("status", "--porcelain", cwd=repo),
+                    "head": _git("rev-parse", "HEAD", cwd=repo),
+                    "remote_head": _git("rev-parse", branch, cwd=remote),
+                    "commits": commit.call_count,
+                }
+            recipe_index.clear_recipe_index_cache()
+
+        subprocess_result, cached_result = results["subprocess"], results["cached"]
+        assert cached_result["log"] == subprocess_result["log"]
+        # Unchanged files leave nothing to commit with either backend
+        assert (cached_result["log"].splitlines()[0] == "initial") is not changed
+        assert cached_result["tree"] == subprocess_result["tree"]
+        assert cached_result["status"] == ""
+        assert cached_result["head"] == cached_result["remote_head"]
+        assert subprocess_result["commits"] > 0
+        assert cached_result["commits"] == 0
+
+    def test_stage_recipe_falls_back_to_index_commit(self):
+        with tempfile.TemporaryDirectory() as td:
+            _remote, repo, git_info = _make_repo(Path(td).resolve(), "cached")
+            backend = get_git_backend(git_info)
+            (repo / "Chrome.upload.jamf.recipe.yaml").write_text("a: 2\n")
+
+            backend.stage_recipe()
+            backend.commit_recipe(message="Updating Trust Info for Chrome")
+
+            log = _git("log", "--format=%s", cwd=repo).splitlines()
+            status = _git("status", "--porcelain", cwd=repo)
+
+        assert log == ["Updating Trust Info for Chrome", "initial"]
+        assert status == ""
+
+    def test_failed_fast_import_raises_and_keeps_the_changes(self):
+        with tempfile.TemporaryDirectory() as td:
+            _remote, repo, git_info = _make_repo(Path(td).resolve(), "cached")
+            backend = get_git_backend(git_info)
+            recipe_path = repo / "Chrome.upload.jamf.recipe.yaml"
+            recipe_path.write_text("a: 2\n")
+            branch = backend.get_current_branch()
+            # A held ref lock makes fast-import fail to update the branch
+            lock = repo / ".git" / "refs" / "heads" / f"{branch}.lock"
+            lock.touch()
+
+            backend.stage_paths([recipe_path])
+            backend.commit_recipe(message="Updating Trust Info for Chrome")
+            with pytest.raises(subprocess.CalledProcessError):
+                backend.push_branch()
+            lock.unlink()
+
+            log = _git("log", "--format=%s", cwd=repo).splitlines()
+            status = _git("status", "--porcelain", cwd=repo)
+
+        assert log == ["initial"]
+        assert status == " M Chrome.upload.jamf.recipe.yaml\n"
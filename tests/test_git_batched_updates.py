@@ -0,0 +1,134 @@
+import subprocess
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import autopkg_wrapper.utils.git_functions as gf
+from autopkg_wrapper.autopkg_wrapper import update_recipe_repo_batched
+from autopkg_wrapper.models.recipe import Recipe
+from autopkg_wrapper.utils import recipe_index
+
+
+@pytest.fixture(autouse=True)
+def _git_env(monkeypatch):
+    for var in ("GIT_AUTHOR", "GIT_COMMITTER"):
+        monkeypatch.setenv(f"{var}_NAME", "Test")
+        monkeypatch.setenv(f"{var}_EMAIL", "test@example.com")
+    recipe_index.clear_recipe_index_cache()
+    yield
+    recipe_index.clear_recipe_index_cache()
+
+
+def _git(*args, cwd):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, text=True, capture_output=True
+    ).stdout
+
+
+def _make_repo(tmp: Path):
+    remote = tmp / "remote.git"
+    repo = tmp / "overrides"
+    _git("init", "--bare", "-q", str(remote), cwd=tmp)
+    _git("init", "-q", str(repo), cwd=tmp)
+    _git("remote", "add", "origin", str(remote), cwd=repo)
+    (repo / "Firefox").mkdir()
+    (repo / "Firefox" / "Firefox.upload.jamf.recipe.yaml").write_text("a: 1\n")
+    (repo / "Chrome.upload.jamf.recipe.yaml").write_text("a: 1\n")
+    (repo / "README.md").write_text("readme\n")
+    _git("add", "-A", cwd=repo)
+    _git("commit", "-q", "-m", "initial", cwd=repo)
+
+    git_info = {
+        "__work_tree": f"--work-tree={repo}",
+        "__git_dir": f"--git-dir={repo / '.git'}",
+        "override_trust_branch": "fix/update_trust_information/test",
+    }
+    return remote, repo, git_info
+
+
+def _failed_recipes(repo: Path):
+    recipes = [Recipe("Firefox.upload.jamf"), Recipe("Chrome.upload.jamf")]
+    for r in recipes:
+        r.verified = False
+    (repo / "Firefox" / "Firefox.upload.jamf.recipe.yaml").write_text("a: 2\n")
+    (repo / "Chrome.upload.jamf.recipe.yaml").write_text("a: 2\n")
+    (repo / "README.md").write_text("local edit\n")
+    return recipes
+
+
+class TestUpdateRecipeRepoBatched:
+    def test_batched_commits_each_recipe_and_pushes_once(self):
+        with tempfile.TemporaryDirectory() as td:
+            remote, repo, git_info = _make_repo(Path(td).resolve())
+            recipes = _failed_recipes(repo)
+            args = SimpleNamespace(
+                overrides_repo_path=repo,
+                autopkg_prefs=None,
+                git_commit_mode="batched",
+            )
+
+            with (
+                patch.object(gf, "pull_branch", wraps=gf.pull_branch) as pull,
+                patch.object(gf, "push_branch", wraps=gf.push_branch) as push,
+            ):
+                committed = update_recipe_repo_batched(recipes, git_info, False, args)
+
+            branch = git_info["override_trust_branch"]
+            log = _git("log", "--format=%s", branch, cwd=remote).splitlines()
+            files = [
+                _git("show", "--name-only", "--format=", f"{branch}~{i}", cwd=remote)
+                for i in range(2)
+            ]
+            status = _git("status", "--porcelain", cwd=repo)
+
+        assert committed == recipes
+        pull.assert_called_once()
+        push.assert_called_once()
+        assert log == [
+            "Updating Trust Info for Chrome.upload.jamf",
+            "Updating Trust Info for Firefox.upload.jamf",
+            "initial",
+        ]
+        assert files == [
+            "Chrome.upload.jamf.recipe.yaml\n",
+            "Firefox/Firefox.upload.jamf.recipe.yaml\n",
+        ]
+        # Unrelated local edits are left alone
+        assert status.strip() == "M README.md"
+
+    def test_single_commit_mode(self):
+        with tempfile.TemporaryDirectory() as td:
+            remote, repo, git_info = _make_repo(Path(td).resolve())
+            recipes = _failed_recipes(repo)
+            args = SimpleNamespace(
+                overrides_repo_path=repo,
+                autopkg_prefs=None,
+                git_commit_mode="single",
+            )
+
+            update_recipe_repo_batched(recipes, git_info, False, args)
+
+            branch = git_info["override_trust_branch"]
+            message = _git("log", "-1", "--format=%B", branch, cwd=remote)
+            count = _git("rev-list", "--count", branch, cwd=remote)
+            status = _git("status", "--porcelain", cwd=repo)
+
+        assert count.strip() == "2"
+        assert message.startswith("Updating Trust Info for 2 recipes")
+        assert "- Firefox.upload.jamf" in message
+        assert "- Chrome.upload.jamf" in message
+        assert status.strip() == "M README.md"
+
+    def test_nothing_to_commit_skips_git(self):
+        recipes = [Recipe("Foo.download")]
+        recipes[0].verified = True
+        args = SimpleNamespace(git_commit_mode="batched")
+
+        with patch.object(gf, "git_run") as git_run:
+            committed = update_recipe_repo_batched(recipes, {}, False, args)
+
+        assert committed == []
+        git_run.assert_not_called()
@@ -0,0 +1,194 @@
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from github import Github
+
+from autopkg_wrapper.utils import git_functions as gf
+
+
+class _GitHubStub(BaseHTTPRequestHandler):
+    """Minimal stand-in for the GitHub REST API."""
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload=None, headers=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(("GET", self.path, self.headers.get("If-None-Match")))
+        path, _, query = self.path.partition("?")
+        base = f"http://127.0.0.1:{server.server_port}"
+        if path == "/repos/o/r":
+            self._send(200, {"url": f"{base}/repos/o/r", "full_name": "o/r"})
+        elif path == "/repos/o/r/pulls":
+            etag = f'"pulls-{len(server.pulls)}"'
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304)
+            else:
+                self._send(200, server.pulls, {"ETag": etag})
+        elif path == "/repos/o/r/issues":
+            # The first issue and a pull request on page 1, the rest on page 2
+            etag = f'"issues-{len(server.issues)}-{query}"'
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304)
+            elif "page=2" in query:
+                self._send(200, server.issues[1:], {"ETag": etag})
+            else:
+                self._send(
+                    200,
+                    [*server.issues[:1], {"number": 2, "pull_request": {}}],
+                    {
+                        "ETag": etag,
+                        "Link": f'<{base}/repos/o/r/issues?state=open&page=2>; rel="next"',
+                    },
+                )
+        elif path.startswith("/repos/o/r/issues/"):
+            number = int(path.rsplit("/", 1)[1])
+            self._send(
+                200,
+                {
+                    "number": number,
+                    "url": f"{base}/repos/o/r/issues/{number}",
+                    "comments_url": f"{base}/repos/o/r/issues/{number}/comments",
+                },
+            )
+        else:
+            self._send(404, {"message": "Not Found"})
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        server.requests.append(("POST", self.path, None))
+        if self.path == "/repos/o/r/pulls":
+            number = len(server.pulls) + 10
+            server.pulls.append({"number": number, "head": {"ref": payload["head"]}})
+            self._send(201, {"number": number})
+        elif self.path == "/repos/o/r/issues":
+            self._send(201, {"number": 99})
+        elif self.path.startswith("/repos/o/r/issues/") and self.path.endswith(
+            "/comments"
+        ):
+            server.comments.append(payload["body"])
+            self._send(201, {"id": 1, "body": payload["body"]})
+        else:
+            self._send(404, {"message": "Not Found"})
+
+
+@pytest.fixture
+def github_stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GitHubStub)
+    server.requests = []
+    server.pulls = []
+    server.issues = []
+    server.comments = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(gf, "Github", lambda token: Github(token, base_url=base_url))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _git_info(server):
+    return {
+        "github_token": "t",
+        "override_repo_remote_ref": "o/r",
+        "override_repo_url": "https://github.com/o/r",
+        "override_trust_branch": "fix/update_trust_information/test",
+    }
+
+
+class DummyRecipe:
+    def __init__(self, name):
+        self.name = name
+        self.identifier = name
+        self.results = {"failed": [{"message": "boom"}]}
+
+
+class TestGitHubSession:
+    def test_repeat_listing_uses_etag(self, github_stub):
+        github_stub.pulls.append({"number": 5, "head": {"ref": "other"}})
+        session = gf.get_github_session(_git_info(github_stub))
+
+        first = session.open_pulls()
+        second = session.open_pulls()
+
+        assert first == second == [{"number": 5, "head": {"ref": "other"}}]
+        pull_requests = [r for r in github_stub.requests if "/pulls" in r[1]]
+        assert [r[2] for r in pull_requests] == [None, '"pulls-1"']
+
+    def test_open_issues_follows_pages_skips_pulls_and_uses_etag(self, github_stub):
+        github_stub.issues = [
+            {"number": 1, "title": "Failures"},
+            {"number": 3, "title": "second page"},
+        ]
+        session = gf.get_github_session(_git_info(github_stub))
+
+        first = session.open_issues()
+        second = session.open_issues()
+
+        assert [i["number"] for i in first] == [1, 3]
+        assert second == first
+        issue_requests = [r for r in github_stub.requests if "/issues" in r[1]]
+        assert [r[2] is not None for r in issue_requests] == [
+            False,
+            False,
+            True,
+            True,
+        ]
+
+    def test_open_failure_issue_is_reused(self, github_stub):
+        git_info = _git_info(github_stub)
+        title = f"AutoPkg Recipe Failures - {datetime.now():%Y-%m-%d}"
+        github_stub.issues = [
+            {"number": 7, "title": title, "labels": [{"name": "other"}]},
+            {"number": 8, "title": title, "labels": [{"name": "autopkg-failure"}]},
+        ]
+
+        issue_url = gf.create_issue_for_failed_recipes(
+            git_info, [DummyRecipe("Bar.upload.jamf")]
+        )
+
+        assert issue_url == "https://github.com/o/r/issues/8"
+        assert ("POST", "/repos/o/r/issues", None) not in github_stub.requests
+        assert len(github_stub.comments) == 1
+        assert "#### Bar.upload.jamf\n- boom" in github_stub.comments[0]
+
+    def test_pr_and_issue_share_one_client_and_repo(self, github_stub):
+        git_info = _git_info(github_stub)
+
+        pr_url = gf.create_pull_request(git_info, DummyRecipe("Foo.upload.jamf"))
+        issue_url = gf.create_issue_for_failed_recipes(
+            git_info, [DummyRecipe("Bar.upload.jamf")]
+        )
+
+        assert pr_url == "https://github.com/o/r/pull/10"
+        assert issue_url == "https://github.com/o/r/issues/99"
+        repo_lookups = [r for r in github_stub.requests if r[1] == "/repos/o/r"]
+        assert len(repo_lookups) == 1
+        assert git_info["github_session"].repo is not None
+
+    def test_existing_open_pr_is_reused(self, github_stub):
+        git_info = _git_info(github_stub)
+        github_stub.pulls.append(
+            {"number": 42, "head": {"ref": git_info["override_trust_branch"]}}
+        )
+
+        pr_url = gf.create_pull_request(git_info, DummyRecipe("Foo.upload.jamf"))
+
+        assert pr_url == "https://github.com/o/r/pull/42"
+        assert not [r for r in github_stub.requests if r[0] == "POST"]
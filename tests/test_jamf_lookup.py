@@ -0,0 +1,213 @@
+import json
+import os
+import plistlib
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import pytest
+
+from autopkg_wrapper.utils import jamf_lookup
+from autopkg_wrapper.utils import report_processor as rp
+from autopkg_wrapper.utils.jamf_lookup import JamfLookupCache
+
+
+class _JamfStub(BaseHTTPRequestHandler):
+    """Minimal stand-in for the Jamf Pro and Classic APIs."""
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        server.requests.append(("POST", self.path))
+        if self.path == "/api/oauth/token":
+            server.tokens_issued += 1
+            self._send(
+                200, {"access_token": f"tok{server.tokens_issued}", "expires_in": 600}
+            )
+        else:
+            self._send(404)
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(("GET", self.path))
+        if self.headers.get("Authorization") != f"Bearer tok{server.tokens_issued}":
+            self._send(401)
+            return
+        url = urlparse(self.path)
+        if url.path == "/api/v1/packages":
+            query = parse_qs(url.query)
+            wanted = re.findall(r'"((?:[^"\\]|\\.)*)"', query["filter"][0])
+            matches = [
+                {"id": str(pid), "packageName": name}
+                for name, pid in sorted(server.packages.items())
+                if name.lower() in {w.lower() for w in wanted}
+            ]
+            page, size = int(query["page"][0]), int(query["page-size"][0])
+            self._send(
+                200,
+                {
+                    "totalCount": len(matches),
+                    "results": matches[page * size : (page + 1) * size],
+                },
+            )
+        elif url.path.startswith("/JSSResource/policies/name/"):
+            name = unquote(url.path.rsplit("/", 1)[1])
+            if name in server.policies:
+                self._send(
+                    200,
+                    {
+                        "policy": {
+                            "general": {"id": server.policies[name], "name": name}
+                        }
+                    },
+                )
+            else:
+                self._send(404)
+        else:
+            self._send(404)
+
+
+@pytest.fixture
+def jamf_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _JamfStub)
+    server.requests = []
+    server.tokens_issued = 0
+    server.packages = {"Foo-1.0.pkg": 1, "Bar-2.0.pkg": 2, "Baz-3.0.pkg": 3}
+    server.policies = {"Install Foo": 11, "Install Bar": 12}
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestJamfLookupCache:
+    def test_lookup_shares_one_token_and_pages_filtered_results(
+        self, jamf_stub, monkeypatch
+    ):
+        monkeypatch.setattr(jamf_lookup, "_PAGE_SIZE", 1)
+        cache = JamfLookupCache(jamf_stub.url, "id", "secret")
+
+        packages, policies = cache.lookup(
+            ["Foo-1.0.pkg", "bar-2.0.pkg", "Missing.pkg"],
+            ["Install Foo", "Install Bar", "Install Missing"],
+        )
+        cache.close()
+
+        assert packages == {
+            "Foo-1.0.pkg": f"{jamf_stub.url}/view/settings/computer-management/packages/1",
+            "bar-2.0.pkg": f"{jamf_stub.url}/view/settings/computer-management/packages/2",
+        }
+        assert policies == {
+            "Install Foo": f"{jamf_stub.url}/policies.html?id=11",
+            "Install Bar": f"{jamf_stub.url}/policies.html?id=12",
+        }
+        assert jamf_stub.tokens_issued == 1
+        package_requests = [
+            p for m, p in jamf_stub.requests if p.startswith("/api/v1/packages")
+        ]
+        # Two matches at one per page, all from a single filtered query
+        assert len(package_requests) == 2
+        assert "Baz" not in unquote(package_requests[0])
+        assert cache.errors == []
+
+    def test_cache_is_reused_between_runs_until_it_expires(self, jamf_stub, tmp_path):
+        cache_path = tmp_path / "jamf_cache.json"
+        first = JamfLookupCache(jamf_stub.url, "id", "secret", cache_path=cache_path)
+        first.lookup(["Foo-1.0.pkg", "Missing.pkg"], ["Install Foo"])
+        first.close()
+        jamf_stub.requests.clear()
+
+        second = JamfLookupCache(jamf_stub.url, "id", "secret", cache_path=cache_path)
+        packages, policies = second.lookup(
+            ["Foo-1.0.pkg", "Missing.pkg"], ["Install Foo"]
+        )
+        second.close()
+
+        assert jamf_stub.requests == []
+        assert list(packages) == ["Foo-1.0.pkg"]
+        assert list(policies) == ["Install Foo"]
+
+        # Only the name that isn't cached is asked for
+        third = JamfLookupCache(jamf_stub.url, "id", "secret", cache_path=cache_path)
+        third.lookup(["Foo-1.0.pkg", "Baz-3.0.pkg"], [])
+        third.close()
+        query = unquote(jamf_stub.requests[-1][1])
+        assert "Baz-3.0.pkg" in query and "Foo-1.0.pkg" not in query
+
+        jamf_stub.requests.clear()
+        expired = JamfLookupCache(
+            jamf_stub.url, "id", "secret", cache_path=cache_path, ttl=-1
+        )
+        expired.lookup([], ["Install Foo"])
+        expired.close()
+        assert ("GET", "/JSSResource/policies/name/Install%20Foo") in jamf_stub.requests
+
+    def test_process_reports_links_rows_through_the_cache(
+        self, jamf_stub, tmp_path, monkeypatch
+    ):
+        repdir = tmp_path / "reports" / "autopkg_report-1"
+        repdir.mkdir(parents=True)
+        with open(repdir / "Foo-2026-02-02T01-02-03.plist", "wb") as f:
+            plistlib.dump(
+                {
+                    "failures": [],
+                    "summary_results": {
+                        "jamfpackageuploader_summary_result": {
+                            "data_rows": [
+                                {
+                                    "name": "Foo",
+                                    "version": "1.0",
+                                    "pkg_name": "Foo-1.0.pkg",
+                                }
+                            ]
+                        }
+                    },
+                },
+                f,
+            )
+        monkeypatch.setenv("AUTOPKG_JSS_URL", jamf_stub.url)
+        monkeypatch.setenv("AUTOPKG_CLIENT_ID", "id")
+        monkeypatch.setenv("AUTOPKG_CLIENT_SECRET", "secret")
+        out_dir = tmp_path / "out"
+
+        rp.process_reports(
+            zip_file=None,
+            extract_dir=str(tmp_path / "extract"),
+            reports_dir=str(tmp_path / "reports"),
+            out_dir=str(out_dir),
+            debug=True,
+            strict=False,
+            jamf_cache_path=str(tmp_path / "jamf_cache.json"),
+        )
+
+        job_md = (out_dir / "job_summary.md").read_text(encoding="utf-8")
+        assert "/view/settings/computer-management/packages/1" in job_md
+        diag = json.loads((out_dir / "jamf_lookup_debug.json").read_text())
+        assert diag["matched_count"] == 1
+        assert os.path.exists(tmp_path / "jamf_cache.json")
+
+    def test_jss_url_without_a_scheme_defaults_to_https(self):
+        client = jamf_lookup.JamfApiClient("example.jamfcloud.com/", "id", "secret")
+        cache = JamfLookupCache("example.jamfcloud.com", "id", "secret", client=client)
+        cache._store("policies", {"Install Foo": "11"})
+
+        assert client.jss_url == "https://example.jamfcloud.com"
+        assert cache.lookup([], ["Install Foo"])[1] == {
+            "Install Foo": "https://example.jamfcloud.com/policies.html?id=11"
+        }
+        assert jamf_lookup.normalize_jss_url("http://jss.test/") == "http://jss.test"
@@ -151,3 +151,60 @@ class TestProcessRecipeTrustFailurePath:
         assert "unexpected verified" in combined
         assert "Firefox.upload.jamf" in combined
         assert "report it" in combined  # points users at issue tracker
+
+
+class TestProcessRecipeCombinedTrustAndRun:
+    """--combine-trust-and-run replaces verify-trust-info + run with one run."""
+
+    def test_single_run_without_separate_verification(self):
+        recipe = Recipe("Firefox.upload.jamf")
+        recipe.verify_trust_info = MagicMock()
+        recipe.update_trust_info = MagicMock()
+        recipe.run = MagicMock(
+            side_effect=lambda args, enforce_trust: setattr(recipe, "verified", True)
+        )
+
+        process_recipe(
+            recipe=recipe,
+            disable_recipe_trust_check=False,
+            args=_args(combine_trust_and_run=True),
+        )
+
+        recipe.verify_trust_info.assert_not_called()
+        recipe.run.assert_called_once()
+        assert recipe.run.call_args.kwargs == {"enforce_trust": True}
+        recipe.update_trust_info.assert_not_called()
+
+    def test_trust_failure_falls_back_to_update_trust_info(self, caplog):
+        recipe = Recipe("Firefox.upload.jamf")
+        recipe.verify_trust_info = MagicMock()
+        recipe.update_trust_info = MagicMock()
+        recipe.run = MagicMock(
+            side_effect=lambda args, enforce_trust: setattr(recipe, "verified", False)
+        )
+
+        with caplog.at_level(logging.INFO):
+            process_recipe(
+                recipe=recipe,
+                disable_recipe_trust_check=False,
+                args=_args(combine_trust_and_run=True),
+            )
+
+        recipe.verify_trust_info.assert_not_called()
+        recipe.update_trust_info.assert_called_once()
+        messages = [r.getMessage() for r in caplog.records]
+        assert any("will NOT run on this invocation" in m for m in messages)
+
+    def test_trust_check_disabled_ignores_combined_mode(self):
+        recipe = Recipe("Firefox.upload.jamf")
+        recipe.verify_trust_info = MagicMock()
+        recipe.update_trust_info = MagicMock()
+        recipe.run = MagicMock()
+
+        process_recipe(
+            recipe=recipe,
+            disable_recipe_trust_check=True,
+            args=_args(combine_trust_and_run=True),
+        )
+
+        recipe.run.assert_called_once_with(_args(combine_trust_and_run=True))
@@ -0,0 +1,138 @@
+import json
+import threading
+
+from autopkg_wrapper.models.recipe import Recipe
+from autopkg_wrapper.utils.recipe_batching import (
+    build_recipe_batches,
+    build_recipe_dependencies,
+)
+from autopkg_wrapper.utils.recipe_durations import (
+    DurationHistory,
+    longest_first_priorities,
+)
+from autopkg_wrapper.utils.recipe_scheduler import RecipeScheduler, Stage
+
+
+def _ran(name, seconds, **state):
+    recipe = Recipe(name)
+    recipe.timings = {"queue": 100.0, "run": seconds}
+    for key, value in state.items():
+        setattr(recipe, key, value)
+    return recipe
+
+
+class TestDurationHistory:
+    def test_records_clean_runs_as_a_moving_average(self, tmp_path):
+        path = tmp_path / "durations.json"
+        history = DurationHistory(path)
+        failed = _ran("Broken.download", 1.0, error=True)
+        untrusted = _ran("Untrusted.download", 1.0, verified=False)
+        assert history.record([_ran("Foo.download", 10.0), failed, untrusted]) == 1
+        history.save()
+
+        history = DurationHistory(path)
+        history.record([_ran("Foo.download", 20.0), Recipe("Skipped.download")])
+        history.save()
+
+        entry = json.loads(path.read_text())["recipes"]["Foo.download"]
+        assert (entry["duration"], entry["last"], entry["runs"]) == (15.0, 20.0, 2)
+        assert set(DurationHistory(path).entries) == {"Foo.download"}
+
+    def test_unknown_recipes_are_estimated_at_the_median(self, tmp_path):
+        history = DurationHistory(tmp_path / "durations.json")
+        assert history.estimate("New.download") == 0.0
+        history.record([_ran("A.download", 1.0), _ran("B.download", 5.0)])
+        history.record([_ran("C.download", 30.0)])
+
+        assert history.estimate("B.download") == 5.0
+        assert history.estimate("New.download") == 5.0
+
+    def test_unreadable_or_old_history_is_ignored(self, tmp_path):
+        path = tmp_path / "durations.json"
+        path.write_text("{not json")
+        assert DurationHistory(path).entries == {}
+        path.write_text(json.dumps({"version": 0, "recipes": {"A": {}}}))
+        assert DurationHistory(path).entries == {}
+
+
+class TestLongestFirstScheduling:
+    def _history(self, tmp_path, durations):
+        history = DurationHistory(tmp_path / "durations.json")
+        history.record([_ran(name, seconds) for name, seconds in durations.items()])
+        return history
+
+    def test_priorities_include_the_recipes_that_must_follow(self, tmp_path):
+        recipes = [
+            Recipe(n)
+            for n in (
+                "Quick.upload.jamf",
+                "Medium.upload.jamf",
+                "Quick.self_service.jamf",
+            )
+        ]
+        batches = build_recipe_batches(
+            recipe_list=recipes, recipe_processing_order=["upload", "self_service"]
+        )
+        history = self._history(
+            tmp_path,
+            {
+                "Quick.upload.jamf": 1.0,
+                "Medium.upload.jamf": 20.0,
+                "Quick.self_service.jamf": 30.0,
+            },
+        )
+
+        priorities = longest_first_priorities(
+            recipes, build_recipe_dependencies(batches), history
+        )
+
+        quick_upload, medium_upload, quick_ss = recipes
+        assert priorities[quick_ss] == 30.0
+        assert priorities[quick_upload] == 31.0
+        assert priorities[medium_upload] == 20.0
+
+    def test_scheduler_starts_the_longest_work_first(self, tmp_path):
+        recipes = [
+            Recipe(n)
+            for n in (
+                "A.upload.jamf",
+                "B.upload.jamf",
+                "C.upload.jamf",
+                "B.self_service.jamf",
+            )
+        ]
+        batches = build_recipe_batches(
+            recipe_list=recipes, recipe_processing_order=["upload", "self_service"]
+        )
+        ordered = [r for batch in batches for r in batch]
+        dependencies = build_recipe_dependencies(batches)
+        history = self._history(
+            tmp_path,
+            {
+                "A.upload.jamf": 5.0,
+                "B.upload.jamf": 1.0,
+                "C.upload.jamf": 10.0,
+                "B.self_service.jamf": 20.0,
+            },
+        )
+        started = []
+        lock = threading.Lock()
+
+        def task(r):
+            with lock:
+                started.append(r.name)
+
+        RecipeScheduler(max_workers=1).run(
+            ordered,
+            [Stage("run", task)],
+            dependencies,
+            priority=longest_first_priorities(ordered, dependencies, history),
+        )
+
+        # B.self_service is the longest but still waits for B.upload
+        assert started == [
+            "B.upload.jamf",
+            "B.self_service.jamf",
+            "C.upload.jamf",
+            "A.upload.jamf",
+        ]
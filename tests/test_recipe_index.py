@@ -0,0 +1,223 @@
+"""Tests for the shared recipe override index."""
+
+import glob
+import json
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from autopkg_wrapper.models.recipe import Recipe
+from autopkg_wrapper.utils import recipe_index
+from autopkg_wrapper.utils.report_processor import _build_recipe_link_map
+
+
+@pytest.fixture(autouse=True)
+def _clear_index_cache():
+    recipe_index.clear_recipe_index_cache()
+    yield
+    recipe_index.clear_recipe_index_cache()
+    recipe_index.set_persistent_cache_repo(None)
+
+
+def _make_tree(root: Path) -> None:
+    (root / "Firefox").mkdir()
+    (root / "Chrome").mkdir()
+    (root / ".git").mkdir()
+    (root / "Firefox" / "Firefox.upload.jamf.recipe.yaml").touch()
+    (root / "Firefox" / "Firefox.download.recipe").touch()
+    (root / "Chrome" / "Chrome.upload.jamf.recipe.plist").touch()
+    (root / ".git" / "Ignored.recipe.yaml").touch()
+    (root / "README.md").touch()
+
+
+class TestBuildRecipeIndex:
+    def test_indexes_recipe_files_with_format_and_mtime(self):
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            _make_tree(root)
+
+            index = recipe_index.build_recipe_index(root)
+
+        assert sorted(index.by_name) == [
+            "Chrome.upload.jamf",
+            "Firefox.download",
+            "Firefox.upload.jamf",
+        ]
+        yaml_entry = index.lookup("Firefox.upload.jamf")
+        assert yaml_entry.format == "yaml"
+        assert yaml_entry.mtime > 0
+        assert index.lookup("Firefox.download").format == "plist"
+        assert index.lookup("Ignored") is None
+
+    def test_top_level_and_extension_precedence(self):
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            (root / "nested").mkdir()
+            (root / "Foo.download.recipe.plist").touch()
+            (root / "Foo.download.recipe.yaml").touch()
+            (root / "nested" / "Foo.download.recipe").touch()
+
+            index = recipe_index.build_recipe_index(root)
+
+        assert index.lookup("Foo.download").path.name == "Foo.download.recipe.yaml"
+        assert len(index.entries) == 3
+
+
+class TestGetRecipeIndex:
+    def test_index_is_built_once_per_root(self):
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            _make_tree(root)
+
+            with patch.object(
+                recipe_index,
+                "build_recipe_index",
+                wraps=recipe_index.build_recipe_index,
+            ) as build:
+                first = recipe_index.get_recipe_index(root)
+                second = recipe_index.get_recipe_index(root)
+                child = recipe_index.get_recipe_index(root / "Firefox")
+
+        assert first is second
+        build.assert_called_once()
+        assert sorted(child.by_name) == ["Firefox.download", "Firefox.upload.jamf"]
+
+    def test_match_follows_glob_semantics(self):
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            _make_tree(root)
+            index = recipe_index.get_recipe_index(root)
+
+            for pattern in ["**/*.recipe.yaml", "*/*.recipe*", "*.recipe", "F*/*"]:
+                expected = sorted(
+                    Path(p).resolve()
+                    for p in glob.glob(str(root / pattern), recursive=True)
+                    if recipe_index.split_recipe_filename(Path(p).name)
+                )
+                assert sorted(e.path for e in index.match(pattern)) == expected
+
+
+class TestRecipeIndexConsumers:
+    def test_find_recipe_file_path_uses_index(self):
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            _make_tree(root)
+            args = SimpleNamespace(overrides_repo_path=root, autopkg_prefs=None)
+
+            with patch.object(
+                recipe_index,
+                "build_recipe_index",
+                wraps=recipe_index.build_recipe_index,
+            ) as build:
+                found = [
+                    Recipe(name).find_recipe_file_path(args)
+                    for name in ("Firefox.upload.jamf", "Chrome.upload.jamf", "Nope")
+                ]
+
+        build.assert_called_once()
+        assert found[0].name == "Firefox.upload.jamf.recipe.yaml"
+        assert found[1].name == "Chrome.upload.jamf.recipe.plist"
+        assert found[2] is None
+
+    def test_build_recipe_link_map_uses_index(self):
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            _make_tree(root)
+
+            link_map = _build_recipe_link_map(
+                str(root), "https://github.com/o/r", "main"
+            )
+
+        assert link_map == {
+            "Chrome.upload.jamf": "https://github.com/o/r/blob/main/Chrome/Chrome.upload.jamf.recipe.plist",
+            "Firefox.download": "https://github.com/o/r/blob/main/Firefox/Firefox.download.recipe",
+            "Firefox.upload.jamf": "https://github.com/o/r/blob/main/Firefox/Firefox.upload.jamf.recipe.yaml",
+        }
+
+
+class TestPersistentRecipeIndexCache:
+    def _cache_file(self, root: Path) -> Path:
+        return root / ".git" / "autopkg_wrapper" / "recipe_index.json"
+
+    def test_writes_cache_under_git_dir(self):
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td).resolve()
+            _make_tree(root)
+            recipe_index.set_persistent_cache_repo(root)
+
+            recipe_index.get_recipe_index(root / "Firefox")
+
+            data = json.loads(self._cache_file(root).read_text())
+
+        assert data["version"] == 1
+        listings = data["roots"][str(root / "Firefox")]
+        assert [r[0] for r in listings["."]["recipes"]] == [
+            "Firefox.upload.jamf.recipe.yaml",
+            "Firefox.download.recipe",
+        ]
+
+    def test_unchanged_directories_are_not_listed_again(self):
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td).resolve()
+            _make_tree(root)
+            recipe_index.set_persistent_cache_repo(root)
+            first = recipe_index.get_recipe_index(root)
+            recipe_index.clear_recipe_index_cache()
+
+            with patch.object(
+                recipe_index, "_list_directory", wraps=recipe_index._list_directory
+            ) as list_directory:
+                second = recipe_index.get_recipe_index(root)
+
+        list_directory.assert_not_called()
+        assert [e.path for e in second.entries] == [e.path for e in first.entries]
+
+    def test_changed_directory_is_listed_again(self):
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td).resolve()
+            _make_tree(root)
+            recipe_index.set_persistent_cache_repo(root)
+            recipe_index.get_recipe_index(root)
+            recipe_index.clear_recipe_index_cache()
+
+            (root / "Chrome" / "Chrome.download.recipe.yaml").touch()
+            with patch.object(
+                recipe_index, "_list_directory", wraps=recipe_index._list_directory
+            ) as list_directory:
+                index = recipe_index.get_recipe_index(root)
+
+        assert [c.args[0].name for c in list_directory.call_args_list] == ["Chrome"]
+        assert index.lookup("Chrome.download") is not None
+
+    def test_disabled_cache_is_not_written(self):
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td).resolve()
+            _make_tree(root)
+
+            recipe_index.set_persistent_cache_repo(None)
+            recipe_index.get_recipe_index(root)
+
+            assert not self._cache_file(root).exists()
+
+    def test_directories_outside_the_override_repo_are_not_cached(self):
+        with tempfile.TemporaryDirectory() as td:
+            outer = Path(td).resolve()
+            (outer / ".git").mkdir()
+            overrides = outer / "checkout" / "overrides"
+            overrides.mkdir(parents=True)
+            (outer / "checkout" / ".git").mkdir()
+            recipes = outer / "recipes"
+            recipes.mkdir()
+            _make_tree(recipes)
+            recipe_index.set_persistent_cache_repo(overrides)
+
+            recipe_index.get_recipe_index(recipes)
+            recipe_index.get_recipe_index(overrides)
+
+            assert not (outer / ".git" / "autopkg_wrapper").exists()
+            assert not self._cache_file(recipes).exists()
+            cached = json.loads(self._cache_file(outer / "checkout").read_text())
+            assert list(cached["roots"]) == [str(overrides)]
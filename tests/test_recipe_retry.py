@@ -0,0 +1,54 @@
+from autopkg_wrapper.models.recipe import Recipe
+from autopkg_wrapper.utils.error_classifier import ErrorClassifier
+from autopkg_wrapper.utils.recipe_retry import RetryPolicy
+
+
+def _failed(message, attempts=1, **attrs):
+    recipe = Recipe("Foo.download")
+    recipe.attempts = attempts
+    recipe.error = True
+    recipe.results = {"failed": [{"message": message}], "imported": ""}
+    for name, value in attrs.items():
+        setattr(recipe, name, value)
+    return recipe
+
+
+class TestRetryPolicy:
+    def test_network_and_download_failures_back_off_exponentially(self):
+        policy = RetryPolicy(max_attempts=4, backoff=10)
+
+        assert policy.retry_delay(_failed("Could not resolve proxy")) == 10
+        assert policy.retry_delay(_failed("curl: (56) reset", attempts=2)) == 20
+        assert policy.retry_delay(_failed("Download failed", attempts=3)) == 40
+        assert policy.retry_delay(_failed("Download failed", attempts=4)) is None
+
+    def test_other_failures_are_not_retried(self):
+        policy = RetryPolicy(max_attempts=3)
+
+        assert policy.retry_delay(_failed("Code signature mismatch")) is None
+        assert policy.retry_delay(_failed("Download failed", verified=False)) is None
+        timed_out = _failed("autopkg run timed out after 600s")
+        timed_out.results["timed_out"] = True
+        assert policy.retry_delay(timed_out) is None
+
+        ok = Recipe("Foo.download")
+        ok.attempts = 1
+        assert policy.retry_delay(ok) is None
+
+    def test_categories_come_from_the_classifier(self):
+        policy = RetryPolicy(
+            max_attempts=2,
+            backoff=5,
+            categories=("vpn",),
+            classifier=ErrorClassifier([("vpn", ["globalprotect"])]),
+        )
+
+        assert policy.retry_delay(_failed("GlobalProtect tunnel dropped")) == 5
+        assert policy.retry_delay(_failed("Download failed")) is None
+
+    def test_prepare_retry_clears_the_failure(self):
+        recipe = _failed("Download failed", verified=True)
+
+        recipe.prepare_retry()
+
+        assert (recipe.error, recipe.results, recipe.verified) == (False, {}, True)
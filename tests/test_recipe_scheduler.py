@@ -0,0 +1,381 @@
+import threading
+import time
+
+from autopkg_wrapper.models.recipe import Recipe
+from autopkg_wrapper.utils.recipe_batching import (
+    build_recipe_batches,
+    build_recipe_dependencies,
+    resource_class_for,
+)
+from autopkg_wrapper.utils.recipe_scheduler import (
+    RecipeScheduler,
+    Stage,
+    run_stages_serially,
+)
+
+
+def _batched(names, order=("upload", "self_service")):
+    recipes = [Recipe(n) for n in names]
+    batches = build_recipe_batches(recipe_list=recipes, recipe_processing_order=order)
+    return recipes, batches
+
+
+class TestBuildRecipeDependencies:
+    def test_dependencies_are_per_title(self):
+        recipes, batches = _batched(
+            [
+                "Firefox.upload.jamf",
+                "Chrome.upload.jamf",
+                "Firefox.self_service.jamf",
+                "Zoom.self_service.jamf",
+            ]
+        )
+        deps = build_recipe_dependencies(batches)
+
+        firefox_upload, chrome_upload, firefox_ss, zoom_ss = recipes
+        assert deps[firefox_upload] == []
+        assert deps[chrome_upload] == []
+        assert deps[firefox_ss] == [firefox_upload]
+        assert deps[zoom_ss] == []
+
+
+class TestRecipeScheduler:
+    def test_dependant_waits_only_for_its_own_title(self):
+        recipes, batches = _batched(
+            [
+                "Slow.upload.jamf",
+                "Fast.upload.jamf",
+                "Fast.self_service.jamf",
+                "Slow.self_service.jamf",
+            ]
+        )
+        slow_release = threading.Event()
+        finished = []
+
+        def task(r):
+            if r.name == "Slow.upload.jamf":
+                assert slow_release.wait(5)
+            if r.name == "Fast.self_service.jamf":
+                # Would deadlock with a per-batch barrier
+                slow_release.set()
+            finished.append(r.name)
+
+        completed = RecipeScheduler(max_workers=2).run(
+            recipes, task, build_recipe_dependencies(batches)
+        )
+
+        assert finished.index("Fast.self_service.jamf") < finished.index(
+            "Slow.upload.jamf"
+        )
+        assert finished.index("Slow.upload.jamf") < finished.index(
+            "Slow.self_service.jamf"
+        )
+        assert sorted(r.name for r in completed) == sorted(finished)
+
+    def test_never_exceeds_max_workers(self):
+        recipes = [Recipe(f"App{i}.download") for i in range(8)]
+        lock = threading.Lock()
+        running = 0
+        peak = 0
+
+        def task(_r):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+
+        completed = RecipeScheduler(max_workers=3).run(recipes, task)
+
+        assert len(completed) == 8
+        assert peak <= 3
+
+    def test_task_error_marks_recipe_failed_and_releases_dependants(self):
+        recipes, batches = _batched(["Foo.upload.jamf", "Foo.self_service.jamf"])
+
+        def task(r):
+            if r.name == "Foo.upload.jamf":
+                raise RuntimeError("boom")
+
+        completed = RecipeScheduler(max_workers=1).run(
+            recipes, task, build_recipe_dependencies(batches)
+        )
+
+        assert [r.name for r in completed] == [
+            "Foo.upload.jamf",
+            "Foo.self_service.jamf",
+        ]
+        assert recipes[0].error is True
+        assert recipes[0].results["failed"] == [{"message": "boom"}]
+        assert recipes[1].error is False
+
+    def test_recipes_not_started_by_the_deadline_are_skipped(self):
+        recipes, batches = _batched(
+            [
+                "Slow.upload.jamf",
+                "Late.upload.jamf",
+                "Late.self_service.jamf",
+            ]
+        )
+        slow, late_upload, late_ss = recipes
+        ran = []
+
+        def task(recipe):
+            ran.append(recipe.name)
+            if recipe is slow:
+                time.sleep(0.1)
+
+        finished = RecipeScheduler(max_workers=1).run(
+            [r for batch in batches for r in batch],
+            task,
+            build_recipe_dependencies(batches),
+            deadline=time.monotonic() + 0.05,
+        )
+
+        assert ran == ["Slow.upload.jamf"]
+        assert finished == [slow, late_upload, late_ss]
+        assert not slow.error
+        for recipe in (late_upload, late_ss):
+            assert recipe.error
+            assert recipe.results["timed_out"] is True
+            assert "deadline" in recipe.results["failed"][0]["message"]
+
+
+class TestRecipeSchedulerRetries:
+    def test_retried_recipe_waits_behind_fresh_work(self):
+        flaky, first, second = (Recipe(n) for n in ("Flaky", "First", "Second"))
+        calls = []
+
+        def task(recipe):
+            calls.append(recipe.name)
+            if recipe is flaky and calls.count("Flaky") == 1:
+                recipe.error = True
+                recipe.results = {"failed": [{"message": "network down"}]}
+            time.sleep(0.02)
+
+        stages = [Stage("run", task, retry=lambda r: 0.0 if r.error else None)]
+        RecipeScheduler(max_workers=1).run([flaky, first, second], stages)
+
+        assert calls == ["Flaky", "First", "Second", "Flaky"]
+        assert not flaky.error
+        assert flaky.results == {}
+
+    def test_retry_waits_for_its_backoff(self):
+        recipe = Recipe("Flaky")
+        started = []
+
+        def task(r):
+            started.append(time.monotonic())
+            r.error = len(started) < 3
+
+        stages = [Stage("run", task, retry=lambda r: 0.05 if r.error else None)]
+        RecipeScheduler(max_workers=2).run([recipe], stages)
+
+        assert len(started) == 3
+        assert started[1] - started[0] >= 0.05
+        assert started[2] - started[1] >= 0.05
+        assert not recipe.error
+
+    def test_no_retry_past_the_deadline(self):
+        recipe = Recipe("Flaky")
+        calls = []
+
+        def task(r):
+            calls.append(r.name)
+            r.error = True
+            r.results = {"failed": [{"message": "network down"}]}
+
+        stages = [Stage("run", task, retry=lambda r: 60.0)]
+        RecipeScheduler(max_workers=1).run(
+            [recipe], stages, deadline=time.monotonic() + 30
+        )
+
+        assert calls == ["Flaky"]
+        assert recipe.results == {"failed": [{"message": "network down"}]}
+
+
+class TestRecipeSchedulerStages:
+    def test_recipe_moves_to_next_stage_without_waiting_for_others(self):
+        recipes = [Recipe("Slow.download"), Recipe("Fast.download")]
+        slow_release = threading.Event()
+        events = []
+
+        def run(r):
+            if r.name == "Slow.download":
+                assert slow_release.wait(5)
+            events.append(("run", r.name))
+
+        def notify(r):
+            events.append(("notify", r.name))
+            slow_release.set()
+
+        RecipeScheduler(max_workers=2).run(
+            recipes, [Stage("run", run), Stage("notify", notify)]
+        )
+
+        assert events.index(("notify", "Fast.download")) < events.index(
+            ("run", "Slow.download")
+        )
+        assert len(events) == 4
+
+    def test_failed_stage_skips_work_stages_but_not_notify(self):
+        recipes = [Recipe("Broken.download"), Recipe("Fine.download")]
+        events = []
+
+        def verify(r):
+            if r.name == "Broken.download":
+                raise RuntimeError("boom")
+
+        stages = [
+            Stage("verify", verify),
+            Stage("run", lambda r: events.append(("run", r.name))),
+            Stage(
+                "notify",
+                lambda r: events.append(("notify", r.name)),
+                after_failure=True,
+            ),
+        ]
+        RecipeScheduler(max_workers=1).run(recipes, stages)
+
+        assert ("run", "Broken.download") not in events
+        assert ("notify", "Broken.download") in events
+        assert ("run", "Fine.download") in events
+        assert recipes[0].results["failed"] == [{"message": "boom"}]
+
+    def test_stage_concurrency_limit_and_when(self):
+        recipes = [Recipe(f"App{i}.download") for i in range(6)]
+        lock = threading.Lock()
+        in_notify = 0
+        peak = 0
+        notified = []
+
+        def notify(r):
+            nonlocal in_notify, peak
+            with lock:
+                in_notify += 1
+                peak = max(peak, in_notify)
+            time.sleep(0.01)
+            with lock:
+                in_notify -= 1
+                notified.append(r.name)
+
+        stages = [
+            Stage("run", lambda r: None),
+            Stage(
+                "notify",
+                notify,
+                max_concurrency=1,
+                when=lambda r: r.name != "App0.download",
+            ),
+        ]
+        completed = RecipeScheduler(max_workers=4).run(recipes, stages)
+
+        assert peak == 1
+        assert len(completed) == 6
+        assert "App0.download" not in notified
+        assert len(notified) == 5
+
+    def test_class_limits_hold_back_one_class_only(self):
+        uploads = [Recipe(f"App{i}.upload.jamf") for i in range(4)]
+        downloads = [Recipe(f"App{i}.download") for i in range(4)]
+        lock = threading.Lock()
+        running = {"jamf": 0, "download": 0}
+        peak = {"jamf": 0, "download": 0}
+        order = []
+
+        def run(r):
+            cls = resource_class_for(r)
+            with lock:
+                running[cls] += 1
+                peak[cls] = max(peak[cls], running[cls])
+                order.append(r.name)
+            time.sleep(0.02)
+            with lock:
+                running[cls] -= 1
+
+        stages = [
+            Stage(
+                "run",
+                run,
+                class_limits={"jamf": 1},
+                resource_class=resource_class_for,
+            )
+        ]
+        RecipeScheduler(max_workers=4).run(uploads + downloads, stages)
+
+        assert peak == {"jamf": 1, "download": 3}
+        # Downloads started while the uploads queued behind each other
+        assert set(order[:4]) == {
+            "App0.upload.jamf",
+            "App0.download",
+            "App1.download",
+            "App2.download",
+        }
+
+    def test_resource_class_for(self):
+        classes = {
+            name: resource_class_for(Recipe(name))
+            for name in (
+                "Firefox.download",
+                "Firefox.pkg",
+                "Firefox.upload.jamf",
+                "Firefox.self_service.jamf",
+                "Firefox.jss",
+                "Firefox.munki",
+                "Firefox",
+            )
+        }
+        assert classes == {
+            "Firefox.download": "download",
+            "Firefox.pkg": "pkg",
+            "Firefox.upload.jamf": "jamf",
+            "Firefox.self_service.jamf": "jamf",
+            "Firefox.jss": "jamf",
+            "Firefox.munki": "other",
+            "Firefox": "other",
+        }
+
+    def test_dependants_released_after_named_stage(self):
+        recipes, batches = _batched(["Foo.upload.jamf", "Foo.self_service.jamf"])
+        notify_release = threading.Event()
+        events = []
+
+        def run(r):
+            events.append(("run", r.name))
+            if r.name == "Foo.self_service.jamf":
+                notify_release.set()
+
+        def notify(r):
+            if r.name == "Foo.upload.jamf":
+                assert notify_release.wait(5)
+            events.append(("notify", r.name))
+
+        RecipeScheduler(max_workers=2).run(
+            recipes,
+            [Stage("run", run), Stage("notify", notify)],
+            build_recipe_dependencies(batches),
+            release_after="run",
+        )
+
+        assert events.index(("run", "Foo.self_service.jamf")) < events.index(
+            ("notify", "Foo.upload.jamf")
+        )
+
+    def test_run_stages_serially_keeps_recipe_order(self):
+        recipes = [Recipe("A.download"), Recipe("B.download")]
+        events = []
+        stages = [
+            Stage("verify", lambda r: events.append(("verify", r.name))),
+            Stage("run", lambda r: events.append(("run", r.name))),
+        ]
+
+        run_stages_serially(recipes, stages)
+
+        assert events == [
+            ("verify", "A.download"),
+            ("run", "A.download"),
+            ("verify", "B.download"),
+            ("run", "B.download"),
+        ]
@@ -0,0 +1,119 @@
+import logging
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from autopkg_wrapper.models.recipe import Recipe, verify_trust_info_batch
+from autopkg_wrapper.utils.command_runner import CommandResult
+from autopkg_wrapper.utils.recipe_scheduler import RecipeScheduler, Stage
+from autopkg_wrapper.utils.recipe_timing import (
+    log_slowest_recipes,
+    slowest_recipes_table,
+)
+
+
+def _args(**kwargs):
+    return SimpleNamespace(
+        debug=False,
+        autopkg_prefs=None,
+        autopkg_bin="/usr/local/bin/autopkg",
+        dry_run=False,
+        **kwargs,
+    )
+
+
+class TestRecipeTiming:
+    def test_phases_accumulate_and_duration_skips_the_queue(self):
+        r = Recipe("Foo.download")
+        assert r.duration is None
+
+        r.record_timing("queue", 5.0)
+        r.record_timing("verify", 1.0)
+        with r.timed("run"):
+            time.sleep(0.01)
+        with r.timed("run"):
+            pass
+
+        assert r.timings["run"] >= 0.01
+        assert r.duration == r.timings["verify"] + r.timings["run"]
+
+    def test_recipe_commands_record_their_phases(self):
+        r = Recipe("Foo.download")
+        with patch("autopkg_wrapper.models.recipe.run_command") as run:
+            run.return_value = CommandResult(returncode=1, stderr="bad", stdout="")
+            r.verify_trust_info(_args())
+            r.run(_args())
+        with patch("autopkg_wrapper.models.recipe.subprocess.check_call"):
+            r.update_trust_info(_args(), tidy=False)
+
+        assert set(r.timings) == {"verify", "run", "update_trust"}
+
+    def test_batched_verification_shares_the_process_time(self):
+        recipes = [Recipe("Foo.download"), Recipe("Bar.download")]
+
+        def slow_run(*_args, **_kwargs):
+            time.sleep(0.02)
+            return CommandResult(
+                returncode=0,
+                stdout="Foo.download: OK\nBar.download: OK\n",
+                stderr="",
+            )
+
+        with patch("autopkg_wrapper.models.recipe.run_command", slow_run):
+            verify_trust_info_batch(recipes, _args(), batch_size=2)
+
+        assert recipes[0].timings["verify"] == recipes[1].timings["verify"]
+        assert recipes[0].timings["verify"] >= 0.01
+
+    def test_scheduler_records_time_spent_waiting_for_a_worker(self):
+        recipes = [Recipe("Foo.download"), Recipe("Bar.download")]
+
+        RecipeScheduler(max_workers=1).run(
+            recipes, [Stage("run", lambda r: time.sleep(0.05))]
+        )
+
+        assert recipes[0].timings["queue"] < 0.04
+        assert recipes[1].timings["queue"] >= 0.04
+
+    def test_slowest_recipes_table(self, caplog):
+        fast, slow, untimed = (
+            Recipe("Fast.download"),
+            Recipe("Slow.upload.jamf"),
+            Recipe("Untimed.download"),
+        )
+        fast.timings = {"queue": 30.0, "run": 2.0}
+        slow.timings = {"verify": 1.25, "run": 80.0, "git": 3.0}
+
+        lines = slowest_recipes_table([fast, slow, untimed], limit=5)
+
+        assert lines[0] == "Slowest recipes (2 of 2 timed):"
+        assert lines[1].split() == [
+            "Recipe",
+            "Total",
+            "Queue",
+            "Verify",
+            "Run",
+            "Trust",
+            "Tidy",
+            "Git",
+        ]
+        assert lines[2].split() == [
+            "Slow.upload.jamf",
+            "84.2s",
+            "-",
+            "1.2s",
+            "80.0s",
+            "-",
+            "-",
+            "3.0s",
+        ]
+        assert lines[3].split()[:3] == ["Fast.download", "2.0s", "30.0s"]
+        assert len({len(line) for line in lines[1:]}) == 1
+        assert slowest_recipes_table([fast, slow], limit=1)[0] == (
+            "Slowest recipes (1 of 2 timed):"
+        )
+        assert slowest_recipes_table([fast, slow], limit=0) == []
+
+        with caplog.at_level(logging.INFO):
+            log_slowest_recipes([untimed])
+        assert caplog.records == []
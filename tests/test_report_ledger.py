@@ -0,0 +1,173 @@
+import os
+import plistlib
+import zipfile
+
+from autopkg_wrapper.utils import report_processor as rp
+from autopkg_wrapper.utils.error_classifier import ErrorClassifier
+from autopkg_wrapper.utils.report_ledger import ReportLedger
+
+
+def _write_report(repdir, name, version):
+    path = os.path.join(repdir, f"{name}-2026-02-02T01-02-03.plist")
+    with open(path, "wb") as f:
+        plistlib.dump(
+            {
+                "failures": [],
+                "summary_results": {
+                    "jamfpackageuploader_summary_result": {
+                        "data_rows": [
+                            {
+                                "name": name,
+                                "version": version,
+                                "pkg_name": f"{name}-{version}.pkg",
+                            }
+                        ]
+                    }
+                },
+            },
+            f,
+        )
+    return path
+
+
+class TestReportLedger:
+    def _aggregate(self, base, ledger_path, monkeypatch, link_map=None, **kwargs):
+        parsed = []
+        original = rp.parse_report_file
+
+        def counting_parse(path, **kw):
+            parsed.append(os.path.basename(path))
+            return original(path, **kw)
+
+        monkeypatch.setattr(rp, "parse_report_file", counting_parse)
+        ledger = ReportLedger(ledger_path, link_map)
+        summary = rp.aggregate_reports(
+            kwargs.pop("base_path", base),
+            recipe_link_map=link_map,
+            ledger=ledger,
+            **kwargs,
+        )
+        ledger.save()
+        return summary, sorted(parsed)
+
+    def test_second_run_only_parses_new_and_changed_reports(
+        self, tmp_path, monkeypatch
+    ):
+        repdir = tmp_path / "reports" / "autopkg_report-1"
+        repdir.mkdir(parents=True)
+        ledger_path = tmp_path / "ledger.json"
+        foo = _write_report(repdir, "Foo", "1.0")
+        _write_report(repdir, "Bar", "1.0")
+
+        first, parsed = self._aggregate(
+            str(tmp_path / "reports"), ledger_path, monkeypatch
+        )
+        assert len(parsed) == 2
+
+        _write_report(repdir, "Foo", "2.0")
+        os.utime(foo, ns=(1, 1))
+        _write_report(repdir, "Baz", "1.0")
+        second, parsed = self._aggregate(
+            str(tmp_path / "reports"), ledger_path, monkeypatch
+        )
+
+        assert parsed == [
+            "Baz-2026-02-02T01-02-03.plist",
+            "Foo-2026-02-02T01-02-03.plist",
+        ]
+        assert second["recipes"] == 3
+        assert {"name": "Foo", "version": "2.0"} in second["uploads"]
+        assert {"name": "Bar", "version": "1.0"} in second["uploads"]
+
+        # A fresh, ledger-less parse gives the same summary
+        assert second == rp.aggregate_reports(str(tmp_path / "reports"))
+
+    def test_touched_report_with_same_content_is_reused(self, tmp_path, monkeypatch):
+        repdir = tmp_path / "autopkg_report-1"
+        repdir.mkdir()
+        ledger_path = tmp_path / "ledger.json"
+        foo = _write_report(repdir, "Foo", "1.0")
+        self._aggregate(str(tmp_path), ledger_path, monkeypatch)
+
+        os.utime(foo, ns=(1, 1))
+        _summary, parsed = self._aggregate(str(tmp_path), ledger_path, monkeypatch)
+
+        assert parsed == []
+
+    def test_removed_reports_are_dropped(self, tmp_path, monkeypatch):
+        repdir = tmp_path / "autopkg_report-1"
+        repdir.mkdir()
+        ledger_path = tmp_path / "ledger.json"
+        _write_report(repdir, "Foo", "1.0")
+        bar = _write_report(repdir, "Bar", "1.0")
+        self._aggregate(str(tmp_path), ledger_path, monkeypatch)
+
+        os.remove(bar)
+        summary, parsed = self._aggregate(str(tmp_path), ledger_path, monkeypatch)
+
+        assert parsed == []
+        assert summary["recipes"] == 1
+        assert len(ReportLedger(ledger_path).entries) == 1
+
+    def test_link_map_change_reparses_plists(self, tmp_path, monkeypatch):
+        repdir = tmp_path / "autopkg_report-1"
+        repdir.mkdir()
+        ledger_path = tmp_path / "ledger.json"
+        _write_report(repdir, "Foo", "1.0")
+        self._aggregate(str(tmp_path), ledger_path, monkeypatch)
+
+        link_map = {"Foo.upload.jamf": "https://example.test/Foo.upload.jamf"}
+        summary, parsed = self._aggregate(
+            str(tmp_path), ledger_path, monkeypatch, link_map=link_map
+        )
+
+        assert parsed == ["Foo-2026-02-02T01-02-03.plist"]
+        assert summary["upload_rows"][0]["recipe_url"] == link_map["Foo.upload.jamf"]
+
+    def test_zip_members_are_reused_without_reading(self, tmp_path, monkeypatch):
+        repdir = tmp_path / "src" / "autopkg_report-1"
+        repdir.mkdir(parents=True)
+        foo = _write_report(repdir, "Foo", "1.0")
+        zip_path = tmp_path / "reports.zip"
+        with zipfile.ZipFile(zip_path, "w") as zf:
+            zf.write(foo, "autopkg_report-1/Foo-2026-02-02T01-02-03.plist")
+        ledger_path = tmp_path / "ledger.json"
+
+        first, parsed = self._aggregate(
+            None, ledger_path, monkeypatch, zip_files=[str(zip_path)]
+        )
+        assert len(parsed) == 1
+        second, parsed = self._aggregate(
+            None, ledger_path, monkeypatch, zip_files=[str(zip_path)]
+        )
+
+        assert parsed == []
+        assert second == first
+
+    def test_error_category_change_drops_plists(self, tmp_path, monkeypatch):
+        repdir = tmp_path / "autopkg_report-1"
+        repdir.mkdir()
+        ledger_path = tmp_path / "ledger.json"
+        _write_report(repdir, "Foo", "1.0")
+        self._aggregate(str(tmp_path), ledger_path, monkeypatch)
+
+        assert len(ReportLedger(ledger_path).entries) == 1
+        classifier = ErrorClassifier([("vpn", ("vpn",))])
+        assert ReportLedger(ledger_path, None, classifier).entries == {}
+
+    def test_only_stamps_are_held_in_memory(self, tmp_path, monkeypatch):
+        repdir = tmp_path / "autopkg_report-1"
+        repdir.mkdir()
+        ledger_path = tmp_path / "ledger.json"
+        _write_report(repdir, "Foo", "1.0")
+        _write_report(repdir, "Bar", "1.0")
+        first, _parsed = self._aggregate(str(tmp_path), ledger_path, monkeypatch)
+
+        ledger = ReportLedger(ledger_path)
+        assert len(ledger.entries) == 2
+        assert all("data" not in entry for entry in ledger.entries.values())
+        second = rp.aggregate_reports(str(tmp_path), ledger=ledger)
+        ledger.save()
+
+        assert ledger.hits == 2
+        assert second == first
@@ -1,8 +1,12 @@
+import io
+import json
 import logging
 import os
 import plistlib
-import sys
+import random
+import re
 import tempfile
+import zipfile
 
 from autopkg_wrapper.utils import report_processor as rp
 
@@ -153,70 +157,6 @@ class TestReportProcessor:
         assert data["upload_rows"][0]["recipe_name"] == "Foo.upload.jamf"
         assert data["upload_rows"][0]["recipe_url"] == "https://example.com"
 
-    def test_build_pkg_map_handles_result_wrappers(self, monkeypatch):
-        class FakePackage:
-            def __init__(self, name, pid):
-                self.packageName = name
-                self.id = pid
-
-        class FakePackages:
-            def __init__(self, items):
-                self.results = items
-
-        class FakeProApi:
-            def get_packages_v1(self):
-                return FakePackages([FakePackage("Foo.pkg", 55)])
-
-        class FakeClient:
-            def __init__(self, *_args, **_kwargs):
-                self.pro_api = FakeProApi()
-
-        class FakeCreds:
-            def __init__(self, *_args, **_kwargs):
-                pass
-
-        class FakeSdk:
-            ApiClientCredentialsProvider = FakeCreds
-            JamfProClient = FakeClient
-
-        monkeypatch.setitem(sys.modules, "jamf_pro_sdk", FakeSdk)
-
-        pkg_map = rp.build_pkg_map("https://example.test", "id", "secret", errors=[])
-
-        assert (
-            pkg_map["Foo.pkg"]
-            == "https://example.test/view/settings/computer-management/packages/55"
-        )
-
-    def test_build_policy_map_requires_classic_request(self, monkeypatch):
-        class FakeProApi:
-            pass
-
-        class FakeClient:
-            def __init__(self, *_args, **_kwargs):
-                self.pro_api = FakeProApi()
-
-        class FakeCreds:
-            def __init__(self, *_args, **_kwargs):
-                pass
-
-        class FakeSdk:
-            ApiClientCredentialsProvider = FakeCreds
-            JamfProClient = FakeClient
-
-        monkeypatch.setitem(sys.modules, "jamf_pro_sdk", FakeSdk)
-        errors: list[str] = []
-
-        policy_map = rp.build_policy_map(
-            "https://example.test", "id", "secret", errors=errors
-        )
-
-        assert policy_map == {}
-        assert any("classic API request" in msg for msg in errors)
-
-    def test_coerce_jamf_items_handles_none(self):
-        assert rp._coerce_jamf_items(None) == []
-
     def test_aggregate_reports_end_to_end(self):
         with tempfile.TemporaryDirectory() as td:
             repdir = os.path.join(td, "autopkg_report-123")
@@ -253,6 +193,287 @@ class TestReportProcessor:
         assert any(u.get("name") == "Foo" for u in summary["uploads"])
         assert any(u.get("name") == "Bar" for u in summary["uploads"])
 
+    def _write_upload_reports(self, base, names):
+        repdir = os.path.join(base, "autopkg_report-123")
+        os.makedirs(repdir)
+        for i, name in enumerate(names):
+            plist = {
+                "failures": [{"message": f"{name} download failed"}]
+                if i % 3 == 0
+                else [],
+                "summary_results": {
+                    "jamfpackageuploader_summary_result": {
+                        "data_rows": [
+                            {
+                                "name": name,
+                                "version": f"1.{i}",
+                                "pkg_name": f"{name}-1.{i}.pkg",
+                            }
+                        ]
+                    }
+                },
+            }
+            path = os.path.join(repdir, f"{name}-2026-02-02T01-02-{i:02d}.plist")
+            with open(path, "wb") as f:
+                plistlib.dump(plist, f)
+
+    def test_streaming_aggregation_renders_same_summary(self):
+        names = ["zeta", "Alpha", "beta", "alpha", "Gamma", "delta", "Beta"] * 3
+        with tempfile.TemporaryDirectory() as td:
+            self._write_upload_reports(td, names)
+            summary = rp.aggregate_reports(td)
+            expected = rp.render_job_summary(summary, "prod", "2026-02-02")
+
+            streamed = rp.aggregate_reports(td, streaming=True)
+            spilled = rp.aggregate_reports(td, streaming=True, spill_rows=4)
+            try:
+                assert streamed.uploads == []
+                assert spilled.recipes == summary["recipes"] == len(names)
+                assert spilled.error_count == len(summary["errors"])
+                assert spilled.rows["upload_rows"]._runs
+                for aggregator in (streamed, spilled):
+                    assert (
+                        rp.render_job_summary(aggregator, "prod", "2026-02-02")
+                        == expected
+                    )
+                    assert rp.render_issue_body(
+                        aggregator, "prod", "2026-02-02"
+                    ) == rp.render_issue_body(summary, "prod", "2026-02-02")
+            finally:
+                spilled.close()
+
+    def test_parallel_parse_matches_serial(self):
+        names = [f"App{i:03d}" for i in range(40)]
+        with tempfile.TemporaryDirectory() as td:
+            self._write_upload_reports(td, names)
+            with open(
+                os.path.join(td, "autopkg_report-123", "out.txt"),
+                "w",
+                encoding="utf-8",
+            ) as f:
+                f.write("Uploaded Bar version 9.9.9\n")
+            link_map = {"App001": "https://example.test/App001.recipe"}
+
+            serial = rp.aggregate_reports(td, recipe_link_map=link_map)
+            parallel = rp.aggregate_reports(td, recipe_link_map=link_map, workers=3)
+
+        assert parallel == serial
+        assert rp.render_job_summary(parallel, "", "") == rp.render_job_summary(
+            serial, "", ""
+        )
+
+    def _zip_dir(self, src, zip_path):
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for root, _dirs, files in os.walk(src):
+                for fn in files:
+                    full = os.path.join(root, fn)
+                    zf.write(full, os.path.relpath(full, src))
+
+    def test_zip_reports_are_read_in_place(self):
+        with tempfile.TemporaryDirectory() as td:
+            first = os.path.join(td, "first")
+            second = os.path.join(td, "second")
+            self._write_upload_reports(first, ["Foo", "Bar"])
+            self._write_upload_reports(second, ["Baz"])
+            with open(
+                os.path.join(second, "autopkg_report-123", "out.txt"),
+                "w",
+                encoding="utf-8",
+            ) as f:
+                f.write("Uploaded Qux version 9.9.9\n")
+            self._zip_dir(first, os.path.join(td, "first.zip"))
+            self._zip_dir(second, os.path.join(td, "second.zip"))
+
+            from_dirs = rp.aggregate_reports(first)
+            second_summary = rp.aggregate_reports(second)
+            for key, value in second_summary.items():
+                from_dirs[key] += value
+            from_zips = rp.aggregate_reports(
+                None,
+                zip_files=[
+                    os.path.join(td, "first.zip"),
+                    os.path.join(td, "second.zip"),
+                ],
+            )
+
+        # os.walk order depends on the filesystem; zip members are sorted
+        def normalised(summary):
+            return {
+                key: sorted(value, key=json.dumps) if isinstance(value, list) else value
+                for key, value in summary.items()
+            }
+
+        assert normalised(from_zips) == normalised(from_dirs)
+        assert from_zips["recipes"] == 3
+
+    def test_process_reports_accepts_multiple_zips_without_extracting(self):
+        with tempfile.TemporaryDirectory() as td:
+            for name in ("Foo", "Bar"):
+                src = os.path.join(td, name)
+                self._write_upload_reports(src, [name])
+                self._zip_dir(src, os.path.join(td, f"{name}.zip"))
+            extract_dir = os.path.join(td, "extract")
+            out_dir = os.path.join(td, "out")
+
+            rc = rp.process_reports(
+                zip_file=f"{td}/Foo.zip,{td}/Bar.zip",
+                extract_dir=extract_dir,
+                reports_dir=None,
+                out_dir=out_dir,
+                debug=False,
+                strict=False,
+            )
+            with open(os.path.join(out_dir, "job_summary.md"), encoding="utf-8") as f:
+                job_md = f.read()
+
+            assert rc == 0
+            assert not os.path.exists(extract_dir)
+            assert "| Bar |" in job_md and "| Foo |" in job_md
+
+            rp.process_reports(
+                zip_file=[f"{td}/Foo.zip"],
+                extract_dir=extract_dir,
+                reports_dir=None,
+                out_dir=out_dir,
+                debug=False,
+                strict=False,
+                extract=True,
+            )
+            assert os.path.isdir(os.path.join(extract_dir, "autopkg_report-123"))
+
+    def test_row_spool_merges_spilled_runs_in_stable_order(self):
+        with tempfile.TemporaryDirectory() as td:
+            spool = rp.RowSpool(rp._row_sort_key, spill_rows=3, spill_dir=lambda: td)
+            rows = [
+                {"recipe_name": name, "n": i}
+                for i, name in enumerate(["b", "A", "a", "c", "B", "a", "C", "b"])
+            ]
+            spool.extend(rows)
+
+            assert len(spool) == len(rows)
+            assert sorted(r["n"] for r in spool) == list(range(len(rows)))
+            assert list(spool.iter(ordered=True)) == sorted(rows, key=rp._row_sort_key)
+
+    def test_aggregator_links_rows_case_insensitively(self):
+        aggregator = rp.ReportAggregator()
+        aggregator.rows["upload_rows"].extend(
+            [{"package": "Foo.pkg"}, {"package": "bar.PKG"}, {"package": "Baz.pkg"}]
+        )
+
+        linked = aggregator.link_packages({"Foo.pkg": "u1", "Bar.pkg": "u2"})
+
+        assert linked == 2
+        assert [r.get("package_url") for r in aggregator.iter_rows("upload_rows")] == [
+            "u1",
+            "u2",
+            None,
+        ]
+
+
+def _legacy_parse_text_lines(lines):
+    """The original per-line regex parser, used as an oracle."""
+    re_error = re.compile(r"ERROR[:\s-]+(.+)", re.IGNORECASE)
+    re_upload = re.compile(
+        r"(Uploaded|Upload|Uploading)[^\n]*?(?P<name>[A-Za-z0-9 ._+\-]+?)(?=(?:\s+\bversion\b)|$)(?:[^\n]*?\bversion\b[^\d]*(?P<version>\d+(?:\.\d+)+))?",
+        re.IGNORECASE,
+    )
+    re_policy = re.compile(r"Policy (created|updated):\s*(?P<name>.+)", re.IGNORECASE)
+    result = {"uploads": [], "policies": [], "errors": []}
+    for line in lines:
+        m_err = re_error.search(line)
+        if m_err:
+            result["errors"].append(m_err.group(1).strip())
+            continue
+        m_up = re_upload.search(line)
+        if m_up:
+            result["uploads"].append(
+                {
+                    "name": (m_up.group("name") or "").strip(),
+                    "version": (m_up.group("version") or "-") or "-",
+                }
+            )
+            continue
+        m_pol = re_policy.search(line)
+        if m_pol:
+            action = "updated" if "updated" in line.lower() else "created"
+            result["policies"].append(
+                {"name": m_pol.group("name").strip(), "action": action}
+            )
+    return result
+
+
+class TestTextParser:
+    TOKENS = [
+        "Uploaded",
+        "upload",
+        "UPLOADING",
+        "version",
+        "Version",
+        " ",
+        "  ",
+        "\t",
+        "1.2",
+        "3",
+        "1.2.3",
+        ".",
+        "-",
+        "_",
+        "+",
+        "Foo",
+        "bar",
+        "é",
+        "\u017f",
+        "\u212a",
+        "\u0130",
+        ":",
+        "/",
+        "versions",
+        "x1.2",
+        "version1.2",
+        "ERROR",
+        "Policy created:",
+        "policy updated: ",
+    ]
+
+    def test_matches_legacy_regex_parser_on_random_lines(self):
+        rng = random.Random(1234)
+        lines = []
+        for _ in range(20000):
+            line = "".join(rng.choice(self.TOKENS) for _ in range(rng.randint(0, 12)))
+            lines.append(line + "\n" if rng.random() < 0.5 else line)
+
+        assert rp.parse_text_lines(lines) == _legacy_parse_text_lines(lines)
+
+    def test_chunked_reader_yields_every_keyword_line(self):
+        rng = random.Random(99)
+        text = "".join(
+            "".join(rng.choice(self.TOKENS) for _ in range(rng.randint(0, 8)))
+            + rng.choice(["\n", "\n", "\r\n"])
+            for _ in range(500)
+        )
+        lines = io.StringIO(text, newline=None).readlines()
+
+        chunked = list(rp._iter_keyword_lines(io.StringIO(text, newline=None), 7))
+
+        assert chunked == [line for line in lines if rp._RE_TEXT_KEYWORDS.search(line)]
+        assert rp.parse_text_lines(chunked) == _legacy_parse_text_lines(lines)
+
+    def test_matches_legacy_regex_parser_on_log_lines(self):
+        lines = [
+            "Processing Firefox.upload.jamf...\n",
+            "JamfPackageUploader: Uploaded Firefox-128.0.pkg version 128.0.1\n",
+            "Uploading Zoom\n",
+            "Policy updated: Install Firefox\n",
+            "ERROR: Download failed for Slack\n",
+            "Upload " + "x" * 5000 + "\n",
+        ]
+
+        result = rp.parse_text_lines(lines)
+
+        assert result == _legacy_parse_text_lines(lines)
+        assert {"name": "Install Firefox", "action": "updated"} in result["policies"]
+        assert result["errors"] == ["Download failed for Slack"]
+
 
 class TestProcessReportsZeroCase:
     """process_reports() should distinguish the three 'zero reports' shapes.
@@ -0,0 +1,183 @@
+import plistlib
+from types import SimpleNamespace
+
+from autopkg_wrapper.autopkg_wrapper import write_recipe_results
+from autopkg_wrapper.models.recipe import Recipe
+from autopkg_wrapper.utils import report_processor as rp
+from autopkg_wrapper.utils.run_results import (
+    load_run_results,
+    new_result,
+    recipe_result,
+    write_run_results,
+)
+
+
+def _write_report(path, uploads=(), policies=(), failures=()):
+    summary_results = {}
+    if uploads:
+        summary_results["jamfpackageuploader_summary_result"] = {
+            "data_rows": [
+                {"name": name, "version": version, "pkg_name": f"{name}-{version}.pkg"}
+                for name, version in uploads
+            ]
+        }
+    if policies:
+        summary_results["jamfpolicyuploader_summary_result"] = {
+            "header": ["policy", "action"],
+            "data_rows": [{"policy_name": p, "action": "updated"} for p in policies],
+        }
+    with open(path, "wb") as f:
+        plistlib.dump(
+            {
+                "failures": [{"message": m} for m in failures],
+                "summary_results": summary_results,
+            },
+            f,
+        )
+
+
+class TestRunResults:
+    def test_round_trip_in_both_formats(self, tmp_path):
+        first = new_result("Foo.upload.jamf")
+        first.update(
+            status="updated",
+            attempts=2,
+            duration=12.5,
+            versions=["1.0"],
+            packages=["Foo-1.0.pkg", "Foo-1.0-arm.pkg"],
+            policies=["Install Foo"],
+        )
+        second = new_result("Bar.upload.jamf")
+        second.update(status="failed", attempts=1, error_category="download")
+
+        for name in ("results.ndjson", "results.csv"):
+            path = tmp_path / name
+            assert write_run_results([first, second], path) == 2
+            assert load_run_results(path) == [first, second]
+
+        lines = (tmp_path / "results.ndjson").read_text().splitlines()
+        assert lines[1] == (
+            '{"recipe":"Bar.upload.jamf","status":"failed","attempts":1,"duration":null,'
+            '"versions":[],"packages":[],"policies":[],"error_category":"download"}'
+        )
+        assert (tmp_path / "results.csv").read_text().splitlines()[1] == (
+            "Foo.upload.jamf,updated,2,12.5,1.0,Foo-1.0.pkg;Foo-1.0-arm.pkg,Install Foo,"
+        )
+
+    def test_recipe_result_reflects_the_run(self):
+        updated = Recipe("Foo.upload.jamf")
+        updated.timings = {"queue": 9.0, "run": 3.14159}
+        updated.attempts = 2
+        report = {
+            "upload_rows": [{"package": "Foo-1.0.pkg", "version": "1.0"}],
+            "policy_rows": [{"policy": "Install Foo"}],
+            "error_rows": [],
+        }
+        assert recipe_result(updated, report) == {
+            "recipe": "Foo.upload.jamf",
+            "status": "updated",
+            "attempts": 2,
+            "duration": 3.142,
+            "versions": ["1.0"],
+            "packages": ["Foo-1.0.pkg"],
+            "policies": ["Install Foo"],
+            "error_category": None,
+        }
+
+        failed = Recipe("Bar.download")
+        failed.error = True
+        failed.results = {"failed": [{"message": "curl: (22) 404"}], "imported": ""}
+        result = recipe_result(failed)
+        assert (result["status"], result["error_category"]) == ("failed", "download")
+
+        untrusted = Recipe("Baz.download")
+        untrusted.verified = False
+        assert recipe_result(untrusted)["status"] == "untrusted"
+
+        stopped = Recipe("Slow.download")
+        stopped.mark_timed_out("autopkg run timed out after 600s")
+        result = recipe_result(stopped)
+        assert (result["status"], result["error_category"]) == ("timed_out", "timeout")
+        assert recipe_result(Recipe("Qux.download"))["status"] == "ok"
+
+    def test_main_writes_results_from_each_recipe_report(self, tmp_path):
+        report = tmp_path / "Foo.upload.jamf-2026-02-02T01-02-03.plist"
+        _write_report(report, uploads=[("Foo", "2.0")], policies=["Install Foo"])
+        foo = Recipe("Foo.upload.jamf")
+        foo.report_path = report
+        foo.timings = {"run": 1.0}
+        foo.results = {"imported": [], "failed": []}
+        bar = Recipe("Bar.upload.jamf")
+        bar.error = True
+        bar.results = {"failed": [{"message": "Jamf upload failed"}]}
+        args = SimpleNamespace(
+            results_file=str(tmp_path / "out" / "results.csv"),
+            results_format=None,
+            error_categories=None,
+        )
+
+        write_recipe_results([foo, bar], args)
+
+        rows = load_run_results(tmp_path / "out" / "results.csv")
+        assert [(r["recipe"], r["status"]) for r in rows] == [
+            ("Foo.upload.jamf", "updated"),
+            ("Bar.upload.jamf", "failed"),
+        ]
+        assert rows[0]["packages"] == ["Foo-2.0.pkg"]
+        assert rows[0]["policies"] == ["Install Foo"]
+        assert rows[1]["error_category"] == "jamf"
+
+    def test_process_reports_writes_a_row_per_recipe(self, tmp_path):
+        repdir = tmp_path / "reports" / "autopkg_report-1"
+        repdir.mkdir(parents=True)
+        _write_report(
+            repdir / "Foo.upload.jamf-2026-02-02T01-02-03.plist",
+            uploads=[("Foo", "1.0")],
+        )
+        _write_report(
+            repdir / "Bar.upload.jamf-2026-02-02T01-02-03.plist",
+            failures=["Code signature verification failed"],
+        )
+        _write_report(repdir / "Baz.upload.jamf-2026-02-02T01-02-03.plist")
+        # A second Baz report may be a retry or a plist from an earlier run
+        _write_report(repdir / "Baz.upload.jamf-2026-02-02T01-05-03.plist")
+        out_dir = tmp_path / "out"
+
+        rp.process_reports(
+            zip_file=None,
+            extract_dir=str(tmp_path / "extract"),
+            reports_dir=str(tmp_path / "reports"),
+            out_dir=str(out_dir),
+            debug=False,
+            strict=False,
+            results_format="ndjson",
+        )
+
+        rows = {
+            r["recipe"]: r for r in load_run_results(out_dir / "run_results.ndjson")
+        }
+        assert set(rows) == {"Foo.upload.jamf", "Bar.upload.jamf", "Baz.upload.jamf"}
+        assert rows["Foo.upload.jamf"]["status"] == "updated"
+        assert rows["Foo.upload.jamf"]["versions"] == ["1.0"]
+        assert rows["Bar.upload.jamf"]["status"] == "failed"
+        assert rows["Bar.upload.jamf"]["error_category"] == "signature"
+        assert rows["Baz.upload.jamf"]["status"] == "ok"
+        assert rows["Baz.upload.jamf"]["attempts"] is None
+        assert rows["Foo.upload.jamf"]["attempts"] is None
+
+    def test_process_reports_writes_no_results_without_a_format(self, tmp_path):
+        repdir = tmp_path / "reports" / "autopkg_report-1"
+        repdir.mkdir(parents=True)
+        _write_report(repdir / "Foo.upload.jamf-2026-02-02T01-02-03.plist")
+        out_dir = tmp_path / "out"
+
+        rp.process_reports(
+            zip_file=None,
+            extract_dir=str(tmp_path / "extract"),
+            reports_dir=str(tmp_path / "reports"),
+            out_dir=str(out_dir),
+            debug=False,
+            strict=False,
+        )
+
+        assert sorted(p.name for p in out_dir.iterdir()) == ["job_summary.md"]
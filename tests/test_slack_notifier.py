@@ -1,7 +1,12 @@
 import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from types import SimpleNamespace
 from unittest.mock import patch
 
+import pytest
+
 from autopkg_wrapper.notifier import slack
 
 
@@ -77,3 +82,103 @@ class TestSlackNotifier:
 
         payload = json.loads(post.call_args.kwargs["data"])
         assert "has been uploaded" in payload["attachments"][0]["title"]
+
+
+class _WebhookStub(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        with server.lock:
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            status, headers = server.responses.pop(0) if server.responses else (200, {})
+            server.received.append((time.monotonic(), status, payload))
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+        body = b"ok" if status == 200 else b"error"
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def webhook():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _WebhookStub)
+    server.lock = threading.Lock()
+    server.responses = []
+    server.received = []
+    server.active = 0
+    server.peak = 0
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}/hook"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _updated(name):
+    r = DummyRecipe(name)
+    r.verified = True
+    r.updated = True
+    return r
+
+
+class TestSlackDispatcher:
+    def test_sends_concurrently_within_limit(self, webhook):
+        webhook.delay = 0.05
+
+        with slack.SlackDispatcher(webhook.url, max_workers=3) as dispatcher:
+            for i in range(8):
+                dispatcher.submit(_updated(f"App{i}"))
+            dispatcher.submit(DummyRecipe("Quiet"))
+
+        assert len(webhook.received) == 8
+        assert 1 < webhook.peak <= 3
+        assert dispatcher.sent == 8
+
+    def test_honours_retry_after(self, webhook):
+        webhook.responses = [(429, {"Retry-After": "0.2"})]
+
+        with slack.SlackDispatcher(webhook.url, max_workers=1) as dispatcher:
+            dispatcher.submit(_updated("Foo"))
+
+        (first, status, _), (second, retry_status, _) = webhook.received
+        assert (status, retry_status) == (429, 200)
+        assert second - first >= 0.2
+        assert dispatcher.sent == 1
+
+    def test_failed_message_does_not_stop_others(self, webhook):
+        webhook.responses = [(400, {})]
+
+        with slack.SlackDispatcher(webhook.url, max_workers=1) as dispatcher:
+            dispatcher.submit(_updated("Bad"))
+            dispatcher.submit(_updated("Good"))
+
+        assert [status for _, status, _ in webhook.received] == [400, 200]
+        assert (dispatcher.sent, dispatcher.failed) == (1, 1)
+
+    def test_digest_sends_one_message(self, webhook):
+        trust = DummyRecipe("Trust")
+        trust.verified = False
+
+        with slack.SlackDispatcher(webhook.url, digest=True) as dispatcher:
+            dispatcher.submit(_updated("Foo"))
+            dispatcher.submit(trust)
+            assert webhook.received == []
+
+        (_, _, payload) = webhook.received[0]
+        assert len(webhook.received) == 1
+        assert [a["title"] for a in payload["attachments"]] == [
+            "Foo has been uploaded to Jamf",
+            "Trust failed trust verification",
+        ]
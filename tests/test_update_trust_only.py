@@ -1,7 +1,7 @@
 """Tests for update-trust-only workflow."""
 
 from types import SimpleNamespace
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from autopkg_wrapper.autopkg_wrapper import update_trust_only_workflow
 from autopkg_wrapper.models.recipe import Recipe
@@ -236,3 +236,34 @@ class TestUpdateTrustOnlyWorkflow:
         assert len(updated) == 0
         assert len(skipped) == 0
         assert len(failed) == 0
+
+    def test_batched_verification_skips_per_recipe_calls(self):
+        """Recipes decided by the batched verifier aren't verified again."""
+        recipe1 = Recipe("Firefox.upload.jamf")
+        recipe2 = Recipe("Chrome.upload.jamf")
+        for recipe in (recipe1, recipe2):
+            recipe.verify_trust_info = MagicMock(
+                side_effect=lambda args, r=recipe: setattr(r, "verified", False)
+            )
+            recipe.update_trust_info = MagicMock()
+
+        def fake_batch(recipes, args, batch_size, max_workers):
+            # Only Firefox gets a clear verdict from the batched output
+            recipe1.verified = True
+            return [recipe2]
+
+        args = SimpleNamespace(concurrency=1, dry_run=False, trust_verify_batch_size=50)
+        with patch(
+            "autopkg_wrapper.autopkg_wrapper.verify_trust_info_batch",
+            side_effect=fake_batch,
+        ) as batch:
+            updated, skipped, failed = update_trust_only_workflow(
+                recipe_list=[recipe1, recipe2], args=args
+            )
+
+        assert batch.call_args.kwargs["batch_size"] == 50
+        recipe1.verify_trust_info.assert_not_called()
+        recipe2.verify_trust_info.assert_called_once()
+        assert updated == [recipe2]
+        assert skipped == [recipe1]
+        assert failed == []